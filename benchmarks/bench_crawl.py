@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+End-to-end crawl throughput against a local synthetic site and a mock Gemini model.
+
+Starts an HTTP server on localhost serving a generated site (page count, page
+size, link fan-out, response latency and share of duplicate pages are all
+configurable), replaces the LLM backends with a mock with configurable latency
+and failure rate, and runs run_web_to_json_conversion once per crawl mode. Reports
+pages/sec, CPU time per stage (fetch, extract, LLM, everything else), peak RSS
+and the LLM calls made. The server runs in a child process, so the CPU and RSS
+figures are the crawler's alone. No network access or API key is needed.
+
+Usage:
+    python benchmarks/bench_crawl.py [--pages 100] [--page_kb 20] [--fanout 5] [--latency_ms 20]
+                                     [--duplicate_rate 0.1] [--llm_latency_ms 200] [--llm_failure_rate 0.05]
+                                     [--crawl_modes sequential async pipeline] [--json results.json]
+"""
+
+import argparse
+import http.server
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+try:
+    import resource
+except ImportError: # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+import web_to_json_agent as agent
+import llm_backends
+from crawl_metrics import CrawlMetrics
+
+WORDS = ("crawler", "latency", "throughput", "queue", "parser", "token", "budget", "cache", "frontier",
+         "robots", "sitemap", "record", "batch", "model", "prompt", "answer", "question", "stage")
+
+# --- Synthetic site ---
+
+class SyntheticSite:
+    """Deterministic pages with prose, links to `fanout` other pages and some duplicated bodies."""
+
+    def __init__(self, pages, page_kb, fanout, duplicate_rate, seed=0):
+        self.pages = pages
+        self.page_kb = page_kb
+        self.fanout = fanout
+        self.duplicate_rate = duplicate_rate
+        self.seed = seed
+        self._bodies = {}
+
+    def body_source(self, index):
+        """Index of the page whose body this page repeats (itself unless it is a duplicate)."""
+        rng = random.Random(self.seed * 7919 + index)
+        if index > 0 and rng.random() < self.duplicate_rate:
+            return rng.randrange(index)
+        return index
+
+    def body(self, index):
+        if index not in self._bodies:
+            rng = random.Random(self.seed * 104729 + index)
+            paragraphs = []
+            size = 0
+            while size < self.page_kb * 1024:
+                sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+                             for _ in range(rng.randint(3, 6))]
+                paragraph = f"<p>{' '.join(sentences)}</p>"
+                paragraphs.append(paragraph)
+                size += len(paragraph)
+            self._bodies[index] = f"<h1>Topic {index}</h1>" + "".join(paragraphs)
+        return self._bodies[index]
+
+    def html(self, index):
+        rng = random.Random(self.seed * 15485863 + index)
+        targets = [rng.randrange(self.pages) for _ in range(self.fanout)]
+        nav = "".join(f'<li><a href="/page/{target}">Page {target}</a></li>' for target in targets)
+        return (f"<html><head><title>Page {index}</title></head><body><nav><ul>{nav}</ul></nav>"
+                f"<main><article>{self.body(self.body_source(index))}</article></main>"
+                f"<footer>Synthetic benchmark site</footer></body></html>")
+
+def serve_site(site, latency_seconds, port_queue):
+    """Serves `site` on an ephemeral localhost port, reporting the port through `port_queue`."""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            index = None
+            if path == "/":
+                index = 0
+            elif path.startswith("/page/") and path[6:].isdigit() and int(path[6:]) < site.pages:
+                index = int(path[6:])
+            if latency_seconds:
+                time.sleep(latency_seconds)
+            if index is None:
+                self.send_response(404) # Also covers robots.txt, so everything is allowed
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = site.html(index).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+def start_server(site, latency_seconds):
+    """
+    Runs the site's server in a child process, so its CPU time and memory stay
+    out of the crawler's measurements. Returns (process, base_url).
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve_site, args=(site, latency_seconds, port_queue), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=30)}/"
+
+# --- Mock LLM ---
+
+class MockLLM:
+    """Stands in for a model: answers single-page and batched prompts after `latency` seconds."""
+
+    def __init__(self, latency, failure_rate, seed=0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            failed = self._rng.random() < self.failure_rate
+            if failed:
+                self.failures += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            raise RuntimeError("Mock Gemini failure")
+        if "BEGIN PAGE" in prompt:
+            items = []
+            for line in prompt.splitlines():
+                if line.startswith("BEGIN PAGE ") and "(source_url: " in line:
+                    source_url = line.split("(source_url: ", 1)[1].rstrip("):")
+                    items.append({"source_url": source_url, "question": "What is this page about?", "answer": "A benchmark topic."})
+            return json.dumps(items), None
+        return json.dumps({"question": "What is this page about?", "answer": "A benchmark topic."}), None
+
+class MockBackend(llm_backends.LLMBackend):
+    def _generate(self, client, prompt):
+        return client.generate(prompt)
+
+def install_mock_llm(model, pool_size):
+    """Makes open_shared_resources install a backend pooling `model` instead of configuring the real API."""
+    def configure_mock_gemini(api_key, model_name='mock-gemini'):
+        agent.llm_chain = [MockBackend("mock", model_name, llm_backends.ClientPool(lambda: model, pool_size))]
+        return True
+    agent.configure_gemini = configure_mock_gemini
+
+# --- Stage CPU accounting ---
+
+class StageTimer:
+    """Accumulates per-thread CPU time spent inside the wrapped agent functions, by stage."""
+
+    def __init__(self):
+        self.cpu_seconds = {}
+        self._active = threading.local()
+        self._lock = threading.Lock()
+
+    def wrap(self, stage, func):
+        def timed(*args, **kwargs):
+            if getattr(self._active, "stage", None):
+                return func(*args, **kwargs) # Already counted by the outer stage
+            self._active.stage = stage
+            started = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - started
+                self._active.stage = None
+                with self._lock:
+                    self.cpu_seconds[stage] = self.cpu_seconds.get(stage, 0.0) + elapsed
+        return timed
+
+def install_stage_timer(timer):
+    agent.fetch_page_with_cache = timer.wrap("fetch", agent.fetch_page_with_cache)
+    agent.extract_page = timer.wrap("extract", agent.extract_page)
+    agent.process_with_gemini = timer.wrap("llm", agent.process_with_gemini)
+    agent.process_batch_with_gemini = timer.wrap("llm", agent.process_batch_with_gemini)
+
+def process_cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 # Bytes on macOS, KB elsewhere
+
+# --- Runs ---
+
+def run_mode(crawl_mode, base_url, args, model, timer, output_dir):
+    metrics = CrawlMetrics()
+    timer.cpu_seconds = {}
+    calls_before, failures_before = model.calls, model.failures
+    cpu_before = process_cpu_seconds()
+    started = time.perf_counter()
+    agent.run_web_to_json_conversion(
+        base_url, args.pages, os.path.join(output_dir, f"{crawl_mode}.json"), "mock-key", lambda message: None,
+        model_name_to_use="mock-gemini",
+        request_delay_seconds=args.delay,
+        crawl_mode=crawl_mode,
+        concurrency=args.concurrency,
+        per_host_concurrency=args.per_host_concurrency,
+        llm_batch_size=args.llm_batch_size,
+        dedup_threshold=None if args.no_dedup else agent.near_duplicates.DEFAULT_THRESHOLD,
+        metrics_callback=metrics.record)
+    wall_seconds = time.perf_counter() - started
+    cpu_seconds = process_cpu_seconds() - cpu_before
+    snapshot = metrics.snapshot()
+    stage_cpu = dict(timer.cpu_seconds)
+    stage_cpu["other"] = max(0.0, cpu_seconds - sum(stage_cpu.values()))
+    return {
+        "crawl_mode": crawl_mode,
+        "pages": snapshot["page_count"],
+        "records": snapshot["record_count"],
+        "wall_seconds": wall_seconds,
+        "pages_per_second": snapshot["page_count"] / wall_seconds if wall_seconds > 0 else 0.0,
+        "cpu_seconds": cpu_seconds,
+        "stage_cpu_seconds": stage_cpu,
+        "llm_calls": model.calls - calls_before,
+        "llm_failures": model.failures - failures_before,
+        "fetch_p95_ms": snapshot["fetch_p95"] * 1000 if snapshot["fetch_p95"] is not None else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def print_result(result):
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in sorted(result["stage_cpu_seconds"].items()))
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    print(f"{result['crawl_mode']:<10} {result['pages']:>4} pages in {result['wall_seconds']:6.2f}s "
+          f"= {result['pages_per_second']:6.2f} pages/s | CPU {result['cpu_seconds']:.2f}s ({stages}) | "
+          f"LLM calls {result['llm_calls']} ({result['llm_failures']} failed) | peak RSS {rss}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end crawl throughput against a local mock site and mock LLM.")
+    parser.add_argument("--pages", type=int, default=100, help="Pages on the site and pages to crawl (default: 100).")
+    parser.add_argument("--page_kb", type=float, default=20, help="Approximate article text per page in KB (default: 20).")
+    parser.add_argument("--fanout", type=int, default=5, help="Links from each page to other pages (default: 5).")
+    parser.add_argument("--latency_ms", type=float, default=20, help="Server response latency in ms (default: 20).")
+    parser.add_argument("--duplicate_rate", type=float, default=0.1, help="Share of pages repeating another page's body (default: 0.1).")
+    parser.add_argument("--llm_latency_ms", type=float, default=200, help="Mock Gemini latency per call in ms (default: 200).")
+    parser.add_argument("--llm_failure_rate", type=float, default=0.05, help="Share of mock Gemini calls that fail (default: 0.05).")
+    parser.add_argument("--crawl_modes", nargs="+", choices=agent.CRAWL_MODES, default=list(agent.CRAWL_MODES))
+    parser.add_argument("--delay", type=float, default=0, help="Per-host request delay in seconds (default: 0).")
+    parser.add_argument("--frontier_order", choices=agent.FRONTIER_ORDERS, default=agent.FRONTIER["order"])
+    parser.add_argument("--concurrency", type=int, default=agent.DEFAULT_CONCURRENCY)
+    parser.add_argument("--per_host_concurrency", type=int, default=agent.DEFAULT_CONCURRENCY)
+    parser.add_argument("--llm_batch_size", type=int, default=agent.DEFAULT_LLM_BATCH_SIZE)
+    parser.add_argument("--llm_pool_size", type=int, default=llm_backends.DEFAULT_POOL_SIZE,
+                        help=f"Concurrent requests the mock LLM backend accepts (default: {llm_backends.DEFAULT_POOL_SIZE}).")
+    parser.add_argument("--no_dedup", action="store_true", help="Disable near-duplicate filtering.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.pages, args.page_kb, args.fanout, args.duplicate_rate, args.seed)
+    server_process, base_url = start_server(site, args.latency_ms / 1000)
+    model = MockLLM(args.llm_latency_ms / 1000, args.llm_failure_rate, args.seed)
+    install_mock_llm(model, args.llm_pool_size)
+    timer = StageTimer()
+    install_stage_timer(timer)
+    # The mock has no quota, and the retry backoff would otherwise dominate the failure cases
+    agent.configure_gemini_limits(requests_per_minute=0, tokens_per_minute=0, backoff_base=0.05, backoff_max=0.2)
+    agent.configure_frontier(order=args.frontier_order)
+
+    print(f"Site: {args.pages} pages of ~{args.page_kb:g} KB, fan-out {args.fanout}, {args.latency_ms:g} ms latency, "
+          f"{args.duplicate_rate:.0%} duplicates | Mock LLM: {args.llm_latency_ms:g} ms, {args.llm_failure_rate:.0%} failures")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            for crawl_mode in args.crawl_modes:
+                result = run_mode(crawl_mode, base_url, args, model, timer, output_dir)
+                print_result(result)
+                results.append(result)
+    finally:
+        server_process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=4)
+        print(f"Results saved to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-page CPU cost of the single-parse path versus the old double-parse path.
+
+Old: trafilatura.extract(html) plus BeautifulSoup(html, 'html.parser') for links.
+New: web_to_json_agent.extract_page, which parses one lxml tree and reuses it.
+
+Needs beautifulsoup4, which the agent itself no longer uses (pip install -e .[bench]).
+
+Usage:
+    python benchmarks/bench_single_parse.py [--pages 50] [--paragraphs 200] [--links 300]
+"""
+
+import argparse
+import os
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import trafilatura
+from bs4 import BeautifulSoup
+
+from web_to_json_agent import extract_page
+
+BASE_URL = "https://bench.example"
+
+def make_page(index, paragraphs, links):
+    nav = "".join(f'<li><a href="/section/{index}/{n}">Link {n}</a></li>' for n in range(links))
+    body = "".join(
+        f"<p>Paragraph {n} of page {index}. This sentence exists to give the extractor some realistic prose "
+        f"to work through, with <b>inline</b> markup and a <a href=\"/ref/{n}\">reference</a>.</p>"
+        for n in range(paragraphs))
+    return (f"<html><head><title>Page {index}</title></head><body>"
+            f"<nav><ul>{nav}</ul></nav><main><article><h1>Page {index}</h1>{body}</article></main>"
+            f"<footer>Footer text</footer></body></html>")
+
+def old_path(html_content, page_url):
+    extracted_text = trafilatura.extract(html_content)
+    soup = BeautifulSoup(html_content, 'html.parser')
+    links = [urljoin(page_url, link['href']) for link in soup.find_all('a', href=True)]
+    return extracted_text, links
+
+def new_path(html_content, page_url):
+    return extract_page(html_content, page_url, BASE_URL)
+
+def measure(func, pages):
+    started = time.process_time()
+    for page_url, html_content in pages:
+        func(html_content, page_url)
+    return (time.process_time() - started) / len(pages)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-parse extraction and link discovery.")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=200)
+    parser.add_argument("--links", type=int, default=300)
+    args = parser.parse_args()
+
+    pages = [(f"{BASE_URL}/page/{i}", make_page(i, args.paragraphs, args.links)) for i in range(args.pages)]
+    average_size = sum(len(html) for _, html in pages) / len(pages)
+
+    # Warm up imports and caches so neither path pays one-off costs
+    old_path(pages[0][1], pages[0][0])
+    new_path(pages[0][1], pages[0][0])
+
+    old_cpu = measure(old_path, pages)
+    new_cpu = measure(new_path, pages)
+
+    print(f"Pages: {args.pages}, average size: {average_size / 1024:.1f} KB")
+    print(f"Double parse (trafilatura + BeautifulSoup): {old_cpu * 1000:.2f} ms CPU/page")
+    print(f"Single parse (shared lxml tree):            {new_cpu * 1000:.2f} ms CPU/page")
+    print(f"Saved: {(old_cpu - new_cpu) * 1000:.2f} ms CPU/page ({100 * (1 - new_cpu / old_cpu):.0f}%)")
+
+if __name__ == "__main__":
+    main()
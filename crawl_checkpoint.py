@@ -0,0 +1,126 @@
+"""
+On-disk checkpoint of a crawl, so an interrupted run can be resumed without
+re-fetching pages or re-paying for Gemini calls.
+
+The checkpoint is a small SQLite database holding the frontier (in discovery order),
+the canonical keys of every visited URL, every completed output record and the
+near-duplicate fingerprints of the pages kept so far. Each
+page is committed as one transaction once it is fully processed, so a crash can
+only ever lose the pages that were still in flight, and those are still in the
+frontier when the crawl resumes.
+"""
+
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS frontier (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, anchor TEXT);
+CREATE INDEX IF NOT EXISTS frontier_url ON frontier (url);
+CREATE TABLE IF NOT EXISTS visited (key TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS records (seq INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, record TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS fingerprints (url TEXT PRIMARY KEY, simhash TEXT NOT NULL);
+"""
+
+class CrawlCheckpoint:
+    """SQLite-backed frontier, visited set and record log for one crawl."""
+
+    def __init__(self, path):
+        self.path = path
+        # The async engine processes pages on executor threads, so the connection is
+        # shared across threads and serialized with a lock.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+            if "anchor" not in columns:
+                # Checkpoints written before frontier scoring kept no anchor text
+                self._conn.execute("ALTER TABLE frontier ADD COLUMN anchor TEXT")
+            self._conn.commit()
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+    def reset(self):
+        """Discards any previous crawl stored in this checkpoint."""
+        with self._lock:
+            for table in ("meta", "frontier", "visited", "records", "fingerprints"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.commit()
+
+    def has_state(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM meta WHERE key = 'start_url'").fetchone() is not None
+
+    def load_frontier(self):
+        """Returns the stored frontier as (url, anchor_text) pairs in discovery order."""
+        with self._lock:
+            return self._conn.execute("SELECT url, anchor FROM frontier ORDER BY seq").fetchall()
+
+    def load_visited(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT key FROM visited")}
+
+    def iter_records(self):
+        """Yields the completed records in crawl order without loading them all at once."""
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT seq, record FROM records WHERE seq > ? ORDER BY seq LIMIT 500",
+                                          (last_seq,)).fetchall()
+            if not rows:
+                return
+            for seq, record in rows:
+                yield json.loads(record)
+            last_seq = rows[-1][0]
+
+    def load_fingerprints(self):
+        """Returns (page_url, simhash) for every page kept by the near-duplicate filter."""
+        with self._lock:
+            # Stored as text: a 64-bit SimHash overflows SQLite's signed integers
+            return [(url, int(simhash)) for url, simhash in self._conn.execute("SELECT url, simhash FROM fingerprints")]
+
+    def enqueue(self, url, anchor_text=None):
+        """Adds a URL and the text of the link that led to it to the stored frontier. Written with the next completed page."""
+        with self._lock:
+            self._conn.execute("INSERT INTO frontier (url, anchor) VALUES (?, ?)", (url, anchor_text))
+
+    def count_pages(self):
+        """Number of distinct pages that have records stored."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT url) FROM records").fetchone()[0]
+
+    def complete_page(self, url, visited_keys, records=(), source_url=None, fingerprint=None, meta=None):
+        """
+        Atomically removes `url` from the stored frontier, marks `visited_keys` as
+        visited, appends the page's `records` (if any) and near-duplicate
+        `fingerprint` (if kept), updates the `meta` dict's keys and commits
+        everything queued since the last completed page.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier WHERE url = ?", (url,))
+            self._conn.executemany("INSERT OR IGNORE INTO visited (key) VALUES (?)", [(key,) for key in visited_keys])
+            self._conn.executemany("INSERT INTO records (url, record) VALUES (?, ?)",
+                                   [(source_url or url, json.dumps(record, ensure_ascii=False)) for record in records])
+            if fingerprint is not None:
+                self._conn.execute("INSERT OR REPLACE INTO fingerprints (url, simhash) VALUES (?, ?)",
+                                   (source_url or url, str(fingerprint)))
+            if meta:
+                self._conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", list(meta.items()))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,61 @@
+"""
+Cooperative stop and pause for running crawls.
+
+A `CrawlControl` is handed to a crawl and flipped from another thread (the GUI's
+buttons, the CLI's SIGINT handler). The crawl engines check it between pages and
+every wait inside a crawl (per-host request spacing, Gemini rate limiting and
+retry backoff) is cut short by a stop, so a stopped crawl winds down within a
+fraction of a second instead of finishing its budget. Work already in progress
+on a page is not interrupted; the page is either completed or left for --resume.
+"""
+
+import threading
+
+PAUSE_POLL_SECONDS = 0.2 # Waits are sliced so signal handlers on the main thread still run promptly
+
+class CrawlCancelled(Exception):
+    """Raised inside a crawl once a stop was requested, abandoning the page in progress."""
+
+class CrawlControl:
+    """Thread-safe stop/pause switch shared by a crawl and whatever controls it."""
+
+    def __init__(self):
+        self._stopped = threading.Event()
+        self._running = threading.Event() # Cleared while paused
+        self._running.set()
+
+    @property
+    def stopped(self):
+        return self._stopped.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def stop(self):
+        self._stopped.set()
+        self._running.set() # Wake anything waiting out a pause
+
+    def pause(self):
+        if not self.stopped:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def wait_while_paused(self):
+        """Blocks while paused. Returns False if the crawl was stopped."""
+        while not self._running.wait(PAUSE_POLL_SECONDS):
+            pass
+        return not self.stopped
+
+    def sleep(self, seconds):
+        """Sleeps for `seconds`, returning False as soon as the crawl is stopped."""
+        if seconds > 0 and self._stopped.wait(seconds):
+            return False
+        return not self.stopped
+
+    def check(self):
+        """Waits out a pause, then raises CrawlCancelled if the crawl was stopped."""
+        if not self.wait_while_paused():
+            raise CrawlCancelled()
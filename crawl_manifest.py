@@ -0,0 +1,104 @@
+"""
+Manifests of crawl jobs for batch mode.
+
+A manifest lists the sites to crawl in one process. It is either YAML (needs
+PyYAML) or JSONL with one site per line. YAML may hold a plain list of sites or
+a mapping with `sites` and optional `defaults` applied to every site:
+
+    defaults:
+      num_pages: 50
+      exclude: ['/search', '[?&]page=']
+    sites:
+      - start_url: https://docs.example.com
+        num_pages: 200
+        include: ['/docs/']
+        output_file: out/example.jsonl
+
+Per-site keys: start_url (required), num_pages, output_file, state_file,
+include and exclude (regular expressions matched anywhere in a URL).
+"""
+
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+try:
+    import yaml
+except ImportError: # Optional: only needed for YAML manifests
+    yaml = None
+
+SITE_KEYS = ('start_url', 'num_pages', 'output_file', 'state_file', 'include', 'exclude')
+
+def make_url_filter(include=None, exclude=None):
+    """
+    Returns a predicate that accepts URLs matching at least one `include`
+    pattern (if any are given) and no `exclude` pattern, or None when there is
+    nothing to filter. Raises re.error for an invalid pattern.
+    """
+    include_patterns = [re.compile(pattern) for pattern in include or ()]
+    exclude_patterns = [re.compile(pattern) for pattern in exclude or ()]
+    if not include_patterns and not exclude_patterns:
+        return None
+
+    def url_filter(url):
+        if include_patterns and not any(pattern.search(url) for pattern in include_patterns):
+            return False
+        return not any(pattern.search(url) for pattern in exclude_patterns)
+    return url_filter
+
+def _read_entries(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("YAML manifests require the 'PyYAML' package (pip install pyyaml).")
+            document = yaml.safe_load(f) or []
+            if isinstance(document, dict):
+                return document.get('sites') or [], document.get('defaults') or {}
+            return document, {}
+        entries = []
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Line {line_number} of {path} is not valid JSON: {e}")
+        return entries, {}
+
+def load_manifest(path, default_num_pages, output_format='json'):
+    """
+    Reads a manifest into a list of site dicts with every key of SITE_KEYS
+    filled in. Sites without an output_file write to `<host>.<output_format>`.
+    Raises ValueError for a malformed manifest and IOError if it can't be read.
+    """
+    entries, defaults = _read_entries(path)
+    if not isinstance(entries, list) or not isinstance(defaults, dict):
+        raise ValueError(f"{path} must contain a list of sites.")
+    sites = []
+    output_files = set()
+    for number, entry in enumerate(entries, start=1):
+        if isinstance(entry, str):
+            entry = {'start_url': entry}
+        if not isinstance(entry, dict) or not entry.get('start_url'):
+            raise ValueError(f"Site {number} in {path} has no start_url.")
+        site = dict(defaults)
+        site.update(entry)
+        unknown = set(site) - set(SITE_KEYS)
+        if unknown:
+            raise ValueError(f"Site {number} in {path} has unknown keys: {', '.join(sorted(unknown))}")
+        for key in ('include', 'exclude'):
+            if isinstance(site.get(key), str):
+                site[key] = [site[key]]
+        site.setdefault('num_pages', default_num_pages)
+        site.setdefault('include', None)
+        site.setdefault('exclude', None)
+        site.setdefault('state_file', None)
+        if not site.get('output_file'):
+            host = urlparse(site['start_url'] if '://' in site['start_url'] else f"https://{site['start_url']}").netloc
+            site['output_file'] = f"{host.replace(':', '_')}.{output_format}"
+        output_path = os.path.abspath(site['output_file'])
+        if output_path in output_files:
+            raise ValueError(f"Site {number} in {path} writes to {site['output_file']}, which another site already uses.")
+        output_files.add(output_path)
+        sites.append(site)
+    return sites
@@ -0,0 +1,133 @@
+"""
+Structured crawl metrics.
+
+While a crawl runs, `run_web_to_json_conversion(..., metrics_callback=...)` calls
+the callback with one event dict per thing that happened, next to the free-text
+progress log. Every event has an "event" name and a monotonic "time":
+
+    crawl_started   start_url, num_pages, page_count (pages already collected on resume)
+    fetch           url, seconds, ok, not_modified
+    gemini          seconds, ok
+    page            url, records, page_count, record_count, queued
+    queues          depths ({stage: items waiting})
+    crawl_finished  page_count, record_count, seconds
+
+Events arrive on crawl threads. `CrawlMetrics` folds them into counters and
+rolling windows under a lock, so a UI can poll `snapshot()` at its own refresh
+rate instead of redrawing for every event.
+"""
+
+import threading
+import time
+from collections import deque
+
+THROUGHPUT_WINDOW = 30 # Seconds of page completions the rolling throughput is computed over
+LATENCY_SAMPLES = 500 # Most recent fetch/Gemini latencies kept for percentiles
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of `samples`, or None when there are none."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class CrawlMetrics:
+    """Thread-safe aggregate of metrics events. Pass `record` as the metrics callback."""
+
+    def __init__(self, window_seconds=THROUGHPUT_WINDOW):
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.start_url = None
+            self.num_pages = 0
+            self.started = None
+            self.ended = None
+            self.finished = False
+            self.initial_page_count = 0
+            self.page_count = 0
+            self.record_count = 0
+            self.queued = 0
+            self.queue_depths = {}
+            self.fetches = 0
+            self.fetch_errors = 0
+            self.gemini_calls = 0
+            self.gemini_errors = 0
+            self._samples = deque() # (time, page_count), oldest first, spanning about one window
+            self._fetch_latencies = deque(maxlen=LATENCY_SAMPLES)
+            self._gemini_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, event):
+        kind = event["event"]
+        with self._lock:
+            if kind == 'crawl_started':
+                self.start_url = event["start_url"]
+                self.num_pages = event["num_pages"]
+                self.started = event["time"]
+                self.ended = None
+                self.finished = False
+                self.page_count = self.initial_page_count = event["page_count"]
+                self._samples = deque([(event["time"], event["page_count"])])
+            elif kind == 'fetch':
+                self.fetches += 1
+                if event["ok"]:
+                    self._fetch_latencies.append(event["seconds"])
+                else:
+                    self.fetch_errors += 1
+            elif kind == 'gemini':
+                self.gemini_calls += 1
+                if event["ok"]:
+                    self._gemini_latencies.append(event["seconds"])
+                else:
+                    self.gemini_errors += 1
+            elif kind == 'page':
+                self.page_count = event["page_count"]
+                self.record_count = event["record_count"]
+                self.queued = event["queued"]
+                self._samples.append((event["time"], event["page_count"]))
+            elif kind == 'queues':
+                self.queue_depths = dict(event["depths"])
+            elif kind == 'crawl_finished':
+                self.page_count = event["page_count"]
+                self.record_count = event["record_count"]
+                self.ended = event["time"]
+                self.finished = True
+
+    def snapshot(self, now=None):
+        """Returns the current metrics as a dict. Rates are per second; missing values are None."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            # Keep the newest sample at least a window old as the anchor the rate is measured from
+            while len(self._samples) > 1 and self._samples[1][0] <= now - self.window_seconds:
+                self._samples.popleft()
+            elapsed = (self.ended or now) - self.started if self.started is not None else 0.0
+            pages_per_second = None
+            if self.finished:
+                # Average over the whole run once it is over
+                pages_per_second = (self.page_count - self.initial_page_count) / elapsed if elapsed > 0 else None
+            elif self._samples and now > self._samples[0][0]:
+                anchor_time, anchor_pages = self._samples[0]
+                pages_per_second = max(0, self.page_count - anchor_pages) / (now - anchor_time)
+            eta_seconds = None
+            if pages_per_second and not self.finished:
+                eta_seconds = max(0, self.num_pages - self.page_count) / pages_per_second
+            return {
+                "start_url": self.start_url,
+                "num_pages": self.num_pages,
+                "page_count": self.page_count,
+                "record_count": self.record_count,
+                "queued": self.queued,
+                "queue_depths": dict(self.queue_depths),
+                "elapsed_seconds": elapsed,
+                "finished": self.finished,
+                "pages_per_second": pages_per_second,
+                "eta_seconds": eta_seconds,
+                "fetch_p50": percentile(self._fetch_latencies, 0.5),
+                "fetch_p95": percentile(self._fetch_latencies, 0.95),
+                "gemini_p50": percentile(self._gemini_latencies, 0.5),
+                "gemini_p95": percentile(self._gemini_latencies, 0.95),
+                "fetch_error_rate": self.fetch_errors / self.fetches if self.fetches else None,
+                "gemini_error_rate": self.gemini_errors / self.gemini_calls if self.gemini_calls else None,
+            }
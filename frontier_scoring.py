@@ -0,0 +1,145 @@
+"""
+Priority scores for crawl frontier URLs.
+
+A plain FIFO frontier spends a page budget in discovery order, which on most
+sites means tag listings, pagination and navigation stubs long before the
+articles they link to. `UrlScorer` ranks a candidate URL from cheap signals
+that need no fetch:
+
+    depth           path segments; shallow hubs first, without burying content
+    path patterns   tag/category/pagination/search/account paths score low,
+                    docs/blog/article style paths high
+    query           every query parameter costs a little (sort/filter variants)
+    anchor text     "next", "2", "login" score low, descriptive text high
+    sitemap         listed in the site's sitemap.xml, plus a bonus for a recent lastmod
+    sibling yield   records per page produced by pages in the same directory so
+                    far (digits normalized, so /2023/05/ and /2024/01/ pool together)
+
+Higher scores are fetched first. Every weight can be overridden, and a weight
+of 0 switches its signal off.
+"""
+
+import copy
+import re
+import time
+from urllib.parse import urlparse
+
+DEFAULT_WEIGHTS = {
+    "depth": -0.25, # Per path segment
+    "low_value_path": -3.0,
+    "content_path": 1.0,
+    "query_param": -0.5, # Per query parameter
+    "nav_anchor": -2.0,
+    "descriptive_anchor": 1.0,
+    "sitemap": 1.5,
+    "lastmod": 1.0, # Scaled by freshness: the full bonus for today, half for a year ago
+    "sibling_yield": 2.0, # Scaled by how far the directory's yield is from the prior
+}
+
+LOW_VALUE_PATH = re.compile(
+    r"/(tags?|categor(y|ies)|authors?|archives?|page|search|login|log-in|signin|sign-in|signup|register|"
+    r"account|cart|checkout|feed|rss|print|share|comments?|wp-admin|wp-json)([/?]|$)"
+    r"|[?&](page|p|paged|start|offset|sort|order|orderby|filter|replytocom|share|print)=", re.IGNORECASE)
+CONTENT_PATH = re.compile(
+    r"/(docs?|documentation|guides?|tutorials?|articles?|blog|posts?|news|faq|help|learn|manual|reference|"
+    r"kb|knowledge-?base|wiki|how-?to)(/|$)", re.IGNORECASE)
+NAV_ANCHORS = {
+    "next", "previous", "prev", "more", "read more", "home", "back", "top", "back to top", "skip to content",
+    "older posts", "newer posts", "older", "newer", "first", "last", "login", "log in", "sign in", "sign up",
+    "register", "search", "menu", "share", "print", "rss", "feed", "tweet", "subscribe", "contact",
+    "privacy policy", "terms", "cookies", "«", "»", "‹", "›", "<", ">", "...", "…",
+}
+DESCRIPTIVE_ANCHOR_WORDS = 3
+DIGITS = re.compile(r"\d+")
+
+PRIOR_YIELD = 1.0 # Records per page expected of a directory nothing is known about yet
+PRIOR_PAGES = 2 # Weight of the prior, in pages
+MAX_YIELD = 2.0 # Records per page above this earn no further bonus
+LASTMOD_HALF_LIFE_DAYS = 365
+
+def directory_key(url):
+    """Host plus parent directory of `url`'s path, with digit runs normalized."""
+    parsed = urlparse(url)
+    directory = parsed.path.rstrip('/').rsplit('/', 1)[0]
+    return f"{parsed.netloc.lower()}{DIGITS.sub('#', directory)}/"
+
+class UrlScorer:
+    """
+    Scores frontier URLs. Sibling yields are learned from `record_page` as pages
+    complete; `version` counts those updates so a frontier knows when the scores
+    of queued URLs may have changed. Not thread-safe: the crawl's coordinator
+    owns it together with the frontier.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights:
+            unknown = set(weights) - set(DEFAULT_WEIGHTS)
+            if unknown:
+                raise ValueError(f"Unknown frontier score weights: {', '.join(sorted(unknown))}")
+            self.weights.update(weights)
+        self.sitemap = {} # URL key -> freshness bonus of its lastmod, fixed when added so scores don't drift
+        self.version = 0
+        self._yields = {} # directory key -> [pages, records]
+
+    def add_sitemap_entry(self, key, lastmod=None):
+        """Marks `key` as listed in a sitemap, with its lastmod in epoch seconds if known."""
+        bonus = 0.0
+        if lastmod is not None:
+            age_days = max(0.0, (time.time() - lastmod) / 86400)
+            bonus = self.weights["lastmod"] / (1 + age_days / LASTMOD_HALF_LIFE_DAYS)
+        self.sitemap[key] = bonus
+
+    def record_page(self, url, records):
+        """Learns from a completed page: `records` is the number of useful records it produced."""
+        stats = self._yields.setdefault(directory_key(url), [0, 0])
+        stats[0] += 1
+        stats[1] += records
+        self.version += 1
+
+    def yield_state(self):
+        """The learned sibling yields as a JSON-serializable dict, so a resumed crawl can restore them."""
+        return {"version": self.version, "yields": self._yields}
+
+    def load_yield_state(self, state):
+        """Restores what yield_state() returned."""
+        self.version = state["version"]
+        self._yields = {key: list(stats) for key, stats in state["yields"].items()}
+
+    def snapshot(self):
+        """A copy that keeps scoring with the sibling yields learned so far."""
+        frozen = copy.copy(self)
+        frozen._yields = {key: list(stats) for key, stats in self._yields.items()}
+        return frozen
+
+    def sibling_yield(self, url):
+        """Smoothed records per page of `url`'s directory so far."""
+        pages, records = self._yields.get(directory_key(url), (0, 0))
+        return (records + PRIOR_YIELD * PRIOR_PAGES) / (pages + PRIOR_PAGES)
+
+    def score(self, url, key=None, anchor_text=None):
+        """Priority of `url`, higher first. `key` is its dedup key, used to look it up in the sitemap."""
+        weights = self.weights
+        parsed = urlparse(url)
+        path_and_query = f"{parsed.path}?{parsed.query}" if parsed.query else parsed.path
+        score = weights["depth"] * sum(1 for segment in parsed.path.split('/') if segment)
+        if LOW_VALUE_PATH.search(path_and_query):
+            score += weights["low_value_path"]
+        elif CONTENT_PATH.search(parsed.path):
+            score += weights["content_path"]
+        if parsed.query:
+            score += weights["query_param"] * (parsed.query.count('&') + 1)
+
+        if anchor_text:
+            normalized = " ".join(anchor_text.split()).lower()
+            if normalized in NAV_ANCHORS or normalized.isdigit():
+                score += weights["nav_anchor"]
+            elif normalized.count(" ") + 1 >= DESCRIPTIVE_ANCHOR_WORDS:
+                score += weights["descriptive_anchor"]
+
+        if self.sitemap and (key or url) in self.sitemap:
+            score += weights["sitemap"] + self.sitemap[key or url]
+
+        if self._yields:
+            score += weights["sibling_yield"] * (min(self.sibling_yield(url), MAX_YIELD) - PRIOR_YIELD)
+        return score
@@ -1,17 +1,42 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, messagebox
 import threading
+import queue
 import json
 import google.generativeai as genai
 
 # Import the refactored agent logic
-from web_to_json_agent import run_web_to_json_conversion, configure_gemini, DEFAULT_MAX_PAGES, ensure_scheme
+from web_to_json_agent import (run_web_to_json_conversion, configure_gemini, DEFAULT_MAX_PAGES, ensure_scheme,
+                               CRAWL_MODES, DEFAULT_CONCURRENCY, DEFAULT_PER_HOST_CONCURRENCY)
+from crawl_metrics import CrawlMetrics
+from crawl_control import CrawlControl
+
+# Log delivery: worker threads post to a queue and the Tk thread drains it on a timer
+LOG_POLL_MS = 100
+LOG_MAX_LINES = 5000 # Older lines are dropped from the log widget
+
+METRICS_REFRESH_MS = 500 # The metrics panel redraws at this rate, however many events arrive
+
+def format_duration(seconds):
+    if seconds is None:
+        return "--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def format_latency(p50, p95):
+    if p50 is None:
+        return "--"
+    return f"p50 {p50 * 1000:.0f} ms / p95 {p95 * 1000:.0f} ms"
+
+def format_rate(rate):
+    return "--" if rate is None else f"{rate:.1%}"
 
 class ModernWebToJsonApp:
     def __init__(self, root_window):
         self.root = root_window
         self.root.title("Web Content to LLM JSON v2.0")
-        self.root.geometry("700x800") # Adjusted size
+        self.root.geometry("700x900") # Adjusted size
 
         self.style = ttk.Style()
         available_themes = self.style.theme_names()
@@ -43,11 +68,19 @@ class ModernWebToJsonApp:
         self.gemini_model_var = tk.StringVar(value='gemini-1.5-flash-latest')
         self.request_delay_var = tk.DoubleVar(value=2.0) # Allow float for delay
         self.max_chars_var = tk.IntVar(value=28000)
+        self.crawl_mode_var = tk.StringVar(value='sequential')
+        self.concurrency_var = tk.IntVar(value=DEFAULT_CONCURRENCY)
+        self.per_host_concurrency_var = tk.IntVar(value=DEFAULT_PER_HOST_CONCURRENCY)
         
         self.generated_data = None
         self.processing_thread = None
+        self.crawl_control = None # CrawlControl of the running crawl, for the Stop/Pause buttons
+        self.log_queue = queue.SimpleQueue() # Messages, or callables to run on the Tk thread
+        self.metrics = CrawlMetrics() # Fed by the crawl thread, read by refresh_metrics
 
         self.setup_ui()
+        self.root.after(LOG_POLL_MS, self.pump_log_queue)
+        self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
 
     def setup_ui(self):
         # Main container frame
@@ -102,6 +135,18 @@ class ModernWebToJsonApp:
         ttk.Label(advanced_settings_frame, text="Max Chars (Gemini):").grid(row=1, column=0, sticky="w", **self.widget_padding)
         max_chars_spinbox = ttk.Spinbox(advanced_settings_frame, from_=1000, to=100000, increment=1000, textvariable=self.max_chars_var, width=10)
         max_chars_spinbox.grid(row=1, column=1, sticky="ew", **self.widget_padding)
+
+        ttk.Label(advanced_settings_frame, text="Crawl Mode:").grid(row=1, column=2, sticky="w", **self.widget_padding)
+        crawl_mode_dropdown = ttk.Combobox(advanced_settings_frame, textvariable=self.crawl_mode_var, values=list(CRAWL_MODES), width=10, state="readonly")
+        crawl_mode_dropdown.grid(row=1, column=3, sticky="w", **self.widget_padding)
+
+        ttk.Label(advanced_settings_frame, text="Concurrency:").grid(row=2, column=0, sticky="w", **self.widget_padding)
+        concurrency_spinbox = ttk.Spinbox(advanced_settings_frame, from_=1, to=64, textvariable=self.concurrency_var, width=7)
+        concurrency_spinbox.grid(row=2, column=1, sticky="w", **self.widget_padding)
+
+        ttk.Label(advanced_settings_frame, text="Per-Host Limit:").grid(row=2, column=2, sticky="w", **self.widget_padding)
+        per_host_spinbox = ttk.Spinbox(advanced_settings_frame, from_=1, to=16, textvariable=self.per_host_concurrency_var, width=7)
+        per_host_spinbox.grid(row=2, column=3, sticky="w", **self.widget_padding)
         
         advanced_settings_frame.columnconfigure(1, weight=1)
         advanced_settings_frame.columnconfigure(3, weight=1)
@@ -113,12 +158,35 @@ class ModernWebToJsonApp:
         self.start_button = ttk.Button(action_frame, text="Start Processing", command=self.start_processing_thread, state=tk.DISABLED)
         self.start_button.pack(side=tk.LEFT, padx=(0,10))
         
+        self.pause_button = ttk.Button(action_frame, text="Pause", command=self.toggle_pause, state=tk.DISABLED)
+        self.pause_button.pack(side=tk.LEFT, padx=(0,10))
+
+        self.stop_button = ttk.Button(action_frame, text="Stop", command=self.stop_processing, state=tk.DISABLED)
+        self.stop_button.pack(side=tk.LEFT, padx=(0,10))
+
         self.download_button = ttk.Button(action_frame, text="Save Result Again", command=self.save_json_file, state=tk.DISABLED)
         self.download_button.pack(side=tk.LEFT)
 
         # Themed button style (example)
         self.style.configure('Accent.TButton', font=('Segoe UI', 10, 'bold'), padding=(self.widget_padding['padx'], self.widget_padding['pady']))
 
+        # --- Live Metrics ---
+        metrics_frame = ttk.LabelFrame(main_container, text="Live Metrics", padding=(self.frame_padding["padx"], self.frame_padding["pady"]))
+        metrics_frame.pack(fill=tk.X, expand=False, pady=(0,10))
+        self.progress_bar = ttk.Progressbar(metrics_frame, orient=tk.HORIZONTAL, mode='determinate')
+        self.progress_bar.grid(row=0, column=0, columnspan=4, sticky="ew", padx=self.widget_padding["padx"], pady=(0,5))
+        self.metric_vars = {}
+        metric_labels = [("pages", "Pages:"), ("throughput", "Throughput:"), ("eta", "ETA:"),
+                         ("elapsed", "Elapsed:"), ("fetch_latency", "Fetch Latency:"), ("gemini_latency", "Gemini Latency:"),
+                         ("errors", "Errors:"), ("queues", "Queues:")]
+        for index, (key, label) in enumerate(metric_labels):
+            row, column = 1 + index // 2, (index % 2) * 2
+            ttk.Label(metrics_frame, text=label).grid(row=row, column=column, sticky="w", padx=self.widget_padding["padx"])
+            self.metric_vars[key] = tk.StringVar(value="--")
+            ttk.Label(metrics_frame, textvariable=self.metric_vars[key]).grid(row=row, column=column + 1, sticky="w", padx=self.widget_padding["padx"])
+        metrics_frame.columnconfigure(1, weight=1)
+        metrics_frame.columnconfigure(3, weight=1)
+
         # --- Log Area ---
         log_frame = ttk.LabelFrame(main_container, text="Progress Log", padding=(self.frame_padding["padx"], self.frame_padding["pady"]))
         log_frame.pack(fill=tk.BOTH, expand=True)
@@ -154,6 +222,9 @@ class ModernWebToJsonApp:
         model_to_use = self.gemini_model_var.get()
         delay_val = self.request_delay_var.get()
         max_chars_val = self.max_chars_var.get()
+        crawl_mode_val = self.crawl_mode_var.get()
+        concurrency_val = self.concurrency_var.get()
+        per_host_val = self.per_host_concurrency_var.get()
 
         if num_pages_val <= 0:
             messagebox.showerror("Input Error", "Number of pages must be a positive integer.")
@@ -172,16 +243,22 @@ class ModernWebToJsonApp:
         self.set_api_key_button.config(state=tk.DISABLED)
         self.download_button.config(state=tk.DISABLED)
             
+        self.metrics.reset()
+        self.crawl_control = CrawlControl()
+        self.pause_button.config(text="Pause", state=tk.NORMAL)
+        self.stop_button.config(state=tk.NORMAL)
         self.log_message(f"Starting process for {start_url_val}, up to {num_pages_val} pages.")
         self.log_message(f"Output will be saved to: {self.output_file_path}")
 
         self.processing_thread = threading.Thread(target=self.run_agent_logic, 
                                             args=(start_url_val, num_pages_val, model_to_use, 
-                                                  delay_val, max_chars_val))
+                                                  delay_val, max_chars_val, crawl_mode_val,
+                                                  concurrency_val, per_host_val))
         self.processing_thread.daemon = True
         self.processing_thread.start()
 
-    def run_agent_logic(self, start_url_val, num_pages_val, model_val, delay_val, max_chars_val):
+    def run_agent_logic(self, start_url_val, num_pages_val, model_val, delay_val, max_chars_val,
+                        crawl_mode_val, concurrency_val, per_host_val):
         try:
             self.generated_data = run_web_to_json_conversion(
                 start_url_from_user=start_url_val,
@@ -191,13 +268,17 @@ class ModernWebToJsonApp:
                 progress_callback=self.log_message,
                 model_name_to_use=model_val,
                 request_delay_seconds=delay_val,
-                max_chars_for_gemini=max_chars_val
+                max_chars_for_gemini=max_chars_val,
+                crawl_mode=crawl_mode_val,
+                concurrency=concurrency_val,
+                per_host_concurrency=per_host_val,
+                metrics_callback=self.metrics.record,
+                control=self.crawl_control,
+                timing_report=f"{self.output_file_path}.timings.json"
             )
             self.log_message("Processing finished.")
             if self.generated_data is not None: # Check if data is None (e.g. if run_web_to_json_conversion returns [] on error)
                  self.log_message(f"Successfully processed. Data saved to {self.output_file_path}")
-                 if self.generated_data: # Only enable download if there's actual data
-                    self.download_button.config(state=tk.NORMAL)
             else:
                 self.log_message("Processing completed, but no data was generated or an error occurred. Check logs.")
 
@@ -206,18 +287,88 @@ class ModernWebToJsonApp:
             import traceback
             self.log_message(traceback.format_exc()) # Log full traceback to GUI log
         finally:
-            self.start_button.config(state=tk.NORMAL)
-            self.set_api_key_button.config(state=tk.NORMAL)
+            self.run_in_ui(self.processing_finished)
+
+    def processing_finished(self):
+        if self.generated_data:
+            self.download_button.config(state=tk.NORMAL)
+        self.pause_button.config(text="Pause", state=tk.DISABLED)
+        self.stop_button.config(state=tk.DISABLED)
+        self.start_button.config(state=tk.NORMAL)
+        self.set_api_key_button.config(state=tk.NORMAL)
+
+    def toggle_pause(self):
+        if self.crawl_control is None:
+            return
+        if self.crawl_control.paused:
+            self.crawl_control.resume()
+            self.pause_button.config(text="Pause")
+            self.log_message("Resuming crawl.")
+        else:
+            self.crawl_control.pause()
+            self.pause_button.config(text="Resume")
+            self.log_message("Pausing crawl after the pages in progress...")
+
+    def stop_processing(self):
+        if self.crawl_control is None:
+            return
+        self.crawl_control.stop()
+        self.pause_button.config(text="Pause", state=tk.DISABLED)
+        self.stop_button.config(state=tk.DISABLED)
+        self.log_message("Stopping crawl. Records collected so far will be saved...")
 
     def log_message(self, message):
-        if hasattr(self, 'log_text') and self.log_text.winfo_exists():
-            self.log_text.configure(state='normal')
-            self.log_text.insert(tk.END, str(message) + "\n") # Ensure message is string
-            self.log_text.see(tk.END)
-            self.log_text.configure(state='disabled')
-            self.root.update_idletasks() 
-        else:
-            print(str(message)) 
+        """Queues a message for the log widget. Safe to call from any thread and never blocks."""
+        self.log_queue.put(str(message)) # Ensure message is string
+
+    def run_in_ui(self, func):
+        """Runs `func` on the Tk thread, after the messages logged before it."""
+        self.log_queue.put(func)
+
+    def pump_log_queue(self):
+        """Drains queued messages into the log widget in one batch, then reschedules itself."""
+        lines = []
+        callbacks = []
+        for _ in range(self.log_queue.qsize()):
+            item = self.log_queue.get_nowait()
+            if callable(item):
+                callbacks.append(item)
+            else:
+                lines.append(item)
+        if lines:
+            self.append_log_lines(lines)
+        for func in callbacks:
+            func()
+        self.root.after(LOG_POLL_MS, self.pump_log_queue)
+
+    def append_log_lines(self, lines):
+        lines = lines[-LOG_MAX_LINES:]
+        self.log_text.configure(state='normal')
+        self.log_text.insert(tk.END, "\n".join(lines) + "\n")
+        # Keep the widget to LOG_MAX_LINES lines so memory stays flat on long crawls
+        line_count = int(self.log_text.index('end-1c').split('.')[0]) - 1
+        if line_count > LOG_MAX_LINES:
+            self.log_text.delete('1.0', f"{line_count - LOG_MAX_LINES + 1}.0")
+        self.log_text.see(tk.END)
+        self.log_text.configure(state='disabled')
+
+    def refresh_metrics(self):
+        """Redraws the metrics panel from a snapshot, then reschedules itself."""
+        snapshot = self.metrics.snapshot()
+        if snapshot["start_url"] is not None:
+            num_pages = max(1, snapshot["num_pages"])
+            self.progress_bar.configure(maximum=num_pages, value=min(snapshot["page_count"], num_pages))
+            self.metric_vars["pages"].set(f"{snapshot['page_count']}/{snapshot['num_pages']} ({snapshot['record_count']} records, {snapshot['queued']} queued)")
+            rate = snapshot["pages_per_second"]
+            self.metric_vars["throughput"].set("--" if rate is None else f"{rate:.2f} pages/s")
+            self.metric_vars["eta"].set("done" if snapshot["finished"] else format_duration(snapshot["eta_seconds"]))
+            self.metric_vars["elapsed"].set(format_duration(snapshot["elapsed_seconds"]))
+            self.metric_vars["fetch_latency"].set(format_latency(snapshot["fetch_p50"], snapshot["fetch_p95"]))
+            self.metric_vars["gemini_latency"].set(format_latency(snapshot["gemini_p50"], snapshot["gemini_p95"]))
+            self.metric_vars["errors"].set(f"fetch {format_rate(snapshot['fetch_error_rate'])} | Gemini {format_rate(snapshot['gemini_error_rate'])}")
+            depths = snapshot["queue_depths"]
+            self.metric_vars["queues"].set(" | ".join(f"{name} {depth}" for name, depth in depths.items()) if depths else "--")
+        self.root.after(METRICS_REFRESH_MS, self.refresh_metrics)
 
     def save_json_file(self):
         if not self.generated_data:
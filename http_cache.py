@@ -0,0 +1,143 @@
+"""
+Local HTTP cache for conditional re-crawls.
+
+Pages that come with an ETag or Last-Modified validator are stored (body
+zlib-compressed) together with what the crawl derived from them: the output
+record and the outgoing links. On the next crawl the validators are sent as
+If-None-Match / If-Modified-Since, and a 304 Not Modified lets the crawler reuse
+the stored body and derived results instead of downloading, extracting and
+sending the page to Gemini again.
+
+The cache is bounded both by total size (least recently used entries go first)
+and by age.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from sqlite_lru import evict_lru
+
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    final_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB NOT NULL,
+    body_size INTEGER NOT NULL,
+    derivation_key TEXT,
+    derived TEXT,
+    stored_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_used ON pages (last_used);
+"""
+
+class HttpCache:
+    """SQLite-backed store of page bodies, validators and derived crawl results."""
+
+    def __init__(self, path, max_mb=DEFAULT_MAX_MB, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.revalidated = 0 # 304 responses served from the cache
+        self.bytes_saved = 0 # Body bytes not downloaded thanks to 304s
+        # Shared by fetcher threads in the async and pipeline engines
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - self.max_age_seconds,))
+            self._conn.commit()
+            self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM pages").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def lookup(self, url):
+        """Returns the cached entry for `url` as a dict, or None if absent or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, etag, last_modified, body, body_size, derivation_key, derived, stored_at "
+                "FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            final_url, etag, last_modified, body, body_size, derivation_key, derived, stored_at = row
+            if stored_at < time.time() - self.max_age_seconds:
+                self._delete(url)
+                self._conn.commit()
+                return None
+        return {
+            "final_url": final_url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": zlib.decompress(body).decode('utf-8'),
+            "body_size": body_size,
+            "derivation_key": derivation_key,
+            "derived": json.loads(derived) if derived else None,
+        }
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store_response(self, url, final_url, etag, last_modified, body_text):
+        """Stores a fresh 200 response. Derived results of any older version are dropped."""
+        encoded = body_text.encode('utf-8')
+        compressed = zlib.compress(encoded)
+        now = time.time()
+        with self._lock:
+            self._delete(url)
+            self._conn.execute(
+                "INSERT INTO pages (url, final_url, etag, last_modified, body, body_size, stored_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, final_url, etag, last_modified, compressed, len(encoded), now, now))
+            self.total_bytes += len(compressed)
+            self._evict()
+            self._conn.commit()
+
+    def mark_not_modified(self, url, body_size):
+        """Records a 304 for `url`: refreshes its age and counts the bytes saved."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET stored_at = ?, last_used = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+            self.revalidated += 1
+            self.bytes_saved += body_size
+
+    def store_derived(self, url, derivation_key, derived):
+        """Attaches the crawl's results for `url` (record and links) to its cached response."""
+        with self._lock:
+            self._conn.execute("UPDATE pages SET derivation_key = ?, derived = ? WHERE url = ?",
+                               (derivation_key, json.dumps(derived, ensure_ascii=False), url))
+            self._conn.commit()
+
+    def _delete(self, url):
+        row = self._conn.execute("SELECT LENGTH(body) FROM pages WHERE url = ?", (url,)).fetchone()
+        if row:
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.total_bytes -= row[0]
+
+    def _evict(self):
+        self.total_bytes, _ = evict_lru(self._conn, "pages", "url", "LENGTH(body)", self.total_bytes, self.max_bytes)
+
+    def stats_summary(self):
+        return (f"{self.revalidated} pages not modified, {self.bytes_saved / 1024:.1f} KB saved, "
+                f"{self.total_bytes / (1024 * 1024):.1f} MB stored")
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
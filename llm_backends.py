@@ -0,0 +1,217 @@
+"""
+Pluggable LLM backends for Q&A generation.
+
+A backend is one model configuration: Gemini through the google-generativeai
+SDK's generative service client, or any server speaking the OpenAI chat
+completions API (llama.cpp, vLLM, Ollama, LM Studio, ...). Each backend owns a fixed pool of client instances; a request
+checks one out for its duration, so up to `pool_size` requests per backend are
+in flight at once and no client is shared between threads. Clients carry their
+backend's own credentials, so backends with different API keys can be mixed.
+
+Several backends can be configured for one run. They are listed in order of
+preference, cheapest first, in a YAML (needs PyYAML) or JSON file:
+
+    - name: local
+      type: openai
+      base_url: http://localhost:8000/v1
+      model: llama-3.1-8b-instruct
+      pool_size: 8
+      max_prompt_tokens: 6000   # longer prompts skip this backend
+    - name: gemini
+      type: gemini
+      model: gemini-1.5-flash-latest
+
+Keys: name, type ('gemini' or 'openai'), model (required), base_url (openai),
+api_key or api_key_env, pool_size, max_prompt_tokens, requests_per_minute and
+tokens_per_minute (openai; Gemini uses the shared GEMINI_LIMITS), timeout,
+max_tokens and temperature (openai).
+"""
+
+import json
+import os
+import queue
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+import google.generativeai as genai
+import requests
+from google.ai import generativelanguage as glm # Installed with google-generativeai
+
+from rate_limiter import RateLimiter
+
+try:
+    import yaml
+except ImportError: # Optional: only needed for YAML backend files
+    yaml = None
+
+BACKEND_TYPES = ('gemini', 'openai')
+DEFAULT_POOL_SIZE = 4 # Concurrent requests per backend
+CONFIG_KEYS = ('name', 'type', 'model', 'base_url', 'api_key', 'api_key_env', 'pool_size', 'max_prompt_tokens',
+               'requests_per_minute', 'tokens_per_minute', 'timeout', 'max_tokens', 'temperature')
+
+class QuotaExceeded(Exception):
+    """A backend's rate limit or quota was hit. `retry_after` is the server's requested delay in seconds, if any."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class ClientPool:
+    """
+    A fixed set of client instances, checked out one per in-flight request.
+    `close_client(client)` releases one; by default its close() method is called.
+    """
+
+    def __init__(self, factory, size, close_client=None):
+        self.size = max(1, size)
+        self._close_client = close_client
+        self._idle = queue.LifoQueue() # LIFO reuses the most recently used (warmest) client first
+        for _ in range(self.size):
+            self._idle.put(factory())
+
+    @contextmanager
+    def client(self):
+        client = self._idle.get() # Blocks while all clients are busy
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def close(self):
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            if self._close_client is not None:
+                self._close_client(client)
+                continue
+            close = getattr(client, 'close', None)
+            if close:
+                close()
+
+class LLMBackend(ABC):
+    """
+    One model configuration. Subclasses implement `_generate(client, prompt)`,
+    returning (text, total_tokens or None). `limiter` is the backend's own
+    rate_limiter.RateLimiter, or None to use the caller's default.
+    """
+
+    def __init__(self, name, model_name, pool, max_prompt_tokens=None, limiter=None):
+        self.name = name
+        self.model_name = model_name
+        self.pool = pool
+        self.max_prompt_tokens = max_prompt_tokens
+        self.limiter = limiter
+
+    def accepts(self, prompt_tokens):
+        return self.max_prompt_tokens is None or prompt_tokens <= self.max_prompt_tokens
+
+    def generate(self, prompt):
+        with self.pool.client() as client:
+            return self._generate(client, prompt)
+
+    @abstractmethod
+    def _generate(self, client, prompt):
+        """Sends `prompt` with a checked-out `client`; returns (text, total_tokens or None)."""
+
+    def close(self):
+        self.pool.close()
+
+    def describe(self):
+        return f"{self.name} ({self.model_name}, {self.pool.size} clients)"
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini through the SDK's generative service clients, each made with this
+    backend's API key. (genai.configure() would set one key for the whole process.)
+    """
+
+    def __init__(self, name, model_name, api_key, pool_size=DEFAULT_POOL_SIZE, max_prompt_tokens=None):
+        client_options = {"api_key": api_key}
+        pool = ClientPool(lambda: glm.GenerativeServiceClient(client_options=client_options), pool_size,
+                          close_client=lambda client: client.transport.close())
+        super().__init__(name, model_name, pool, max_prompt_tokens)
+        self.model_path = model_name if '/' in model_name else f"models/{model_name}"
+
+    def _generate(self, client, prompt):
+        request = glm.GenerateContentRequest(model=self.model_path,
+                                             contents=[glm.Content(role='user', parts=[glm.Part(text=prompt)])])
+        response = genai.types.GenerateContentResponse.from_response(client.generate_content(request))
+        usage = getattr(response, 'usage_metadata', None)
+        return response.text, getattr(usage, 'total_token_count', None) or None
+
+class OpenAICompatibleBackend(LLMBackend):
+    """The /chat/completions endpoint of an OpenAI-compatible server, one requests.Session per client."""
+
+    def __init__(self, name, model_name, base_url, api_key=None, pool_size=DEFAULT_POOL_SIZE, max_prompt_tokens=None,
+                 limiter=None, timeout=120, max_tokens=512, temperature=0.2):
+        super().__init__(name, model_name, ClientPool(requests.Session, pool_size), max_prompt_tokens, limiter)
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def _generate(self, session, prompt):
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+        }
+        response = session.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            raise QuotaExceeded(f"{self.name} returned 429 Too Many Requests",
+                                float(retry_after) if retry_after and retry_after.isdigit() else None)
+        response.raise_for_status()
+        data = response.json()
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Unexpected response from {self.name}: {json.dumps(data)[:200]}")
+        return text, (data.get("usage") or {}).get("total_tokens")
+
+def create_backend(config, default_api_key=None):
+    """Builds a backend from a config dict (see the module docstring). Raises ValueError for a bad config."""
+    unknown = set(config) - set(CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown LLM backend keys: {', '.join(sorted(unknown))}")
+    backend_type = config.get('type', 'gemini')
+    model_name = config.get('model')
+    if backend_type not in BACKEND_TYPES:
+        raise ValueError(f"Unknown LLM backend type '{backend_type}'. Must be one of: {', '.join(BACKEND_TYPES)}")
+    if not model_name:
+        raise ValueError("Every LLM backend needs a model.")
+    name = config.get('name') or f"{backend_type}:{model_name}"
+    api_key = config.get('api_key') or (os.environ.get(config['api_key_env']) if config.get('api_key_env') else None)
+    pool_size = config.get('pool_size', DEFAULT_POOL_SIZE)
+    if backend_type == 'gemini':
+        api_key = api_key or default_api_key
+        if not api_key:
+            raise ValueError(f"LLM backend {name} needs a Gemini API key.")
+        return GeminiBackend(name, model_name, api_key, pool_size, config.get('max_prompt_tokens'))
+    if not config.get('base_url'):
+        raise ValueError(f"LLM backend {name} needs a base_url.")
+    limiter = RateLimiter(config.get('requests_per_minute', 0), config.get('tokens_per_minute', 0))
+    return OpenAICompatibleBackend(name, model_name, config['base_url'], api_key, pool_size,
+                                   config.get('max_prompt_tokens'), limiter, config.get('timeout', 120),
+                                   config.get('max_tokens', 512), config.get('temperature', 0.2))
+
+def load_backend_configs(path):
+    """Reads a YAML or JSON list of backend configs. Raises ValueError if malformed, IOError if unreadable."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("YAML backend files require the 'PyYAML' package (pip install pyyaml).")
+            configs = yaml.safe_load(f)
+        else:
+            try:
+                configs = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} is not valid JSON: {e}")
+    if not isinstance(configs, list) or not configs or not all(isinstance(config, dict) for config in configs):
+        raise ValueError(f"{path} must contain a non-empty list of LLM backends.")
+    return configs
@@ -0,0 +1,98 @@
+"""
+Content-addressed on-disk cache of Gemini Q&A responses.
+
+Entries are keyed by a hash of (model name, prompt template version, text sent
+to the model), so re-crawling an unchanged site, or meeting the same
+boilerplate-identical page under another URL, returns the stored Q&A pair
+without an API call. The cache is bounded by total size and evicts the least
+recently used entries first.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from sqlite_lru import evict_lru
+
+DEFAULT_MAX_MB = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+def make_cache_key(model_name, prompt_version, text):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model_name, prompt_version], ensure_ascii=False).encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+class LLMResponseCache:
+    """Size-bounded LRU cache of JSON-serializable LLM responses, stored in SQLite."""
+
+    def __init__(self, path, max_mb=DEFAULT_MAX_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Shared by the pipeline's LLM worker threads
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+            self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        size = len(encoded.encode('utf-8'))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous:
+                self.total_bytes -= previous[0]
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                               (key, encoded, size, time.time()))
+            self.total_bytes += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self.total_bytes, evicted = evict_lru(self._conn, "responses", "key", "size", self.total_bytes, self.max_bytes)
+        self.evictions += evicted
+
+    def stats_summary(self):
+        lookups = self.hits + self.misses
+        hit_rate = (100.0 * self.hits / lookups) if lookups else 0.0
+        return (f"{self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate), "
+                f"{self.evictions} evicted, {self.total_bytes / (1024 * 1024):.1f} MB stored")
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,125 @@
+"""
+Near-duplicate detection of extracted page text.
+
+Sites often serve one article under several URLs (print views, paginated or
+query-string variants), and every copy would otherwise cost a Gemini call and
+add a redundant record. Each page's text is reduced to a 64-bit SimHash of its
+word shingles; pages whose fingerprints differ in at most `max_distance` bits
+are collapsed into the first page seen. Candidates are found through an LSH
+index that splits the fingerprint into `max_distance + 1` bands: two
+fingerprints within the distance must agree exactly on at least one band, so
+only pages sharing a band bucket are ever compared.
+"""
+
+import hashlib
+import json
+import re
+import threading
+
+FINGERPRINT_BITS = 64
+DEFAULT_THRESHOLD = 0.9 # Minimum similarity (1 - differing bits / 64) to count as a duplicate
+DEFAULT_SHINGLE_SIZE = 3 # Words per shingle
+
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def threshold_to_distance(threshold):
+    """Converts a similarity in [0, 1] into the largest Hamming distance it allows."""
+    return max(0, min(FINGERPRINT_BITS - 1, int((1.0 - threshold) * FINGERPRINT_BITS)))
+
+def simhash(text, shingle_size=DEFAULT_SHINGLE_SIZE):
+    """Returns the 64-bit SimHash of `text`'s word shingles, or None for text without words."""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return None
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(1, len(words) - shingle_size + 1))]
+    # Each shingle votes on every bit; counting the '1's down each column of the
+    # binary strings keeps the per-bit tally in C rather than a Python loop.
+    bits = [format(int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big'), '064b')
+            for shingle in shingles]
+    fingerprint = 0
+    for position, column in enumerate(zip(*bits)):
+        if column.count('1') * 2 > len(bits):
+            fingerprint |= 1 << (FINGERPRINT_BITS - 1 - position)
+    return fingerprint
+
+class NearDuplicateIndex:
+    """Thread-safe LSH index of page fingerprints that records which pages were collapsed."""
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, shingle_size=DEFAULT_SHINGLE_SIZE):
+        self.threshold = threshold
+        self.max_distance = threshold_to_distance(threshold)
+        self.shingle_size = shingle_size
+        band_count = self.max_distance + 1
+        # Split the fingerprint into band_count bands of (nearly) equal width
+        widths = [FINGERPRINT_BITS // band_count + (1 if i < FINGERPRINT_BITS % band_count else 0)
+                  for i in range(band_count)]
+        self._bands = []
+        shift = FINGERPRINT_BITS
+        for width in widths:
+            shift -= width
+            self._bands.append((shift, (1 << width) - 1))
+        self._buckets = [{} for _ in self._bands]
+        self._fingerprints = {} # url -> fingerprint of every page kept
+        self.duplicates = [] # (url, kept_url, similarity) in detection order
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def fingerprint(self, text):
+        """The SimHash `check` would compute for `text`, to store and check again later without the text."""
+        return simhash(text, self.shingle_size)
+
+    def check(self, url, text):
+        """
+        Returns (kept_url, similarity) if `text` near-duplicates a page already
+        indexed, otherwise indexes `url` and returns None.
+        """
+        return self.check_fingerprint(url, self.fingerprint(text))
+
+    def check_fingerprint(self, url, fingerprint):
+        """Like check, for a fingerprint computed earlier (None never matches)."""
+        if fingerprint is None:
+            return None
+        keys = [(fingerprint >> shift) & mask for shift, mask in self._bands]
+        with self._lock:
+            best = None
+            for bucket, key in zip(self._buckets, keys):
+                for candidate_url in bucket.get(key, ()):
+                    distance = bin(fingerprint ^ self._fingerprints[candidate_url]).count('1')
+                    if distance <= self.max_distance and (best is None or distance < best[1]):
+                        best = (candidate_url, distance)
+            if best is not None:
+                similarity = 1.0 - best[1] / FINGERPRINT_BITS
+                self.duplicates.append((url, best[0], similarity))
+                return best[0], similarity
+            self._index(url, fingerprint, keys)
+        return None
+
+    def add(self, url, fingerprint):
+        """Indexes a page kept earlier, e.g. by the crawl being resumed, without checking it."""
+        with self._lock:
+            if url not in self._fingerprints:
+                self._index(url, fingerprint, [(fingerprint >> shift) & mask for shift, mask in self._bands])
+
+    def _index(self, url, fingerprint, keys):
+        self._fingerprints[url] = fingerprint
+        for bucket, key in zip(self._buckets, keys):
+            bucket.setdefault(key, []).append(url)
+
+    def stats_summary(self):
+        return (f"{len(self.duplicates)} near-duplicate pages collapsed into {len(self._fingerprints)} unique pages "
+                f"(similarity >= {self.threshold:.2f})")
+
+    def write_report(self, path):
+        """Writes the duplicate -> kept URL mapping as a JSON report."""
+        with self._lock:
+            report = {
+                "threshold": self.threshold,
+                "max_distance_bits": self.max_distance,
+                "unique_pages": len(self._fingerprints),
+                "duplicates": [{"url": url, "duplicate_of": kept_url, "similarity": round(similarity, 4)}
+                               for url, kept_url, similarity in self.duplicates],
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
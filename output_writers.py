@@ -0,0 +1,84 @@
+"""
+Streaming output for crawl records.
+
+`JsonlWriter` writes each record as one JSON line as soon as it is produced, so
+memory stays flat on long crawls and partial results are usable while the crawl
+is still running. `finalize_jsonl` converts such a stream into the classic
+pretty-printed JSON array written by the default output mode.
+"""
+
+import gzip
+import io
+import json
+
+try:
+    import zstandard
+except ImportError: # Optional: only needed for zstd-compressed streams
+    zstandard = None
+
+OUTPUT_FORMATS = ('json', 'jsonl')
+COMPRESSIONS = ('none', 'gzip', 'zstd')
+DEFAULT_FLUSH_EVERY = 50 # Records per flush of the JSONL stream
+
+def _open_stream(path, mode, compression):
+    """Opens `path` as a text stream, transparently (de)compressing gzip or zstd."""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package (pip install zstandard).")
+        raw = open(path, mode + 'b')
+        if mode == 'r':
+            binary = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        else:
+            binary = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(binary, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def compression_for_path(path):
+    """Guesses the compression of a stream from its file extension."""
+    if path.endswith('.gz'):
+        return 'gzip'
+    if path.endswith('.zst'):
+        return 'zstd'
+    return 'none'
+
+class JsonlWriter:
+    """Appends records to a (optionally compressed) JSONL file, flushing every `flush_every` records."""
+
+    def __init__(self, path, compression='none', flush_every=DEFAULT_FLUSH_EVERY):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.records_written = 0
+        self._stream = _open_stream(path, 'w', compression)
+
+    def write(self, record):
+        self._stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.records_written += 1
+        if self.records_written % self.flush_every == 0:
+            self._stream.flush()
+
+    def close(self):
+        self._stream.close()
+
+def iter_jsonl(path, compression=None):
+    """Yields the records of a JSONL stream one at a time."""
+    with _open_stream(path, 'r', compression or compression_for_path(path)) as stream:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+def finalize_jsonl(jsonl_path, json_path, compression=None):
+    """
+    Converts a JSONL stream into the same pretty-printed JSON array that
+    `json.dump(records, f, indent=4, ensure_ascii=False)` would produce, without
+    loading the whole stream into memory. Returns the number of records written.
+    """
+    count = 0
+    with open(json_path, 'w', encoding='utf-8') as out:
+        for record in iter_jsonl(jsonl_path, compression):
+            out.write("[\n" if count == 0 else ",\n")
+            out.write("\n".join("    " + line for line in json.dumps(record, indent=4, ensure_ascii=False).split("\n")))
+            count += 1
+        out.write("\n]" if count else "[]")
+    return count
@@ -0,0 +1,123 @@
+"""
+Per-host crawl politeness: robots.txt rules and request spacing.
+
+`RobotsCache` fetches each host's robots.txt once, keeps the parsed rules for a
+TTL and answers whether a URL may be crawled and what Crawl-delay the host
+asks for. `HostScheduler` spaces request starts per host, using the host's
+Crawl-delay when it sets one and the configured delay otherwise. Spacing is
+tracked separately for every host, so a caller only ever waits for its own
+host and requests to other hosts are never held up by one that is cooling down.
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+
+import robotexclusionrulesparser
+
+DEFAULT_ROBOTS_TTL = 24 * 3600 # Seconds a parsed robots.txt is trusted
+ROBOTS_ERROR_TTL = 300 # Retry a robots.txt that could not be fetched after 5 minutes
+MAX_CRAWL_DELAY = 60 # Cap on a host's Crawl-delay, so one host can't stall a crawl indefinitely
+
+def origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+class RobotsCache:
+    """
+    Thread-safe cache of parsed robots.txt files, one per origin.
+
+    `fetch(robots_url)` must return (status_code, text) or raise. A missing
+    robots.txt (4xx) allows everything; a failed fetch also allows everything
+    but is retried after ROBOTS_ERROR_TTL.
+    """
+
+    def __init__(self, fetch, user_agent, ttl=DEFAULT_ROBOTS_TTL):
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self._entries = {} # origin -> (parser or None, expires_at)
+        self._host_locks = {}
+        self._lock = threading.Lock()
+
+    def _rules(self, url):
+        host = origin(url)
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            host_lock = self._host_locks.setdefault(host, threading.Lock())
+        # Only one thread fetches a given host's robots.txt; the others wait for its result
+        with host_lock:
+            with self._lock:
+                entry = self._entries.get(host)
+                if entry and entry[1] > time.monotonic():
+                    return entry[0]
+            rules, ttl = None, self.ttl
+            try:
+                status_code, text = self.fetch(f"{host}/robots.txt")
+                if 200 <= status_code < 300:
+                    rules = robotexclusionrulesparser.RobotExclusionRulesParser()
+                    rules.parse(text)
+                elif status_code >= 500:
+                    ttl = ROBOTS_ERROR_TTL
+            except Exception:
+                ttl = ROBOTS_ERROR_TTL
+            with self._lock:
+                self._entries[host] = (rules, time.monotonic() + ttl)
+            return rules
+
+    def allowed(self, url):
+        rules = self._rules(url)
+        return rules is None or rules.is_allowed(self.user_agent, url)
+
+    def sitemaps(self, url):
+        """The sitemap URLs the host's robots.txt lists, in order."""
+        rules = self._rules(url)
+        return list(rules.sitemaps) if rules is not None else []
+
+    def crawl_delay(self, url):
+        """The Crawl-delay (seconds) the host sets for our user agent, or None."""
+        rules = self._rules(url)
+        return rules.get_crawl_delay(self.user_agent) if rules is not None else None
+
+class HostScheduler:
+    """Thread-safe per-host spacing of request starts, honouring robots.txt Crawl-delay."""
+
+    def __init__(self, default_delay, robots=None, log_func=None):
+        self.default_delay = default_delay
+        self.robots = robots
+        self.log_func = log_func
+        self._next_start = {}
+        self._delays = {} # origin -> delay in use, resolved on first request
+        self._lock = threading.Lock()
+
+    def delay_for(self, url):
+        host = origin(url)
+        with self._lock:
+            if host in self._delays:
+                return self._delays[host]
+        delay = self.default_delay
+        crawl_delay = self.robots.crawl_delay(url) if self.robots is not None else None
+        if crawl_delay is not None:
+            delay = min(float(crawl_delay), MAX_CRAWL_DELAY)
+            if self.log_func:
+                self.log_func(f"{host} sets a Crawl-delay of {crawl_delay}s. Spacing its requests {delay}s apart.")
+        with self._lock:
+            self._delays.setdefault(host, delay)
+        return delay
+
+    def reserve(self, url):
+        """Books the next request slot for the URL's host. Returns the seconds to wait before starting it."""
+        host = origin(url)
+        delay = self.delay_for(url)
+        with self._lock:
+            now = time.monotonic()
+            next_start = self._next_start.get(host, now)
+            self._next_start[host] = max(now, next_start) + delay
+        return max(0.0, next_start - now)
+
+    def wait_turn(self, url, sleep=time.sleep):
+        delay = self.reserve(url)
+        if delay > 0:
+            sleep(delay)
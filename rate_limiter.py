@@ -0,0 +1,122 @@
+"""
+Shared rate limiting for LLM API calls.
+
+`RateLimiter` holds a requests-per-minute and a tokens-per-minute token bucket
+that every concurrent caller draws from before sending a request, so a crawl
+stays under its quota instead of discovering it through 429 errors. When a quota
+error does come back anyway, the limiter pauses all callers for a jittered,
+exponentially growing cooldown (or the server's requested retry delay) and
+halves its effective rate; each success then wins back a little of the rate,
+so the limiter settles just under the real quota.
+"""
+
+import random
+import threading
+import time
+
+MIN_RATE_SCALE = 0.1 # Floor for the adaptive rate after repeated quota errors
+RATE_RECOVERY_STEP = 0.05 # Fraction of the configured rate regained per successful call
+
+def backoff_delay(attempt, base, maximum):
+    """Exponential backoff with jitter: half the delay is fixed, half random."""
+    delay = min(maximum, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+class TokenBucket:
+    """Refills continuously up to `per_minute` units per minute. A limit of 0 means unlimited."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self.available = float(per_minute)
+        self._updated = time.monotonic()
+
+    def refill(self, now, rate_scale):
+        if not self.per_minute:
+            return
+        self.available = min(self.per_minute,
+                             self.available + (now - self._updated) * self.per_minute * rate_scale / 60.0)
+        self._updated = now
+
+    def wait_time(self, amount, rate_scale):
+        """Seconds until `amount` units are available (0 if they already are)."""
+        if not self.per_minute:
+            return 0.0
+        amount = min(amount, self.per_minute) # A single oversized request still gets through once the bucket is full
+        deficit = amount - self.available
+        return max(0.0, deficit * 60.0 / (self.per_minute * rate_scale))
+
+    def take(self, amount):
+        if self.per_minute:
+            self.available -= min(amount, self.per_minute)
+
+    def credit(self, amount):
+        if self.per_minute:
+            self.available = min(self.per_minute, self.available + amount)
+
+class RateLimiter:
+    """Thread-safe RPM/TPM limiter with a shared, adaptive quota-error cooldown."""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, backoff_base=2.0, backoff_max=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_scale = 1.0
+        self.quota_errors = 0
+        self.waited_seconds = 0.0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens, cancelled=None):
+        """
+        Blocks until one request carrying ~`tokens` tokens fits in both buckets, then
+        reserves it and returns True. Returns False without reserving anything if the
+        optional `cancelled()` turns true while waiting.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.requests.refill(now, self.rate_scale)
+                self.tokens.refill(now, self.rate_scale)
+                wait = max(self._paused_until - now,
+                           self.requests.wait_time(1, self.rate_scale),
+                           self.tokens.wait_time(tokens, self.rate_scale))
+                if wait <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return True
+            if cancelled is not None and cancelled():
+                return False
+            # Sleep in short slices so a cooldown set by another caller is noticed promptly
+            wait = min(wait, 1.0)
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def record_success(self, estimated_tokens, used_tokens=None):
+        """Settles a reservation with the tokens actually used and regains some rate."""
+        with self._lock:
+            if used_tokens is not None:
+                if used_tokens > estimated_tokens:
+                    self.tokens.take(used_tokens - estimated_tokens)
+                else:
+                    self.tokens.credit(estimated_tokens - used_tokens)
+            self.rate_scale = min(1.0, self.rate_scale + RATE_RECOVERY_STEP)
+
+    def record_quota_error(self, attempt, retry_after=None):
+        """
+        Pauses every caller after a quota error and halves the effective rate.
+        Returns the cooldown in seconds.
+        """
+        delay = retry_after if retry_after is not None else backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        with self._lock:
+            self.quota_errors += 1
+            self.rate_scale = max(MIN_RATE_SCALE, self.rate_scale / 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            # The quota window is spent, so both buckets refill from empty
+            self.requests.available = min(self.requests.available, 0)
+            self.tokens.available = min(self.tokens.available, 0)
+        return delay
+
+    def stats_summary(self):
+        return (f"{self.quota_errors} quota errors, {self.waited_seconds:.1f}s spent waiting, "
+                f"running at {self.rate_scale:.0%} of the configured rate")
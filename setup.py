@@ -22,7 +22,6 @@ def read_requirements():
     except FileNotFoundError:
         return [
             "requests",
-            "beautifulsoup4", 
             "trafilatura",
             "google-generativeai",
             "robotexclusionrulesparser",
@@ -68,6 +67,18 @@ setup(
         "gui": [
             "tkinter",  # Usually comes with Python
         ],
+        "zstd": [
+            "zstandard",
+        ],
+        "brotli": [
+            "brotli",
+        ],
+        "yaml": [
+            "PyYAML",
+        ],
+        "bench": [
+            "beautifulsoup4",  # benchmarks/bench_single_parse.py compares against the old BeautifulSoup path
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,148 @@
+"""
+Streaming sitemap reader.
+
+A site's sitemaps can list hundreds of thousands of URLs across an index of
+gzipped files, so nothing is loaded whole: body chunks are fed to an XML pull
+parser as they arrive and every <url> element is discarded as soon as it has
+been read, keeping memory flat however large the sitemap. Sitemap indexes are
+followed breadth-first. Gzip is recognized from the content itself, since
+`.xml.gz` files are usually served as plain application/gzip rather than with
+a Content-Encoding the HTTP client would undo.
+"""
+
+import re
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from xml.etree import ElementTree
+
+GZIP_MAGIC = b"\x1f\x8b"
+MAX_SITEMAP_BYTES = 100 * 1024 * 1024 # Uncompressed bytes read from one sitemap at most (the protocol allows 50 MB)
+MAX_SITEMAPS = 1000 # Sitemap files read per site at most, across all indexes
+YEAR_OR_MONTH = re.compile(r"(\d{4})(?:-(\d{2}))?")
+
+class SitemapTooLarge(ValueError):
+    """A sitemap exceeded MAX_SITEMAP_BYTES. The entries before the cut-off were already yielded."""
+
+def parse_lastmod(value):
+    """
+    A sitemap <lastmod> (W3C datetime, from YYYY to a full timestamp) as epoch
+    seconds, or None. A bare year or month counts as its first day.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        reduced = YEAR_OR_MONTH.fullmatch(value)
+        if reduced:
+            parsed = datetime(int(reduced.group(1)), int(reduced.group(2) or 1), 1)
+        else:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def _local_name(tag, names):
+    # Tags carry the sitemap namespace; stripping it once per distinct tag keeps the hot loop cheap
+    name = names.get(tag)
+    if name is None:
+        name = names[tag] = tag.rsplit('}', 1)[-1]
+    return name
+
+def _read_events(parser, state):
+    names = state['names']
+    for event, element in parser.read_events():
+        if event == 'start':
+            if state['root'] is None:
+                state['root'] = element
+            continue
+        kind = _local_name(element.tag, names)
+        if kind != 'url' and kind != 'sitemap':
+            continue
+        fields = {_local_name(child.tag, names): child.text for child in element}
+        # Entries are read once; dropping them from the root is what keeps memory flat
+        state['root'].clear()
+        loc = (fields.get('loc') or "").strip()
+        if loc:
+            yield kind, loc, parse_lastmod(fields.get('lastmod'))
+
+def parse_sitemap(chunks, max_bytes=MAX_SITEMAP_BYTES):
+    """
+    Incrementally parses one sitemap, plain or gzipped, from an iterable of byte
+    chunks. Yields ('url', loc, lastmod) for the pages of a <urlset> and
+    ('sitemap', loc, lastmod) for the sitemaps of a <sitemapindex>, with lastmod
+    in epoch seconds or None. Raises ElementTree.ParseError, zlib.error or
+    SitemapTooLarge.
+    """
+    parser = ElementTree.XMLPullParser(events=('start', 'end'))
+    state = {'root': None, 'names': {}}
+    decompressor = None
+    received = 0
+    head = b"" # Start of the body, held until there is enough of it to recognize gzip
+    for chunk in chunks:
+        if head is not None:
+            head += chunk
+            if len(head) < len(GZIP_MAGIC):
+                continue
+            chunk, head = head, None
+            if chunk.startswith(GZIP_MAGIC):
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        received += len(chunk)
+        if received > max_bytes:
+            raise SitemapTooLarge(f"Sitemap exceeds {max_bytes} bytes")
+        parser.feed(chunk)
+        yield from _read_events(parser, state)
+    if head:
+        parser.feed(head) # A body shorter than the gzip magic
+    if decompressor is not None:
+        parser.feed(decompressor.flush())
+    parser.close()
+    yield from _read_events(parser, state)
+
+def iter_sitemaps(sitemap_urls, fetch_chunks, log_func=None, modified_since=None, max_sitemaps=MAX_SITEMAPS):
+    """
+    Yields (loc, lastmod) for every page listed in the sitemaps at `sitemap_urls`,
+    following sitemap indexes. `fetch_chunks(url)` returns an iterable of the
+    body's byte chunks and raises IOError when the sitemap can't be fetched; if
+    the iterable has a close() method, it is called once the sitemap has been
+    read. Close this generator when stopping early, so that happens right away.
+
+    With `modified_since` (epoch seconds), pages whose lastmod is older are
+    skipped, and so are whole sitemaps an index dates before it. Entries without
+    a lastmod are always kept. A sitemap that fails to download or parse is
+    logged and skipped; the entries read from it up to that point are kept.
+    """
+    pending = deque(sitemap_urls)
+    seen = set(pending)
+    read = 0
+    while pending:
+        if read >= max_sitemaps:
+            if log_func:
+                log_func(f"Stopped after {read} sitemaps; {len(pending)} more were not read.")
+            return
+        sitemap_url = pending.popleft()
+        read += 1
+        chunks = None
+        try:
+            chunks = fetch_chunks(sitemap_url)
+            for kind, loc, lastmod in parse_sitemap(chunks):
+                if modified_since is not None and lastmod is not None and lastmod < modified_since:
+                    continue
+                if kind == 'sitemap':
+                    if loc not in seen:
+                        seen.add(loc)
+                        pending.append(loc)
+                else:
+                    yield loc, lastmod
+        except (IOError, ValueError, ElementTree.ParseError, zlib.error) as e:
+            if log_func:
+                log_func(f"Could not read sitemap {sitemap_url}: {e}")
+        finally:
+            # Releases a streamed response's pooled connection, also when the caller stops early
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
@@ -0,0 +1,26 @@
+"""
+Least-recently-used trimming shared by the SQLite-backed caches (llm_cache.py
+and http_cache.py). Each keeps a running byte total and a `last_used` column.
+"""
+
+TRIM_RATIO = 0.9 # Trim to 90% of the budget so a full cache doesn't evict on every insert
+
+def evict_lru(conn, table, key_column, size_sql, total_bytes, max_bytes):
+    """
+    Deletes the least recently used rows of `table` once `total_bytes` exceeds
+    `max_bytes`, until it is back under TRIM_RATIO of the budget. `size_sql` is
+    the SQL expression for a row's counted size. Returns (total_bytes, rows
+    evicted). The caller holds its lock and commits.
+    """
+    if total_bytes <= max_bytes:
+        return total_bytes, 0
+    target = max_bytes * TRIM_RATIO
+    evicted = 0
+    rows = conn.execute(f"SELECT {key_column}, {size_sql} FROM {table} ORDER BY last_used").fetchall()
+    for key, size in rows:
+        if total_bytes <= target:
+            break
+        conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (key,))
+        total_bytes -= size
+        evicted += 1
+    return total_bytes, evicted
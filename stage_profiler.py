@@ -0,0 +1,234 @@
+"""
+Per-stage timing of a crawl run.
+
+Each stage of a crawl (fetching, parsing, extraction, Gemini calls and the
+waits between them) runs inside `profiler.stage(name)`, which adds the call's
+wall time, the CPU time of the thread that ran it, the bytes it moved and
+whether it raised to that stage's totals. Stages may nest, e.g. the robots.txt
+fetch inside a 'robots' check; a stage's "self" time excludes the stages
+nested in it, so self times never count anything twice. With several crawl
+threads they add up to more than the run's elapsed time.
+
+Timing costs a few clock reads per call and is always on. Two optional
+captures go deeper:
+
+    cprofile     a cProfile of the thread that started the run (the whole crawl
+                 in sequential mode; async and pipeline worker threads and
+                 batch-mode sites run elsewhere and are not included)
+    tracemalloc  Python allocations of every thread: the peak and the top
+                 allocation sites
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+
+CAPTURES = ('cprofile', 'tracemalloc', 'all')
+TOP_FUNCTIONS = 15 # cProfile entries in the report
+TOP_ALLOCATIONS = 10 # tracemalloc allocation sites in the report
+
+# What each stage covers, in the order the summary lists them when times are equal
+STAGES = {
+    "fetch": "HTTP requests for pages and robots.txt, including the download",
+    "robots": "robots.txt checks, besides fetching robots.txt",
+    "sitemaps": "reading and parsing sitemaps",
+    "politeness_wait": "waiting for a host's turn (request delay or Crawl-delay)",
+    "parse": "parsing HTML into an lxml tree",
+    "links": "link discovery on the parsed tree",
+    "extract": "trafilatura main-text extraction",
+    "dedup": "near-duplicate checks",
+    "chunking": "splitting extracted text into chunks",
+    "llm": "LLM backend requests",
+    "rate_limit_wait": "waiting on the LLM rate limiter and quota backoff",
+    "retry_sleep": "sleeping between HTTP retries and retries of malformed LLM answers",
+    "checkpoint": "committing completed pages to the checkpoint",
+    "output": "writing records",
+}
+
+class _NullStage:
+    """Stand-in for a stage when no run is being profiled."""
+
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = _NullStage()
+
+class _Stage:
+    """One timed call. Set `bytes` inside the block to record the data it moved."""
+
+    __slots__ = ("profiler", "name", "bytes", "_wall", "_cpu", "child_wall", "child_cpu")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.bytes = 0
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+    def __enter__(self):
+        self.profiler._stack().append(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.profiler.add(self.name, wall, cpu, self_wall=wall - self.child_wall, self_cpu=cpu - self.child_cpu,
+                          nbytes=self.bytes, errors=int(exc_type is not None))
+        return False
+
+class StageProfiler:
+    """Thread-safe per-stage totals for one run, plus the optional cProfile/tracemalloc captures."""
+
+    def __init__(self, capture=None):
+        if capture is not None and capture not in CAPTURES:
+            raise ValueError(f"Unknown profiling capture '{capture}'. Must be one of: {', '.join(CAPTURES)}")
+        self.capture = capture
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = {} # name -> [calls, errors, wall, self_wall, cpu, self_cpu, bytes]
+        self._sites = []
+        self._cprofile = None
+        self._tracing = False
+        self._started = None
+        self._started_cpu = None
+        self._wall_seconds = None
+        self._cpu_seconds = None
+        self._tracemalloc_peak = None
+        self._tracemalloc_top = []
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name):
+        """Context manager timing one call of stage `name`."""
+        return _Stage(self, name)
+
+    def add(self, name, wall, cpu=0.0, calls=1, self_wall=None, self_cpu=None, nbytes=0, errors=0):
+        """Adds time spent outside a `stage` block, e.g. an asyncio sleep or work done in another process."""
+        with self._lock:
+            totals = self._stages.get(name)
+            if totals is None:
+                totals = self._stages[name] = [0, 0, 0.0, 0.0, 0.0, 0.0, 0]
+            totals[0] += calls
+            totals[1] += errors
+            totals[2] += wall
+            totals[3] += wall if self_wall is None else self_wall
+            totals[4] += cpu
+            totals[5] += cpu if self_cpu is None else self_cpu
+            totals[6] += nbytes
+
+    def stage_totals(self):
+        """{name: {calls, errors, wall_seconds, self_wall_seconds, cpu_seconds, self_cpu_seconds, bytes}}"""
+        with self._lock:
+            return {name: {"calls": calls, "errors": errors, "wall_seconds": wall, "self_wall_seconds": self_wall,
+                           "cpu_seconds": cpu, "self_cpu_seconds": self_cpu, "bytes": nbytes}
+                    for name, (calls, errors, wall, self_wall, cpu, self_cpu, nbytes) in self._stages.items()}
+
+    def merge(self, stage_totals):
+        """Adds the stage_totals() of another profiler, e.g. one run in an extraction worker process."""
+        for name, totals in stage_totals.items():
+            self.add(name, totals["wall_seconds"], totals["cpu_seconds"], totals["calls"],
+                     totals["self_wall_seconds"], totals["self_cpu_seconds"], totals["bytes"], totals["errors"])
+
+    def add_site(self, start_url, pages, records, seconds):
+        with self._lock:
+            self._sites.append({"start_url": start_url, "pages": pages, "records": records, "seconds": seconds})
+
+    def start(self):
+        """Starts the run's clocks and the configured captures, from the thread that runs the crawl."""
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+        if self.capture in ('tracemalloc', 'all') and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if self.capture in ('cprofile', 'all'):
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        """Stops the clocks and captures. Call from the thread that called start()."""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._tracing:
+            _, self._tracemalloc_peak = tracemalloc.get_traced_memory()
+            statistics = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+            self._tracemalloc_top = [{"site": str(stat.traceback[0]), "size_kb": stat.size / 1024, "count": stat.count}
+                                     for stat in statistics]
+            tracemalloc.stop()
+            self._tracing = False
+        if self._started is not None:
+            self._wall_seconds = time.perf_counter() - self._started
+            self._cpu_seconds = time.process_time() - self._started_cpu
+
+    def _top_functions(self):
+        stats = pstats.Stats(self._cprofile, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+        return [{"function": f"{filename}:{line}({function})", "calls": calls, "total_seconds": total,
+                 "cumulative_seconds": cumulative}
+                for (filename, line, function), (_, calls, total, cumulative, _) in rows]
+
+    def report(self):
+        """The run's timings as a JSON-serializable dict."""
+        report = {
+            "wall_seconds": self._wall_seconds,
+            "cpu_seconds": self._cpu_seconds, # This process only; extraction workers are in their stages' cpu_seconds
+            "sites": list(self._sites),
+            "stages": self.stage_totals(),
+        }
+        if self._cprofile is not None:
+            report["cprofile"] = self._top_functions()
+        if self._tracemalloc_peak is not None:
+            report["tracemalloc"] = {"peak_mb": self._tracemalloc_peak / (1024 * 1024), "top": self._tracemalloc_top}
+        return report
+
+    def write_report(self, path):
+        """Writes report() as JSON to `path`, and the full cProfile (for pstats/snakeviz) to `path`.prof. Raises IOError."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=4)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(f"{path}.prof")
+
+    def summary_lines(self):
+        """A human-readable summary: stages by self wall time, then the captures."""
+        order = list(STAGES)
+        stages = sorted(self.stage_totals().items(),
+                        key=lambda item: (-item[1]["self_wall_seconds"],
+                                          order.index(item[0]) if item[0] in order else len(order)))
+        lines = []
+        if self._wall_seconds is not None:
+            lines.append(f"Run took {self._wall_seconds:.1f}s wall, {self._cpu_seconds:.1f}s CPU in this process. "
+                         "Time by stage (self time, nested stages excluded):")
+        lines.append(f"  {'stage':<16}{'calls':>7}{'wall':>10}{'cpu':>9}{'avg':>9}{'errors':>8}{'MB':>9}")
+        for name, totals in stages:
+            average = totals["self_wall_seconds"] / totals["calls"] if totals["calls"] else 0.0
+            lines.append(f"  {name:<16}{totals['calls']:>7}{totals['self_wall_seconds']:>9.2f}s"
+                         f"{totals['self_cpu_seconds']:>8.2f}s{average * 1000:>7.0f}ms{totals['errors']:>8}"
+                         f"{totals['bytes'] / (1024 * 1024):>9.2f}")
+        if self._cprofile is not None:
+            lines.append("Top functions by cumulative time (cProfile):")
+            for row in self._top_functions()[:10]:
+                lines.append(f"  {row['cumulative_seconds']:8.2f}s {row['calls']:>8} calls  {row['function']}")
+        if self._tracemalloc_peak is not None:
+            lines.append(f"Peak traced Python memory: {self._tracemalloc_peak / (1024 * 1024):.1f} MB. Top allocation sites:")
+            for row in self._tracemalloc_top[:5]:
+                lines.append(f"  {row['size_kb']:10.0f} KB {row['count']:>8} blocks  {row['site']}")
+        return lines
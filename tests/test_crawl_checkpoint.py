@@ -0,0 +1,60 @@
+from crawl_checkpoint import CrawlCheckpoint
+from web_to_json_agent import CrawlState, canonicalize_url
+
+START_URL = "https://example.com/"
+
+def test_checkpoint_round_trips_frontier_visited_records_and_meta(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    checkpoint = CrawlCheckpoint(path)
+    assert not checkpoint.has_state()
+    checkpoint.set_meta('start_url', START_URL)
+    checkpoint.enqueue("https://example.com/a", "Page A")
+    checkpoint.enqueue("https://example.com/b")
+    checkpoint.complete_page("https://example.com/a", {"https://example.com/a"}, [{"question": "q", "answer": "a"}],
+                             fingerprint=2 ** 63 + 5, meta={'pages': '1'})
+    checkpoint.close()
+
+    checkpoint = CrawlCheckpoint(path)
+    assert checkpoint.has_state()
+    assert checkpoint.load_frontier() == [("https://example.com/b", None)]
+    assert checkpoint.load_visited() == {"https://example.com/a"}
+    assert list(checkpoint.iter_records()) == [{"question": "q", "answer": "a"}]
+    assert checkpoint.load_fingerprints() == [("https://example.com/a", 2 ** 63 + 5)]
+    assert checkpoint.get_meta('pages') == '1'
+    checkpoint.reset()
+    assert not checkpoint.has_state()
+    assert checkpoint.load_frontier() == []
+    checkpoint.close()
+
+def test_uncommitted_enqueues_are_lost_with_their_page(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    checkpoint = CrawlCheckpoint(path)
+    checkpoint.set_meta('start_url', START_URL)
+    checkpoint.enqueue("https://example.com/a")
+    checkpoint.complete_page("https://example.com/start", {"https://example.com/start"})
+    checkpoint.enqueue("https://example.com/in-flight")
+    checkpoint._conn.close() # Simulates a crash: nothing after the last completed page is committed
+
+    checkpoint = CrawlCheckpoint(path)
+    assert [url for url, _ in checkpoint.load_frontier()] == ["https://example.com/a"]
+    checkpoint.close()
+
+def test_crawl_state_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / "crawl.db")
+    state = CrawlState(START_URL, checkpoint=CrawlCheckpoint(path))
+    assert state.frontier.pop() == START_URL
+    for url in ("https://example.com/a", "https://example.com/b"):
+        state.frontier.add(url)
+    state.frontier.mark_visited(START_URL)
+    state.complete_page(START_URL, "https://example.com/home", [{"question": "q1", "answer": "a1"}])
+    state.checkpoint.close()
+
+    resumed = CrawlState(START_URL, checkpoint=CrawlCheckpoint(path))
+    assert list(resumed.frontier) == ["https://example.com/a", "https://example.com/b"]
+    assert resumed.frontier.is_visited(START_URL)
+    assert resumed.frontier.is_visited("https://example.com/home")
+    assert not resumed.frontier.add(START_URL)
+    assert resumed.collected_data == [{"question": "q1", "answer": "a1"}]
+    assert resumed.page_count == 1
+    assert canonicalize_url("https://example.com/home") in resumed.checkpoint.load_visited()
+    resumed.checkpoint.close()
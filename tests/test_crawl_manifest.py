@@ -0,0 +1,60 @@
+import json
+import textwrap
+
+import pytest
+
+import crawl_manifest
+from crawl_manifest import load_manifest, make_url_filter
+
+requires_yaml = pytest.mark.skipif(crawl_manifest.yaml is None, reason="PyYAML is not installed")
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    path.write_text(textwrap.dedent(content), encoding='utf-8')
+    return str(path)
+
+@requires_yaml
+def test_yaml_manifest_applies_defaults(tmp_path):
+    path = write(tmp_path, "sites.yaml", """\
+        defaults:
+          num_pages: 50
+          exclude: '/search'
+        sites:
+          - start_url: https://docs.example.com
+            num_pages: 200
+            include: ['/docs/']
+            output_file: out/docs.jsonl
+          - blog.example.com:8080
+        """)
+    first, second = load_manifest(path, default_num_pages=10, output_format='jsonl')
+    assert first == {'start_url': "https://docs.example.com", 'num_pages': 200, 'include': ['/docs/'],
+                     'exclude': ['/search'], 'output_file': "out/docs.jsonl", 'state_file': None}
+    assert second['num_pages'] == 50
+    assert second['output_file'] == "blog.example.com_8080.jsonl"
+
+def test_jsonl_manifest_and_default_page_budget(tmp_path):
+    lines = [{'start_url': "https://a.example.com"}, {'start_url': "https://b.example.com", 'state_file': "b.db"}]
+    path = write(tmp_path, "sites.jsonl", "\n".join(json.dumps(line) for line in lines) + "\n\n")
+    sites = load_manifest(path, default_num_pages=10)
+    assert [site['num_pages'] for site in sites] == [10, 10]
+    assert [site['output_file'] for site in sites] == ["a.example.com.json", "b.example.com.json"]
+    assert sites[1]['state_file'] == "b.db"
+
+@pytest.mark.parametrize("name, content, message", [
+    ("bad.jsonl", '{"start_url": "https://a.example.com"}\nnot json\n', "Line 2"),
+    ("bad.jsonl", '{"num_pages": 5}\n', "no start_url"),
+    ("bad.jsonl", '{"start_url": "https://a.example.com", "depth": 3}\n', "unknown keys: depth"),
+    ("bad.jsonl", '{"start_url": "https://a.example.com"}\n{"start_url": "https://a.example.com/docs"}\n',
+     "another site already uses"),
+    pytest.param("bad.yaml", "https://a.example.com\n", "must contain a list", marks=requires_yaml),
+])
+def test_malformed_manifests_are_rejected(tmp_path, name, content, message):
+    with pytest.raises(ValueError, match=message):
+        load_manifest(write(tmp_path, name, content), default_num_pages=10)
+
+def test_url_filter():
+    assert make_url_filter() is None
+    url_filter = make_url_filter(include=['/docs/'], exclude=[r'[?&]page='])
+    assert url_filter("https://example.com/docs/intro")
+    assert not url_filter("https://example.com/blog/")
+    assert not url_filter("https://example.com/docs/?page=2")
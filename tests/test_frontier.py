@@ -0,0 +1,42 @@
+from web_to_json_agent import CrawlFrontier, canonicalize_url
+
+def test_canonicalize_url_normalizes_host_port_and_trailing_slash():
+    assert canonicalize_url("HTTPS://Example.COM:443/docs/") == "https://example.com/docs"
+    assert canonicalize_url("http://example.com:80") == "http://example.com/"
+    assert canonicalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+def test_canonicalize_url_drops_fragment_and_sorts_query():
+    assert canonicalize_url("https://example.com/a?b=2&a=1#section") == "https://example.com/a?a=1&b=2"
+
+def test_canonicalize_url_strips_tracking_parameters_only():
+    url = "https://example.com/a?utm_source=x&UTM_Medium=y&fbclid=z&page=2"
+    assert canonicalize_url(url) == "https://example.com/a?page=2"
+    # `ref` often selects content (a git ref, a product variant), so it is kept
+    assert canonicalize_url("https://example.com/a?ref=main") == "https://example.com/a?ref=main"
+
+def test_frontier_deduplicates_on_canonical_form():
+    frontier = CrawlFrontier()
+    assert frontier.add("https://example.com/docs/")
+    assert not frontier.add("https://EXAMPLE.com/docs?utm_source=newsletter")
+    assert not frontier.add("https://example.com/docs#intro")
+    assert frontier.add("https://example.com/blog")
+    assert list(frontier) == ["https://example.com/docs/", "https://example.com/blog"]
+    assert frontier.pop() == "https://example.com/docs/"
+    assert len(frontier) == 1
+
+def test_frontier_skips_visited_urls_and_redirect_targets():
+    frontier = CrawlFrontier(visited_keys={canonicalize_url("https://example.com/old")})
+    assert not frontier.add("https://example.com/old/")
+    frontier.mark_visited("https://example.com/new")
+    assert frontier.is_visited("https://example.com/new/")
+    assert not frontier.add("https://example.com/new")
+    assert len(frontier) == 0
+
+def test_frontier_applies_url_filter():
+    frontier = CrawlFrontier()
+    frontier.url_filter = lambda url: "/docs/" in url
+    assert not frontier.add("https://example.com/blog/post")
+    assert frontier.add("https://example.com/docs/page")
+    # A rejected URL isn't remembered, so it is queued once the filter allows it
+    frontier.url_filter = None
+    assert frontier.add("https://example.com/blog/post")
@@ -0,0 +1,54 @@
+import base64
+import os
+import time
+
+from http_cache import HttpCache
+
+URL = "https://example.com/page"
+
+def test_miss_then_hit_with_validators(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.db"))
+    assert cache.lookup(URL) is None
+    cache.store_response(URL, URL + "/", '"abc"', "Wed, 01 Jan 2025 00:00:00 GMT", "<html>héllo</html>")
+    entry = cache.lookup(URL)
+    assert entry["body"] == "<html>héllo</html>"
+    assert entry["body_size"] == len("<html>héllo</html>".encode('utf-8'))
+    assert entry["final_url"] == URL + "/"
+    assert entry["derived"] is None
+    assert cache.conditional_headers(entry) == {"If-None-Match": '"abc"',
+                                                "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    cache.close()
+
+def test_derived_results_are_dropped_when_the_page_changes(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.db"))
+    cache.store_response(URL, URL, '"v1"', None, "old body")
+    cache.store_derived(URL, "key-1", {"records": [{"question": "q"}], "links": []})
+    assert cache.lookup(URL)["derived"] == {"records": [{"question": "q"}], "links": []}
+    cache.mark_not_modified(URL, 8)
+    assert (cache.revalidated, cache.bytes_saved) == (1, 8)
+    assert cache.lookup(URL)["derivation_key"] == "key-1"
+    cache.store_response(URL, URL, '"v2"', None, "new body")
+    entry = cache.lookup(URL)
+    assert (entry["etag"], entry["body"], entry["derived"]) == ('"v2"', "new body", None)
+    assert len(cache) == 1
+    cache.close()
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.db"), max_age_days=1)
+    cache.store_response(URL, URL, '"abc"', None, "body")
+    cache._conn.execute("UPDATE pages SET stored_at = ?", (time.time() - 2 * 24 * 3600,))
+    assert cache.lookup(URL) is None
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+    cache.close()
+
+def test_evicts_least_recently_used_pages(tmp_path):
+    cache = HttpCache(str(tmp_path / "http.db"), max_mb=0.01) # ~10 KB
+    for number in range(30):
+        # Random text, so each body stays ~1 KB after compression
+        body = f"{number}:" + base64.b64encode(os.urandom(1024)).decode('ascii')
+        cache.store_response(f"{URL}/{number}", None, None, None, body)
+    assert cache.total_bytes <= cache.max_bytes
+    assert cache.lookup(f"{URL}/0") is None
+    assert cache.lookup(f"{URL}/29")["body"].startswith("29:")
+    cache.close()
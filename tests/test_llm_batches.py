@@ -0,0 +1,41 @@
+import web_to_json_agent
+from web_to_json_agent import chunk_sources, estimate_tokens, generate_page_records, split_llm_batches
+
+def units(*lengths):
+    return [(f"https://example.com/{number}", "x" * length) for number, length in enumerate(lengths)]
+
+def test_batches_count_chunks():
+    groups = split_llm_batches(units(10, 10, 10, 10, 10), max_chunks=2)
+    assert [len(group) for group in groups] == [2, 2, 1]
+
+def test_batches_respect_the_token_budget():
+    budget = 2 * estimate_tokens("x" * 400)
+    groups = split_llm_batches(units(400, 400, 400, 4000, 10), max_chunks=10, max_tokens=budget)
+    # A chunk over the budget on its own still gets a batch
+    assert [[len(chunk) for _, chunk in group] for group in groups] == [[400, 400], [400], [4000], [10]]
+
+def test_unbounded_batch_keeps_order():
+    pieces = units(1, 2, 3)
+    assert split_llm_batches(pieces) == [pieces]
+    assert split_llm_batches([]) == []
+
+def test_chunk_sources_are_unique_per_page():
+    assert chunk_sources("https://example.com/a", ["one"]) == ["https://example.com/a"]
+    assert chunk_sources("https://example.com/a", ["one", "two"]) == ["https://example.com/a#part-1",
+                                                                       "https://example.com/a#part-2"]
+
+def test_page_records_split_a_page_across_batches(monkeypatch):
+    requests = []
+
+    def fake_generate_records(group, log_func, max_chars_for_gemini):
+        requests.append([source for source, _ in group])
+        return [{"source_url": source} for source, _ in group]
+
+    monkeypatch.setattr(web_to_json_agent, "generate_records", fake_generate_records)
+    pages = [("https://example.com/a", ["a1", "a2", "a3"]), ("https://example.com/b", ["b1"])]
+    page_records = generate_page_records(pages, print, 28000, max_chunks=2)
+    assert requests == [["https://example.com/a#part-1", "https://example.com/a#part-2"],
+                        ["https://example.com/a#part-3", "https://example.com/b"]]
+    assert [[record["source_url"] for record in records] for records in page_records] == [
+        ["https://example.com/a#part-1", "https://example.com/a#part-2", "https://example.com/a#part-3"],
+        ["https://example.com/b"]]
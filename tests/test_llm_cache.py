@@ -0,0 +1,46 @@
+from llm_cache import LLMResponseCache, make_cache_key
+
+def test_cache_key_depends_on_model_version_and_text():
+    key = make_cache_key("gemini", 1, "text")
+    assert key == make_cache_key("gemini", 1, "text")
+    assert key != make_cache_key("gemini", 2, "text")
+    assert key != make_cache_key("other", 1, "text")
+    assert key != make_cache_key("gemini", 1, "text ")
+
+def test_hit_and_miss(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"))
+    key = make_cache_key("gemini", 1, "text")
+    assert cache.get(key) is None
+    cache.put(key, {"question": "q", "answer": "a"})
+    assert cache.get(key) == {"question": "q", "answer": "a"}
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+def test_entries_and_size_survive_reopening(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = LLMResponseCache(path)
+    cache.put("k", ["value"])
+    cache.put("k", ["replaced"])
+    total_bytes = cache.total_bytes
+    cache.close()
+    cache = LLMResponseCache(path)
+    assert len(cache) == 1
+    assert cache.total_bytes == total_bytes == len('["replaced"]')
+    assert cache.get("k") == ["replaced"]
+    cache.close()
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "cache.db"), max_mb=0.01) # ~10 KB
+    value = "x" * 498 # 500 bytes once JSON-encoded
+    cache.put("first", value)
+    for number in range(19):
+        cache.put(f"filler-{number}", value)
+    assert cache.get("first") == value # Now the most recently used entry
+    for number in range(19, 30):
+        cache.put(f"filler-{number}", value)
+    assert cache.evictions > 0
+    assert cache.total_bytes <= cache.max_bytes
+    assert cache.get("first") == value
+    assert cache.get("filler-0") is None
+    assert cache.get("filler-29") == value
+    cache.close()
@@ -0,0 +1,37 @@
+from near_duplicates import NearDuplicateIndex, simhash, threshold_to_distance
+
+ARTICLE = " ".join(f"Paragraph {number} explains how the crawler handles page number {number} of the guide."
+                   for number in range(40))
+
+def test_simhash_is_stable_and_ignores_case_and_punctuation():
+    assert simhash(ARTICLE) == simhash(ARTICLE.upper().replace(".", " !"))
+    assert simhash("") is None
+    assert simhash("  ... ") is None
+
+def test_threshold_to_distance():
+    assert threshold_to_distance(1.0) == 0
+    assert threshold_to_distance(0.9) == 6
+    assert threshold_to_distance(0.0) == 63
+
+def test_near_duplicate_is_collapsed_into_first_page():
+    index = NearDuplicateIndex(threshold=0.9)
+    assert index.check("https://example.com/a", ARTICLE) is None
+    kept_url, similarity = index.check("https://example.com/a?print=1", ARTICLE + " Printed on 2025-01-01.")
+    assert kept_url == "https://example.com/a"
+    assert similarity >= 0.9
+    assert len(index) == 1
+    assert index.duplicates == [("https://example.com/a?print=1", "https://example.com/a", similarity)]
+
+def test_different_pages_are_kept():
+    index = NearDuplicateIndex(threshold=0.9)
+    other = " ".join(f"Release {number} of the library removes the deprecated option {number * 7}." for number in range(40))
+    assert index.check("https://example.com/a", ARTICLE) is None
+    assert index.check("https://example.com/b", other) is None
+    assert index.check("https://example.com/empty", "") is None
+    assert len(index) == 2
+
+def test_added_fingerprints_are_matched():
+    index = NearDuplicateIndex()
+    index.add("https://example.com/a", index.fingerprint(ARTICLE))
+    assert index.check_fingerprint("https://example.com/copy", index.fingerprint(ARTICLE)) == ("https://example.com/a", 1.0)
+    assert index.check_fingerprint("https://example.com/none", None) is None
@@ -0,0 +1,45 @@
+import gzip
+import json
+
+import pytest
+
+from output_writers import JsonlWriter, finalize_jsonl, iter_jsonl
+
+RECORDS = [
+    {"question": "Qu'est-ce que c'est ?", "answer": "Un test.\nSur deux lignes.", "source_url": "https://example.com/"},
+    {"question": "Nested?", "answer": {"items": [1, 2, {"deep": None}]}, "source_url": "https://example.com/a"},
+]
+
+def expected_json(records):
+    return json.dumps(records, indent=4, ensure_ascii=False)
+
+@pytest.mark.parametrize("compression, suffix", [('none', '.jsonl'), ('gzip', '.jsonl.gz')])
+def test_finalize_matches_json_dump(tmp_path, compression, suffix):
+    jsonl_path = str(tmp_path / ("records" + suffix))
+    writer = JsonlWriter(jsonl_path, compression, flush_every=1)
+    for record in RECORDS:
+        writer.write(record)
+    writer.close()
+    assert writer.records_written == 2
+    assert list(iter_jsonl(jsonl_path)) == RECORDS
+
+    json_path = str(tmp_path / "records.json")
+    assert finalize_jsonl(jsonl_path, json_path) == 2
+    with open(json_path, encoding='utf-8') as f:
+        assert f.read() == expected_json(RECORDS)
+
+def test_finalize_empty_stream(tmp_path):
+    jsonl_path = str(tmp_path / "empty.jsonl")
+    JsonlWriter(jsonl_path).close()
+    json_path = str(tmp_path / "empty.json")
+    assert finalize_jsonl(jsonl_path, json_path) == 0
+    with open(json_path, encoding='utf-8') as f:
+        assert f.read() == expected_json([])
+
+def test_gzip_stream_is_compressed(tmp_path):
+    jsonl_path = str(tmp_path / "records.jsonl.gz")
+    writer = JsonlWriter(jsonl_path, 'gzip')
+    writer.write(RECORDS[0])
+    writer.close()
+    with gzip.open(jsonl_path, 'rt', encoding='utf-8') as f:
+        assert json.loads(f.readline()) == RECORDS[0]
@@ -0,0 +1,71 @@
+import time
+
+from rate_limiter import MIN_RATE_SCALE, RateLimiter, TokenBucket, backoff_delay
+
+def test_bucket_refills_continuously_up_to_its_limit():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    start = bucket._updated
+    bucket.refill(start + 10, 1.0)
+    assert bucket.available == 10
+    bucket.refill(start + 15, 0.5) # Half the rate after quota errors
+    assert bucket.available == 12.5
+    bucket.refill(start + 600, 1.0)
+    assert bucket.available == 60
+
+def test_bucket_wait_time():
+    bucket = TokenBucket(60)
+    assert bucket.wait_time(60, 1.0) == 0
+    bucket.take(60)
+    assert bucket.wait_time(30, 1.0) == 30
+    assert bucket.wait_time(30, 0.5) == 60
+    assert bucket.wait_time(1000, 1.0) == 60 # An oversized request waits for a full bucket only
+    assert TokenBucket(0).wait_time(1000, 1.0) == 0 # Unlimited
+
+def test_credit_and_take_respect_limit():
+    bucket = TokenBucket(100)
+    bucket.take(30)
+    bucket.credit(50)
+    assert bucket.available == 100
+    bucket.take(500)
+    assert bucket.available == 0
+
+def test_backoff_delay_is_jittered_and_capped():
+    for attempt in range(10):
+        delay = backoff_delay(attempt, 2.0, 60.0)
+        expected = min(60.0, 2.0 * 2 ** attempt)
+        assert expected / 2 <= delay <= expected
+
+def test_acquire_refills_instead_of_blocking():
+    limiter = RateLimiter(requests_per_minute=600) # One request per 0.1 s once the bucket is empty
+    for _ in range(600):
+        assert limiter.acquire(0)
+    started = time.monotonic()
+    assert limiter.acquire(0)
+    assert 0.05 <= time.monotonic() - started < 1.0
+
+def test_acquire_can_be_cancelled_while_waiting():
+    limiter = RateLimiter(tokens_per_minute=100)
+    assert limiter.acquire(100)
+    assert not limiter.acquire(100, cancelled=lambda: True)
+
+def test_quota_error_pauses_and_halves_rate_then_success_recovers():
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+    assert limiter.record_quota_error(0, retry_after=0.2) == 0.2
+    assert limiter.rate_scale == 0.5
+    assert limiter.requests.available <= 0 and limiter.tokens.available <= 0
+    assert not limiter.acquire(1, cancelled=lambda: True)
+    for _ in range(10):
+        limiter.record_quota_error(0, retry_after=0)
+    assert limiter.rate_scale == MIN_RATE_SCALE
+    for _ in range(100):
+        limiter.record_success(10)
+    assert limiter.rate_scale == 1.0
+
+def test_success_settles_token_reservation():
+    limiter = RateLimiter(tokens_per_minute=1000)
+    assert limiter.acquire(400)
+    limiter.record_success(400, used_tokens=100)
+    assert 900 <= limiter.tokens.available <= 1000
+    limiter.record_success(100, used_tokens=600)
+    assert 400 <= limiter.tokens.available < 500
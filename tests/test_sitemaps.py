@@ -0,0 +1,104 @@
+import gzip
+from datetime import datetime, timezone
+
+import pytest
+
+from sitemaps import SitemapTooLarge, iter_sitemaps, parse_lastmod, parse_sitemap
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc> https://example.com/a </loc><lastmod>2024-03-01</lastmod></url>
+  <url><loc>https://example.com/b</loc></url>
+  <url><lastmod>2024</lastmod></url>
+</urlset>"""
+
+INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/new.xml</loc><lastmod>2025-01-01T00:00:00Z</lastmod></sitemap>
+  <sitemap><loc>https://example.com/old.xml</loc><lastmod>2019-05</lastmod></sitemap>
+  <sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>
+</sitemapindex>"""
+
+def epoch(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+def test_parse_lastmod():
+    assert parse_lastmod("2024") == epoch(2024, 1, 1)
+    assert parse_lastmod("2024-03") == epoch(2024, 3, 1)
+    assert parse_lastmod("2024-03-05") == epoch(2024, 3, 5)
+    assert parse_lastmod("2024-03-05T10:00:00Z") == epoch(2024, 3, 5, 10)
+    assert parse_lastmod("2024-03-05T10:00:00+02:00") == epoch(2024, 3, 5, 8)
+    for value in (None, "", "  ", "yesterday", "2024-13"):
+        assert parse_lastmod(value) is None
+
+def test_parse_urlset_from_small_chunks():
+    assert list(parse_sitemap(split(URLSET, 7))) == [('url', "https://example.com/a", epoch(2024, 3, 1)),
+                                                     ('url', "https://example.com/b", None)]
+
+def test_parse_gzipped_sitemap_split_inside_the_magic():
+    chunks = [b"\x1f"] + split(gzip.compress(INDEX)[1:], 16)
+    assert [loc for kind, loc, _ in parse_sitemap(chunks) if kind == 'sitemap'] == [
+        "https://example.com/new.xml", "https://example.com/old.xml", "https://example.com/sitemap.xml"]
+
+def test_oversized_sitemap_is_cut_off():
+    entries = parse_sitemap(split(URLSET, 64), max_bytes=100)
+    with pytest.raises(SitemapTooLarge):
+        list(entries)
+
+class Body:
+    """A fetched sitemap body that records whether it was closed."""
+
+    def __init__(self, data, closed):
+        self._chunks = split(data, 32)
+        self._closed = closed
+
+    def __iter__(self):
+        return iter(self._chunks)
+
+    def close(self):
+        self._closed.append(True)
+
+def test_iter_sitemaps_follows_indexes_and_filters_by_lastmod():
+    closed = []
+    bodies = {
+        "https://example.com/sitemap.xml": INDEX,
+        "https://example.com/new.xml": URLSET,
+    }
+    fetched = []
+    logged = []
+
+    def fetch_chunks(url):
+        fetched.append(url)
+        if url not in bodies:
+            raise IOError("404")
+        return Body(bodies[url], closed)
+
+    entries = list(iter_sitemaps(["https://example.com/sitemap.xml"], fetch_chunks, logged.append,
+                                 modified_since=epoch(2024, 1, 1)))
+    # old.xml is dated before modified_since, and the index listing itself is not read twice
+    assert fetched == ["https://example.com/sitemap.xml", "https://example.com/new.xml"]
+    assert entries == [("https://example.com/a", epoch(2024, 3, 1)), ("https://example.com/b", None)]
+    assert len(closed) == 2
+    assert logged == []
+
+def test_iter_sitemaps_skips_broken_sitemaps_and_closes_on_early_stop():
+    closed = []
+    logged = []
+    bodies = {"https://example.com/broken.xml": b"<urlset><url><loc>https://example.com/x</loc></url>",
+              "https://example.com/good.xml": URLSET}
+    entries = iter_sitemaps(["https://example.com/broken.xml", "https://example.com/good.xml"],
+                            lambda url: Body(bodies[url], closed), logged.append)
+    assert next(entries) == ("https://example.com/x", None)
+    assert next(entries) == ("https://example.com/a", epoch(2024, 3, 1))
+    assert len(logged) == 1 and "broken.xml" in logged[0]
+    entries.close()
+    assert len(closed) == 2
+
+def test_iter_sitemaps_stops_after_max_sitemaps():
+    logged = []
+    entries = list(iter_sitemaps(["https://example.com/1.xml", "https://example.com/2.xml"],
+                                 lambda url: [URLSET], logged.append, max_sitemaps=1))
+    assert len(entries) == 2
+    assert logged == ["Stopped after 1 sitemaps; 1 more were not read."]
@@ -0,0 +1,63 @@
+import pytest
+
+import web_to_json_agent
+from text_chunks import chunk_text
+from web_to_json_agent import chunk_budget, configure_chunking, estimate_tokens, page_chunks
+
+def count_words(text):
+    return len(text.split())
+
+def paragraph(number, words=30):
+    return " ".join([f"p{number}"] + ["word"] * (words - 1)) + "."
+
+def test_blank_text_has_no_chunks():
+    assert chunk_text("", 100, count_words) == []
+    assert chunk_text("\n  \n", 100, count_words) == []
+
+def test_chunks_respect_the_token_budget_and_keep_all_text():
+    text = "\n".join(paragraph(number) for number in range(9))
+    chunks = chunk_text(text, 100, count_words)
+    assert len(chunks) == 3
+    assert all(count_words(chunk) <= 100 for chunk in chunks)
+    assert "\n".join(chunks) == text
+
+def test_headings_start_their_section_and_are_not_left_dangling():
+    text = "\n".join([paragraph(1, 60), paragraph(2, 60), "Installation", paragraph(3, 60), "Usage", paragraph(4, 60)])
+    assert chunk_text(text, 100, count_words) == [paragraph(1, 60), paragraph(2, 60), "Installation\n" + paragraph(3, 60),
+                                                  "Usage\n" + paragraph(4, 60)]
+    # A heading that would end a window moves to the next one, with its section
+    text = "\n".join([paragraph(1, 40), "Usage", paragraph(2, 60)])
+    assert chunk_text(text, 100, count_words) == [paragraph(1, 40), "Usage\n" + paragraph(2, 60)]
+
+def test_oversized_paragraph_is_split_at_sentences_then_words():
+    sentences = " ".join(f"Sentence {number} has exactly six words." for number in range(20))
+    chunks = chunk_text(sentences, 20, count_words)
+    assert all(count_words(chunk) <= 20 for chunk in chunks)
+    assert all(chunk.endswith("words.") for chunk in chunks)
+    runaway = " ".join(["word"] * 180)
+    assert [count_words(chunk) for chunk in chunk_text(runaway, 60, count_words)] == [60, 60, 60]
+
+def test_max_chunks_caps_the_chunks_and_small_trailing_scraps_are_dropped():
+    text = "\n".join(paragraph(number) for number in range(10))
+    assert len(chunk_text(text, 30, count_words, max_chunks=3)) == 3
+    assert chunk_text(paragraph(1, 200) + "\n" + "Short tail.", 200, count_words) == [paragraph(1, 200)]
+    assert chunk_text("Short page.", 200, count_words) == ["Short page."]
+
+def test_chunk_budget_never_exceeds_max_chars(monkeypatch):
+    monkeypatch.setitem(web_to_json_agent.CHUNKING, "chunk_tokens", None)
+    assert chunk_budget(4000) == estimate_tokens("x" * 4000) - 1
+    configure_chunking(chunk_tokens=500)
+    assert chunk_budget(4000) == 500
+    assert chunk_budget(400) == estimate_tokens("x" * 400) - 1
+    with pytest.raises(ValueError):
+        configure_chunking(chunk_size=500)
+
+def test_page_chunks_fit_in_max_chars(monkeypatch):
+    monkeypatch.setitem(web_to_json_agent.CHUNKING, "chunk_tokens", None)
+    monkeypatch.setitem(web_to_json_agent.CHUNKING, "max_chunks_per_page", 0)
+    text = "\n".join(paragraph(number, 60) for number in range(50))
+    chunks = page_chunks(text, 2000)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    monkeypatch.setitem(web_to_json_agent.CHUNKING, "max_chunks_per_page", 2)
+    assert len(page_chunks(text, 2000)) == 2
@@ -0,0 +1,81 @@
+"""
+Token-budgeted chunking of extracted page text.
+
+Instead of cutting a page at a fixed character count, which throws away the rest
+of a long page and usually ends mid-sentence, the text is split into windows of
+at most `max_tokens` tokens along its own structure. trafilatura emits one
+paragraph or heading per line, so lines are packed greedily into windows; a
+heading starts a new window once the current one is reasonably full, and a
+heading is never left dangling at the end of a window. Only a paragraph that is
+larger than a whole window is split further, at sentence boundaries (and at
+word boundaries for a single runaway sentence).
+"""
+
+import re
+
+MIN_CHUNK_TOKENS = 50 # Trailing scraps smaller than this are dropped when a page has other chunks
+MAX_HEADING_CHARS = 120
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+def looks_like_heading(block):
+    return len(block) <= MAX_HEADING_CHARS and not block.endswith(('.', '!', '?', ':', ';', ','))
+
+def _pack(pieces, max_tokens, count_tokens, separator):
+    """Greedily joins pieces into strings of at most max_tokens tokens."""
+    packed, current, current_tokens = [], [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            packed.append(separator.join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        packed.append(separator.join(current))
+    return packed
+
+def _split_oversized(block, max_tokens, count_tokens):
+    """Splits one paragraph larger than a window at sentence, then word, boundaries."""
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(block):
+        if count_tokens(sentence) > max_tokens:
+            pieces.extend(_pack(sentence.split(), max_tokens, count_tokens, " "))
+        else:
+            pieces.append(sentence)
+    return _pack(pieces, max_tokens, count_tokens, " ")
+
+def chunk_text(text, max_tokens, count_tokens, max_chunks=None):
+    """
+    Splits `text` into at most `max_chunks` chunks of at most `max_tokens`
+    tokens each, as counted by `count_tokens(text)`. Returns [] for blank text.
+    """
+    blocks = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if count_tokens(line) > max_tokens:
+            blocks.extend(_split_oversized(line, max_tokens, count_tokens))
+        else:
+            blocks.append(line)
+
+    chunks, current, current_tokens = [], [], 0
+    for block in blocks:
+        tokens = count_tokens(block)
+        starts_section = looks_like_heading(block) and current_tokens >= max_tokens // 2
+        if current and (current_tokens + tokens > max_tokens or starts_section):
+            carried = []
+            if len(current) > 1 and looks_like_heading(current[-1]) and count_tokens(current[-1]) + tokens <= max_tokens:
+                # Move a trailing heading to the window holding its section
+                carried = [current.pop()]
+            chunks.append("\n".join(current))
+            if max_chunks and len(chunks) >= max_chunks:
+                return chunks
+            current = carried
+            current_tokens = sum(count_tokens(piece) for piece in current)
+        current.append(block)
+        current_tokens += tokens
+    if current and (not chunks or current_tokens >= MIN_CHUNK_TOKENS):
+        chunks.append("\n".join(current))
+    return chunks[:max_chunks] if max_chunks else chunks
@@ -1,13 +1,42 @@
 import argparse
+import asyncio
 import json
 import time
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 import trafilatura
-import google.generativeai as genai
+from trafilatura.utils import load_html
+from google.api_core import exceptions as google_exceptions
 from urllib.parse import urljoin, urlparse, ParseResult
-import robotexclusionrulesparser
 import os # Added for environment variable access
+import signal
+import multiprocessing
+import queue
+import re
+import sqlite3
+import threading
+import heapq
+from collections import deque
+from contextlib import closing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode
+from crawl_checkpoint import CrawlCheckpoint
+from output_writers import OUTPUT_FORMATS, COMPRESSIONS, DEFAULT_FLUSH_EVERY, JsonlWriter, finalize_jsonl
+import llm_cache
+import llm_backends
+import http_cache as http_cache_store
+import near_duplicates
+from rate_limiter import RateLimiter, backoff_delay
+from politeness import HostScheduler, RobotsCache, DEFAULT_ROBOTS_TTL
+from crawl_manifest import load_manifest, make_url_filter
+from text_chunks import chunk_text
+from crawl_control import CrawlCancelled, CrawlControl
+from frontier_scoring import UrlScorer
+from sitemaps import iter_sitemaps, parse_lastmod
+from stage_profiler import StageProfiler, NULL_STAGE, CAPTURES as STAGE_PROFILER_CAPTURES
 
 # --- Configuration ---
 # Gemini API Key (Configure this securely, e.g., via environment variable)
@@ -19,15 +48,120 @@ DEFAULT_MAX_PAGES = 10
 
 # Request headers
 HEADERS = {
-    "User-Agent": "WebToJsonAgent/1.0 (Python; +http://example.com/botinfo)" # Replace with your bot info URL
+    "User-Agent": "WebToJsonAgent/1.0 (Python; +http://example.com/botinfo)", # Replace with your bot info URL
+    "Accept-Encoding": ACCEPT_ENCODING, # gzip/deflate, plus br when the brotli package is installed
+}
+
+# HTTP client settings (see configure_http_client)
+HTTP_CLIENT = {
+    "pool_size": 10, # Keep-alive connections kept open per host
+    "max_retries": 3, # Transport-level retries on connection errors and RETRY_STATUSES
+    "backoff_factor": 0.5, # Exponential backoff: 0.5s, 1s, 2s, ... (Retry-After wins when sent)
+    "max_retry_wait": 30, # Seconds; longer backoffs and Retry-After requests are cut to this
+    "retry_statuses": (429, 500, 502, 503, 504),
+    "timeout": 10, # Seconds
+    "max_response_bytes": 10 * 1024 * 1024, # Larger responses are abandoned mid-download
+}
+
+# Gemini rate limits (see configure_gemini_limits). The defaults match the free tier of the
+# flash models; raise them to your paid quota. 0 disables a limit.
+GEMINI_LIMITS = {
+    "requests_per_minute": 15,
+    "tokens_per_minute": 1000000,
+    "quota_retries": 5, # Extra attempts after quota (429) errors, on top of the normal retries
+    "backoff_base": 2.0, # Seconds; doubles per consecutive failure, with jitter
+    "backoff_max": 60.0,
+    "output_tokens": 256, # Expected response size, reserved alongside the prompt
+}
+
+# Chunking of extracted text (see configure_chunking). Each chunk gets its own Q&A record.
+CHUNKING = {
+    "chunk_tokens": None, # Token budget per chunk; None derives it from max_chars_for_gemini
+    "max_chunks_per_page": 4, # Records generated per page at most, so one huge page can't eat the LLM budget; 0 for no cap
 }
 
 # Delay between requests (in seconds)
 REQUEST_DELAY = 2
 
-# --- Global variable for Gemini model ---
-# This allows us to configure it once with the API key
-gemini_model = None
+# Crawl engines: 'sequential' fetches one page at a time, 'async' keeps several fetches in flight,
+# 'pipeline' overlaps fetching, extraction and Gemini calls in separate worker pools
+CRAWL_MODES = ('sequential', 'async', 'pipeline')
+DEFAULT_CONCURRENCY = 4 # Max fetches in flight in async mode (fetcher threads in pipeline mode)
+DEFAULT_PER_HOST_CONCURRENCY = 2 # Max fetches in flight to any single host
+
+# Frontier order (see configure_frontier): 'scored' fetches the most promising URLs first
+# (see frontier_scoring.py), 'fifo' crawls breadth-first in discovery order
+FRONTIER_ORDERS = ('scored', 'fifo')
+FRONTIER = {
+    "order": "scored",
+    "sitemap_hints": True, # Read the site's sitemaps so the URLs they list score higher
+    "weights": None, # Overrides of frontier_scoring.DEFAULT_WEIGHTS
+    # Where crawl URLs come from: 'links' follows <a href> links from the start URL,
+    # 'sitemap' seeds the frontier from the site's sitemaps and follows no links,
+    # 'both' seeds from the sitemaps and follows links too
+    "discovery": "links",
+    "sitemap_urls": None, # Sitemaps to read instead of those robots.txt lists (or /sitemap.xml)
+    "modified_since": None, # Epoch seconds; sitemap entries last modified earlier are skipped
+    "max_sitemap_urls": 50000, # Sitemap entries kept per site at most
+}
+DISCOVERY_MODES = ('links', 'sitemap', 'both')
+RESCORE_INTERVAL = 25 # Completed pages between re-ranking the whole scored frontier
+MAX_ANCHOR_CHARS = 100 # Link text kept per queued URL
+
+# Query parameters that only track the visitor and never change page content.
+# They are dropped when canonicalizing URLs for the crawl frontier's dedup index.
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "yclid", "_ga"}
+TRACKING_PARAM_PREFIXES = ("utm_",)
+
+# Pipeline mode settings
+DEFAULT_EXTRACT_WORKERS = 2
+DEFAULT_LLM_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 8 # Capacity of each bounded queue between stages
+PIPELINE_REPORT_INTERVAL = 5 # Seconds between per-stage progress reports
+QUEUE_METRICS_INTERVAL = 1 # Seconds between queue depth metrics events
+
+# Process-pool extraction: worker processes (0 extracts on the crawl threads) and
+# pages handed to a worker per task when the pipeline submits work in chunks
+DEFAULT_EXTRACTION_PROCESSES = 0
+DEFAULT_EXTRACTION_CHUNKSIZE = 4
+
+# Batch mode: sites of a manifest crawled at the same time
+DEFAULT_PARALLEL_SITES = 4
+
+# Batched Gemini requests: page chunks per request (1 disables batching) and the
+# estimated prompt tokens a single batched request may carry
+DEFAULT_LLM_BATCH_SIZE = 1
+DEFAULT_LLM_BATCH_TOKENS = 24000
+
+# Version of the Q&A prompt in process_with_gemini. Part of the response cache key,
+# so bump it whenever the prompt changes to avoid serving answers to the old prompt.
+PROMPT_TEMPLATE_VERSION = 1
+
+# Layout of the records and links remember_derived stores in the HTTP cache. Part of
+# derivation_key, so entries stored in an older layout are reprocessed instead of misread.
+DERIVED_FORMAT_VERSION = 3 # 2: links are (url, anchor_text) pairs; 3: the page's SimHash is stored with them
+
+# Default location of the on-disk Gemini response cache used by the CLI
+DEFAULT_LLM_CACHE_FILE = "gemini_cache.db"
+
+# Default location of the conditional-request HTTP cache used by the CLI
+DEFAULT_HTTP_CACHE_FILE = "http_cache.db"
+
+# Question/answer text of records whose Q&A could not be generated
+PLACEHOLDER_QA = "N/A (Gemini processing failed or skipped)"
+
+# --- Global variables for the LLM backends ---
+# This allows us to configure them once with the API key
+llm_chain = [] # llm_backends.LLMBackend instances in order of preference, see configure_llm_backends
+gemini_cache = None # Optional llm_cache.LLMResponseCache, see configure_gemini_cache
+http_cache = None # Optional http_cache.HttpCache, see configure_http_cache
+extraction_pool = None # Optional ExtractionPool, see configure_extraction_pool
+dedup_index = None # Optional near_duplicates.NearDuplicateIndex, see configure_near_duplicates
+robots_rules = None # Optional politeness.RobotsCache, see configure_robots
+host_scheduler = None # politeness.HostScheduler shared by concurrent crawls, see configure_host_scheduler
+metrics_callback = None # Optional receiver of crawl_metrics events, see configure_metrics
+crawl_control = None # Optional crawl_control.CrawlControl for stopping/pausing, see configure_crawl_control
+stage_profiler = None # Optional stage_profiler.StageProfiler timing the run's stages, see configure_stage_profiler
 
 def ensure_scheme(url_string):
     """Adds https:// to a URL if no scheme is present."""
@@ -56,23 +190,280 @@ def ensure_scheme(url_string):
     return url_string
 
 def configure_gemini(api_key, model_name='gemini-1.5-flash-latest'):
-    global gemini_model
+    """Uses Gemini `model_name` as the only LLM backend."""
     if not api_key:
         print("Warning: No Gemini API key provided. Q&A generation will be skipped.")
-        gemini_model = None
+        configure_llm_backends([])
         return False
-    try:
-        genai.configure(api_key=api_key)
-        print(f"Attempting to configure Gemini with model: {model_name}...")
-        gemini_model = genai.GenerativeModel(model_name) 
+    print(f"Attempting to configure Gemini with model: {model_name}...")
+    if configure_llm_backends([{"name": "gemini", "type": "gemini", "model": model_name}], api_key):
         print(f"Gemini API configured successfully with {model_name}.")
         return True
-    except Exception as e:
-        print(f"Error configuring Gemini API with {model_name}: {e}")
-        gemini_model = None
-        # Fallback can be removed if model is selectable, or kept as a simpler internal fallback
-        # For now, let's remove the explicit fallback here, as the GUI will offer choices.
+    return False
+
+def configure_llm_backends(configs, api_key=None):
+    """
+    Replaces the LLM backends with ones built from `configs` (see llm_backends.py),
+    tried in the given order. `api_key` is the default Gemini key. Backends that
+    fail to build are left out; returns True if all of them were built.
+    """
+    global llm_chain
+    for backend in llm_chain:
+        backend.close()
+    backends = []
+    for config in configs:
+        try:
+            backends.append(llm_backends.create_backend(config, api_key))
+        except Exception as e:
+            print(f"Error configuring LLM backend {config.get('name') or config.get('model')}: {e}")
+    llm_chain = backends
+    return len(backends) == len(configs)
+
+def llm_label():
+    """Names the configured model(s); part of the response cache key and the HTTP cache's derivation key."""
+    return "+".join(backend.model_name for backend in llm_chain)
+
+def llm_candidates(prompt_tokens):
+    """Backends that accept a prompt of this size, in order. The last backend takes prompts nobody accepts."""
+    return [backend for backend in llm_chain if backend.accepts(prompt_tokens)] or llm_chain[-1:]
+
+def configure_gemini_cache(cache_file, max_mb=llm_cache.DEFAULT_MAX_MB):
+    """Opens (or, with cache_file=None, closes) the on-disk Gemini response cache."""
+    global gemini_cache
+    if gemini_cache is not None:
+        gemini_cache.close()
+        gemini_cache = None
+    if not cache_file:
+        return False
+    try:
+        gemini_cache = llm_cache.LLMResponseCache(cache_file, max_mb)
+        return True
+    except sqlite3.Error as e:
+        print(f"Error opening Gemini response cache {cache_file}: {e}")
+        return False
+
+def configure_http_cache(cache_file, max_mb=http_cache_store.DEFAULT_MAX_MB,
+                         max_age_days=http_cache_store.DEFAULT_MAX_AGE_DAYS):
+    """Opens (or, with cache_file=None, closes) the conditional-request HTTP cache."""
+    global http_cache
+    if http_cache is not None:
+        http_cache.close()
+        http_cache = None
+    if not cache_file:
+        return False
+    try:
+        http_cache = http_cache_store.HttpCache(cache_file, max_mb, max_age_days)
+        return True
+    except sqlite3.Error as e:
+        print(f"Error opening HTTP cache {cache_file}: {e}")
+        return False
+
+def configure_near_duplicates(threshold):
+    """Enables near-duplicate filtering at `threshold` similarity, or disables it with None."""
+    global dedup_index
+    dedup_index = near_duplicates.NearDuplicateIndex(threshold) if threshold is not None else None
+    return dedup_index is not None
+
+def page_fingerprint(extracted_text):
+    """SimHash of a page's text for the near-duplicate index, or None when the filter is off."""
+    if dedup_index is None or not extracted_text:
+        return None
+    with profile_stage('dedup'):
+        return dedup_index.fingerprint(extracted_text)
+
+def is_near_duplicate(page_url, fingerprint, progress_callback=None):
+    """Checks a page's page_fingerprint against the near-duplicate index, indexing it if it is new."""
+    if dedup_index is None or fingerprint is None:
         return False
+    with profile_stage('dedup'):
+        match = dedup_index.check_fingerprint(page_url, fingerprint)
+    if match is None:
+        return False
+    kept_url, similarity = match
+    if progress_callback:
+        progress_callback(f"Skipping {page_url}: near-duplicate of {kept_url} ({similarity:.0%} similar)")
+    return True
+
+def fetch_robots_txt(robots_url):
+    response, text = http_get(robots_url)
+    return response.status_code, text
+
+def configure_robots(respect_robots, ttl=DEFAULT_ROBOTS_TTL):
+    """Enables (or disables) robots.txt checks. Parsed rules are cached per host for `ttl` seconds."""
+    global robots_rules
+    if not respect_robots:
+        robots_rules = None
+    elif robots_rules is None or robots_rules.ttl != ttl:
+        robots_rules = RobotsCache(fetch_robots_txt, HEADERS["User-Agent"], ttl)
+    # An existing cache is kept, so later crawls in the same process reuse its unexpired rules
+    return robots_rules is not None
+
+def configure_host_scheduler(request_delay_seconds, progress_callback=None):
+    """Sets up (or, with None, removes) the per-host request spacing shared by every crawl in the process."""
+    global host_scheduler
+    host_scheduler = HostScheduler(request_delay_seconds, robots_rules, progress_callback) if request_delay_seconds is not None else None
+
+def get_host_scheduler(request_delay_seconds, progress_callback=None):
+    """The shared scheduler, or a private one for engines run without open_shared_resources."""
+    if host_scheduler is not None:
+        return host_scheduler
+    return HostScheduler(request_delay_seconds, robots_rules, progress_callback)
+
+def robots_allowed(url, progress_callback=None):
+    """True unless robots.txt checks are on and the URL's host disallows it."""
+    if robots_rules is None:
+        return True
+    with profile_stage('robots'):
+        allowed = robots_rules.allowed(ensure_scheme(url))
+    if allowed:
+        return True
+    if progress_callback:
+        progress_callback(f"Skipping {url}: disallowed by robots.txt")
+    return False
+
+def configure_metrics(callback):
+    """Sends structured metrics events (see crawl_metrics.py) to `callback`, or stops with None."""
+    global metrics_callback
+    metrics_callback = callback
+
+def emit_metric(event, **fields):
+    # Called from crawl threads; the callback must be thread-safe and quick
+    if metrics_callback is not None:
+        fields["event"] = event
+        fields["time"] = time.monotonic()
+        metrics_callback(fields)
+
+def configure_crawl_control(control):
+    """Lets `control` stop or pause every crawl in the process, or removes it with None."""
+    global crawl_control
+    crawl_control = control
+
+def stop_requested():
+    return crawl_control is not None and crawl_control.stopped
+
+def check_cancelled():
+    """Waits out a pause, then raises CrawlCancelled if the crawl was stopped."""
+    if crawl_control is not None:
+        crawl_control.check()
+
+def crawl_sleep(seconds):
+    """time.sleep that a stop cuts short, raising CrawlCancelled."""
+    if crawl_control is None:
+        time.sleep(seconds)
+    elif not crawl_control.sleep(seconds):
+        raise CrawlCancelled()
+
+def configure_stage_profiler(profiler):
+    """Records per-stage timings of every crawl in the process to `profiler`, or stops with None."""
+    global stage_profiler
+    stage_profiler = profiler
+
+def profile_stage(name):
+    """Context manager timing one call of stage `name` (see stage_profiler.STAGES)."""
+    return stage_profiler.stage(name) if stage_profiler is not None else NULL_STAGE
+
+# --- HTTP Client ---
+
+http_session = None
+_http_session_lock = threading.Lock()
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """Raised when a response exceeds HTTP_CLIENT['max_response_bytes']."""
+
+def configure_http_client(**settings):
+    """Updates HTTP_CLIENT settings and drops the current session so the next request picks them up."""
+    global http_session
+    unknown = set(settings) - set(HTTP_CLIENT)
+    if unknown:
+        raise ValueError(f"Unknown HTTP client settings: {', '.join(sorted(unknown))}")
+    HTTP_CLIENT.update(settings)
+    with _http_session_lock:
+        if http_session is not None:
+            http_session.close()
+        http_session = None
+
+class CrawlRetry(Retry):
+    """
+    urllib3 Retry whose waits between attempts are capped at
+    HTTP_CLIENT['max_retry_wait'] and go through crawl_sleep, so a server asking
+    for `Retry-After: 3600` neither blocks a fetch thread for an hour nor outlasts
+    a stop.
+    """
+
+    def sleep(self, response=None):
+        wait = None
+        if self.respect_retry_after_header and response is not None:
+            wait = self.get_retry_after(response)
+        if not wait:
+            wait = self.get_backoff_time()
+        if wait > 0:
+            with profile_stage('retry_sleep'):
+                crawl_sleep(min(wait, HTTP_CLIENT["max_retry_wait"]))
+
+def get_http_session():
+    """Returns the shared connection-pooled session, creating it on first use."""
+    global http_session
+    with _http_session_lock:
+        if http_session is None:
+            retry = CrawlRetry(total=HTTP_CLIENT["max_retries"],
+                               backoff_factor=HTTP_CLIENT["backoff_factor"],
+                               backoff_max=HTTP_CLIENT["max_retry_wait"],
+                               status_forcelist=HTTP_CLIENT["retry_statuses"],
+                               allowed_methods=["GET", "HEAD"],
+                               respect_retry_after_header=True,
+                               raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=HTTP_CLIENT["pool_size"],
+                                  pool_maxsize=HTTP_CLIENT["pool_size"],
+                                  max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            http_session = session
+        return http_session
+
+def http_get(url, extra_headers=None):
+    """
+    GETs `url` through the shared session, streaming the body so anything larger
+    than HTTP_CLIENT['max_response_bytes'] is abandoned instead of buffered.
+
+    Returns (response, text). Raises requests.exceptions.RequestException
+    (including ResponseTooLarge) on failure.
+    """
+    headers = dict(HEADERS)
+    if extra_headers:
+        headers.update(extra_headers)
+    max_bytes = HTTP_CLIENT["max_response_bytes"]
+    with profile_stage('fetch') as stage:
+        response = get_http_session().get(url, headers=headers, timeout=HTTP_CLIENT["timeout"], stream=True)
+        with response:
+            declared_length = response.headers.get("Content-Length")
+            if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+                raise ResponseTooLarge(f"Response of {declared_length} bytes exceeds the {max_bytes} byte limit")
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                received += len(chunk)
+                if received > max_bytes:
+                    raise ResponseTooLarge(f"Response exceeds the {max_bytes} byte limit")
+                chunks.append(chunk)
+            stage.bytes = received
+    body = b"".join(chunks)
+    encoding = response.encoding or chardet.detect(body)["encoding"] or "utf-8"
+    try:
+        text = body.decode(encoding, errors="replace")
+    except LookupError:
+        text = body.decode("utf-8", errors="replace")
+    return response, text
+
+def http_stream(url):
+    """
+    Yields the body of `url` in chunks through the shared session, for documents
+    like sitemaps that are parsed as they arrive rather than buffered. Raises
+    requests.exceptions.RequestException on failure.
+    """
+    with get_http_session().get(url, headers=HEADERS, timeout=HTTP_CLIENT["timeout"], stream=True) as response:
+        response.raise_for_status()
+        yield from response.iter_content(chunk_size=64 * 1024)
 
 # --- Helper Functions ---
 
@@ -82,26 +473,210 @@ def get_base_url(url):
     parsed_url = urlparse(url_with_scheme)
     return f"{parsed_url.scheme}://{parsed_url.netloc}"
 
+def canonicalize_url(url):
+    """
+    Returns the dedup key for an absolute http(s) URL: lowercased scheme and host,
+    default port removed, tracking parameters stripped, remaining query parameters
+    sorted, fragment dropped and any trailing slash on the path resolved away.
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == 'http' and netloc.endswith(':80')) or (scheme == 'https' and netloc.endswith(':443')):
+        netloc = netloc.rsplit(':', 1)[0]
+    path = parsed.path.rstrip('/') or '/'
+    query_params = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                    if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)]
+    query = urlencode(sorted(query_params))
+    return f"{scheme}://{netloc}{path}" + (f"?{query}" if query else "")
+
 def fetch_page(url, progress_callback=None):
     log_func = progress_callback or print
     processed_url = ensure_scheme(url)
     log_func(f"Fetching {processed_url}...")
+    started = time.monotonic()
     try:
-        response = requests.get(processed_url, headers=HEADERS, timeout=10)
+        response, text = http_get(processed_url)
         response.raise_for_status()
-        return response.text, response.url
+        emit_metric('fetch', url=processed_url, seconds=time.monotonic() - started, ok=True, not_modified=False)
+        return text, response.url
     except requests.exceptions.RequestException as e:
         log_func(f"Error fetching {processed_url}: {e}")
+        emit_metric('fetch', url=processed_url, seconds=time.monotonic() - started, ok=False, not_modified=False)
         return None, None
 
+def derivation_key(max_chars_for_gemini):
+    """Identifies the settings cached records were produced with; records are only reused when it matches."""
+    return (f"{llm_label()}|{PROMPT_TEMPLATE_VERSION}|{DERIVED_FORMAT_VERSION}|{max_chars_for_gemini}|"
+            f"{chunk_budget(max_chars_for_gemini)}|{CHUNKING['max_chunks_per_page']}")
+
+def fetch_page_with_cache(url, progress_callback=None, max_chars_for_gemini=28000):
+    """
+    Like fetch_page, but revalidates against the HTTP cache when one is configured.
+
+    Returns (html, final_url, reused). `reused` is the records and links stored from
+    the last crawl when the server answered 304 Not Modified and they were produced
+    with the current settings; otherwise it is None and the page must be processed.
+    """
+    if http_cache is None:
+        html_content, final_url = fetch_page(url, progress_callback)
+        return html_content, final_url, None
+
+    log_func = progress_callback or print
+    processed_url = ensure_scheme(url)
+    cached = http_cache.lookup(processed_url)
+    conditional_headers = http_cache.conditional_headers(cached) if cached else None
+    log_func(f"Fetching {processed_url}...")
+    started = time.monotonic()
+    try:
+        response, text = http_get(processed_url, conditional_headers)
+        if response.status_code == 304 and cached:
+            emit_metric('fetch', url=processed_url, seconds=time.monotonic() - started, ok=True, not_modified=True)
+            http_cache.mark_not_modified(processed_url, cached["body_size"])
+            reused = None
+            if cached["derived"] is not None and cached["derivation_key"] == derivation_key(max_chars_for_gemini):
+                reused = cached["derived"]
+            return cached["body"], cached["final_url"], reused
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        log_func(f"Error fetching {processed_url}: {e}")
+        emit_metric('fetch', url=processed_url, seconds=time.monotonic() - started, ok=False, not_modified=False)
+        return None, None, None
+    emit_metric('fetch', url=processed_url, seconds=time.monotonic() - started, ok=True, not_modified=False)
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        http_cache.store_response(processed_url, response.url, etag, last_modified, text)
+    return text, response.url, None
+
+def remember_derived(url, records, links, max_chars_for_gemini, fingerprint=None):
+    """
+    Stores a page's records, links and near-duplicate fingerprint in the HTTP
+    cache, unless some Q&A still needs generating. The fingerprint lets a page
+    reused on a later crawl still be checked against, and indexed for, the others.
+    """
+    if http_cache is None:
+        return
+    if any(record.get("question") == PLACEHOLDER_QA for record in records):
+        return # Retry Gemini next time instead of freezing the placeholder
+    http_cache.store_derived(ensure_scheme(url), derivation_key(max_chars_for_gemini),
+                             {"records": records, "links": links, "simhash": fingerprint})
+
+# --- Chunking ---
+
+def configure_chunking(**settings):
+    """Updates CHUNKING settings."""
+    unknown = set(settings) - set(CHUNKING)
+    if unknown:
+        raise ValueError(f"Unknown chunking settings: {', '.join(sorted(unknown))}")
+    CHUNKING.update(settings)
+
+def chunk_budget(max_chars_for_gemini):
+    """Token budget of one chunk. Never more than max_chars_for_gemini worth of tokens, so chunks aren't truncated."""
+    budget = estimate_tokens("x" * max_chars_for_gemini) - 1
+    if CHUNKING["chunk_tokens"]:
+        budget = min(budget, CHUNKING["chunk_tokens"])
+    return max(1, budget)
+
+def page_chunks(extracted_text, max_chars_for_gemini):
+    """Splits extracted text into the token-budgeted chunks that each get a Q&A record."""
+    with profile_stage('chunking'):
+        return chunk_text(extracted_text, chunk_budget(max_chars_for_gemini), estimate_tokens,
+                          CHUNKING["max_chunks_per_page"])
+
+def chunk_sources(page_url, chunks):
+    """Labels identifying each chunk of a page to Gemini; unique, so batched answers can be matched up."""
+    if len(chunks) == 1:
+        return [page_url]
+    return [f"{page_url}#part-{number}" for number in range(1, len(chunks) + 1)]
+
+# --- Gemini Rate Limiting ---
+
+gemini_limiter = None
+_gemini_limiter_lock = threading.Lock()
+
+def configure_gemini_limits(**settings):
+    """Updates GEMINI_LIMITS and drops the current limiter so the next call picks them up."""
+    global gemini_limiter
+    unknown = set(settings) - set(GEMINI_LIMITS)
+    if unknown:
+        raise ValueError(f"Unknown Gemini limit settings: {', '.join(sorted(unknown))}")
+    GEMINI_LIMITS.update(settings)
+    with _gemini_limiter_lock:
+        gemini_limiter = None
+
+def get_gemini_limiter():
+    """Returns the rate limiter shared by every Gemini caller, creating it on first use."""
+    global gemini_limiter
+    with _gemini_limiter_lock:
+        if gemini_limiter is None:
+            gemini_limiter = RateLimiter(GEMINI_LIMITS["requests_per_minute"],
+                                         GEMINI_LIMITS["tokens_per_minute"],
+                                         GEMINI_LIMITS["backoff_base"],
+                                         GEMINI_LIMITS["backoff_max"])
+        return gemini_limiter
+
+def is_quota_error(error):
+    """True for rate-limit / quota-exhausted errors from the Gemini API or another backend."""
+    if isinstance(error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests,
+                          llm_backends.QuotaExceeded)):
+        return True
+    return getattr(error, 'code', None) == 429 or 'quota' in str(error).lower()
+
+def quota_retry_after(error):
+    """The retry delay the API asked for in a quota error, in seconds, if any."""
+    if getattr(error, 'retry_after', None) is not None:
+        return error.retry_after
+    match = re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(error))
+    return float(match.group(1)) if match else None
+
+def call_gemini(prompt, description, log_func, attempt=0):
+    """
+    Sends `prompt` to an LLM backend through its rate limiter (Gemini backends
+    share the GEMINI_LIMITS one) and returns the response text.
+
+    The first attempt goes to the first backend that accepts the prompt's size and
+    each retry (`attempt`) escalates to the next one, so cheap backends take the
+    bulk of the work and pages they fail on move up the chain. Quota errors pause
+    every caller of that backend and are retried up to GEMINI_LIMITS['quota_retries']
+    times; any other error is raised. Raises CrawlCancelled when the crawl is
+    stopped while waiting for its turn.
+    """
+    estimated_tokens = estimate_tokens(prompt) + GEMINI_LIMITS["output_tokens"]
+    candidates = llm_candidates(estimated_tokens)
+    backend = candidates[min(attempt, len(candidates) - 1)]
+    if attempt and len(candidates) > 1 and attempt < len(candidates):
+        log_func(f"Escalating {description} to {backend.name}")
+    limiter = backend.limiter or get_gemini_limiter()
+    for quota_attempt in range(GEMINI_LIMITS["quota_retries"] + 1):
+        check_cancelled() # Paused crawls hold their Gemini calls here
+        with profile_stage('rate_limit_wait'):
+            if not limiter.acquire(estimated_tokens, stop_requested):
+                raise CrawlCancelled()
+        started = time.monotonic()
+        try:
+            with profile_stage('llm') as stage:
+                text, used_tokens = backend.generate(prompt)
+                stage.bytes = len(prompt) + len(text or "")
+        except Exception as e:
+            emit_metric('gemini', seconds=time.monotonic() - started, ok=False, backend=backend.name)
+            if not is_quota_error(e) or quota_attempt == GEMINI_LIMITS["quota_retries"]:
+                raise
+            delay = limiter.record_quota_error(quota_attempt, quota_retry_after(e))
+            log_func(f"{backend.name} quota exceeded while processing {description}. Pausing its calls for {delay:.1f}s...")
+            continue
+        emit_metric('gemini', seconds=time.monotonic() - started, ok=True, backend=backend.name)
+        limiter.record_success(estimated_tokens, used_tokens)
+        return text
+
 def process_with_gemini(text_content, source_url, progress_callback=None, max_chars=28000):
-    global gemini_model
     log_func = progress_callback or print
 
     if not text_content:
         return None
 
-    if not gemini_model:
+    if not llm_chain:
         log_func("Warning: Gemini model not configured. Skipping Q&A generation.")
         return None
     
@@ -111,6 +686,14 @@ def process_with_gemini(text_content, source_url, progress_callback=None, max_ch
         log_func(f"Warning: Extracted text for {source_url} is empty or only whitespace. Skipping Gemini.")
         return None
 
+    cache_key = None
+    if gemini_cache is not None:
+        cache_key = llm_cache.make_cache_key(llm_label(), PROMPT_TEMPLATE_VERSION, truncated_text_content)
+        cached_qa = gemini_cache.get(cache_key)
+        if cached_qa:
+            log_func(f"Using cached Gemini response for {source_url}")
+            return {"context": truncated_text_content, "question": cached_qa["question"], "answer": cached_qa["answer"]}
+
     prompt = f"""
 Read the following text carefully. It was extracted from the webpage {source_url}
 
@@ -139,8 +722,7 @@ JSON Output:
     for attempt in range(max_retries):
         try:
             log_func(f"Sending content from {source_url} to Gemini (attempt {attempt + 1})...")
-            response = gemini_model.generate_content(prompt)
-            raw_response_text = response.text
+            raw_response_text = call_gemini(prompt, source_url, log_func, attempt)
             
             json_start_index = raw_response_text.find('{')
             json_end_index = raw_response_text.rfind('}') + 1
@@ -149,6 +731,8 @@ JSON Output:
                 json_string = raw_response_text[json_start_index:json_end_index]
                 qa_pair = json.loads(json_string)
                 if isinstance(qa_pair, dict) and 'question' in qa_pair and 'answer' in qa_pair:
+                    if cache_key is not None:
+                        gemini_cache.put(cache_key, {"question": qa_pair["question"], "answer": qa_pair["answer"]})
                     return {"context": truncated_text_content, "question": qa_pair["question"], "answer": qa_pair["answer"]}
                 else:
                     log_func(f"Error: Gemini response for {source_url} did not contain valid Q&A keys. Response: {json_string}")
@@ -157,109 +741,1426 @@ JSON Output:
 
         except json.JSONDecodeError as e:
             log_func(f"Error decoding JSON from Gemini for {source_url} (attempt {attempt + 1}): {e}. Response: {raw_response_text}")
+        except CrawlCancelled:
+            raise
         except Exception as e:
             log_func(f"Error interacting with Gemini API for {source_url} (attempt {attempt + 1}): {e}")
         
-        # Using the parameter request_delay_seconds for retries as well, if available, or a default
-        # This requires request_delay_seconds to be passed down or accessed globally/defaulted here
-        # For simplicity, let's keep REQUEST_DELAY for retries for now, or it needs more wiring.
-        current_request_delay = REQUEST_DELAY # Defaulting, this could be a parameter too.
+        # Quota errors were already waited out in call_gemini; this only spaces out retries of bad responses
         if attempt < max_retries - 1:
-            time.sleep(current_request_delay * (attempt + 1))
+            with profile_stage('retry_sleep'):
+                crawl_sleep(backoff_delay(attempt, GEMINI_LIMITS["backoff_base"], GEMINI_LIMITS["backoff_max"]))
         else:
             log_func(f"Failed to process content from {source_url} with Gemini after {max_retries} attempts.")
             return None 
     return None 
 
-def run_web_to_json_conversion(start_url_from_user, num_pages, output_file, api_key_to_use, progress_callback,
-                               model_name_to_use='gemini-1.5-flash-latest', 
-                               request_delay_seconds=2, 
-                               max_chars_for_gemini=28000):
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for packing batches."""
+    return len(text) // 4 + 1
+
+def process_batch_with_gemini(pages, progress_callback=None, max_chars=28000):
+    """
+    Generates Q&A pairs for several pages with a single Gemini request.
+
+    `pages` is a list of (source_url, text_content). Returns a list aligned with
+    `pages` holding a record for every page that was cached or answered validly,
+    and None for pages the caller should retry one at a time with process_with_gemini.
+    """
     log_func = progress_callback or print
-    
-    start_url = ensure_scheme(start_url_from_user)
-    if urlparse(start_url).scheme not in ["http", "https"]:
-        log_func(f"Invalid starting URL scheme for {start_url_from_user}. Must be http or https. Aborting.")
-        return [] 
+    results = [None] * len(pages)
+    if not llm_chain:
+        return results
 
-    if not configure_gemini(api_key_to_use, model_name_to_use):
-        log_func("Gemini API key not configured or invalid. Proceeding without Q&A generation.")
+    pending = [] # (index, source_url, truncated_text_content, cache_key)
+    for index, (source_url, text_content) in enumerate(pages):
+        truncated_text_content = (text_content or "")[:max_chars]
+        if not truncated_text_content.strip():
+            continue
+        cache_key = None
+        if gemini_cache is not None:
+            # Same key as single-page requests: a cached answer about this text is reusable either way
+            cache_key = llm_cache.make_cache_key(llm_label(), PROMPT_TEMPLATE_VERSION, truncated_text_content)
+            cached_qa = gemini_cache.get(cache_key)
+            if cached_qa:
+                log_func(f"Using cached Gemini response for {source_url}")
+                results[index] = {"context": truncated_text_content, "question": cached_qa["question"], "answer": cached_qa["answer"]}
+                continue
+        pending.append((index, source_url, truncated_text_content, cache_key))
 
-    log_func(f"Starting crawl from: {start_url}")
-    log_func(f"Max pages to retrieve: {num_pages}")
-    log_func(f"Using Gemini model: {model_name_to_use}")
-    log_func(f"Request delay: {request_delay_seconds}s")
-    log_func(f"Max chars for Gemini: {max_chars_for_gemini}")
+    if len(pending) < 2:
+        return results # Nothing to batch; the single-page path handles the rest
 
-    base_url = get_base_url(start_url)
+    page_sections = "\n\n".join(
+        f"BEGIN PAGE {number} (source_url: {source_url}):\n{truncated_text_content}\nEND PAGE {number}."
+        for number, (_, source_url, truncated_text_content, _) in enumerate(pending, start=1))
+    prompt = f"""
+Read the following {len(pending)} texts carefully. Each was extracted from the webpage given as its source_url.
 
-    pages_to_visit = [start_url]
-    visited_urls = set()
-    collected_data = []
+{page_sections}
 
-    while pages_to_visit and len(collected_data) < num_pages:
-        current_url_from_queue = pages_to_visit.pop(0)
-        current_url = ensure_scheme(current_url_from_queue)
+For EACH page, based *only* on the information present in that page's text, generate a relevant question about its main topic and provide a concise answer.
+Your output MUST be a single, valid JSON array with exactly one object per page. Each object must have exactly three keys: "source_url" (copied exactly from the page header), "question" and "answer".
+Do not include any explanations, introductory text, or any characters outside of this single JSON array.
 
-        if current_url in visited_urls:
+Example of the required JSON Output format:
+```json
+[
+  {{"source_url": "https://example.com/a", "question": "What is the main theme of page A?", "answer": "Page A is about X."}},
+  {{"source_url": "https://example.com/b", "question": "What does page B describe?", "answer": "Page B describes Y."}}
+]
+```
+
+JSON Output:
+"""
+    raw_response_text = ""
+    try:
+        log_func(f"Sending a batch of {len(pending)} pages to Gemini...")
+        raw_response_text = call_gemini(prompt, f"a batch of {len(pending)} pages", log_func)
+        json_start_index = raw_response_text.find('[')
+        json_end_index = raw_response_text.rfind(']') + 1
+        if json_start_index == -1 or json_start_index >= json_end_index:
+            log_func(f"Error: Could not extract a JSON array from the batched Gemini response. Response: {raw_response_text}")
+            return results
+        items = json.loads(raw_response_text[json_start_index:json_end_index])
+    except json.JSONDecodeError as e:
+        log_func(f"Error decoding JSON from batched Gemini response: {e}. Response: {raw_response_text}")
+        return results
+    except CrawlCancelled:
+        raise
+    except Exception as e:
+        log_func(f"Error interacting with Gemini API for a batch of {len(pending)} pages: {e}")
+        return results
+
+    answers = {}
+    if isinstance(items, list):
+        for item in items:
+            if isinstance(item, dict) and isinstance(item.get("source_url"), str):
+                answers[item["source_url"]] = item
+
+    for index, source_url, truncated_text_content, cache_key in pending:
+        qa_pair = answers.get(source_url)
+        if not (isinstance(qa_pair, dict) and qa_pair.get('question') and qa_pair.get('answer')):
+            log_func(f"Batched Gemini response had no valid Q&A for {source_url}. Retrying it on its own.")
             continue
+        if cache_key is not None:
+            gemini_cache.put(cache_key, {"question": qa_pair["question"], "answer": qa_pair["answer"]})
+        results[index] = {"context": truncated_text_content, "question": qa_pair["question"], "answer": qa_pair["answer"]}
+    return results
 
-        html_content, final_url_after_redirect = fetch_page(current_url, log_func)
-        actual_url_processed = ensure_scheme(final_url_after_redirect or current_url) 
-        
-        visited_urls.add(current_url) 
-        if final_url_after_redirect and final_url_after_redirect != current_url:
-            visited_urls.add(actual_url_processed) 
+# --- Frontier Scoring ---
+
+def configure_frontier(**settings):
+    """Updates FRONTIER settings."""
+    unknown = set(settings) - set(FRONTIER)
+    if unknown:
+        raise ValueError(f"Unknown frontier settings: {', '.join(sorted(unknown))}")
+    if settings.get("order", FRONTIER["order"]) not in FRONTIER_ORDERS:
+        raise ValueError(f"Unknown frontier order '{settings['order']}'. Must be one of: {', '.join(FRONTIER_ORDERS)}")
+    if settings.get("discovery", FRONTIER["discovery"]) not in DISCOVERY_MODES:
+        raise ValueError(f"Unknown discovery mode '{settings['discovery']}'. Must be one of: {', '.join(DISCOVERY_MODES)}")
+    FRONTIER.update(settings)
+
+def new_url_scorer(sitemap_entries=()):
+    """The UrlScorer for a crawl, hinted with (url, lastmod) sitemap entries, or None when the frontier is FIFO."""
+    if FRONTIER["order"] != 'scored':
+        return None
+    scorer = UrlScorer(FRONTIER["weights"])
+    if FRONTIER["sitemap_hints"]:
+        for url, lastmod in sitemap_entries:
+            scorer.add_sitemap_entry(canonicalize_url(url), lastmod)
+    return scorer
+
+# --- Sitemap Discovery ---
+
+def site_sitemap_urls(start_url):
+    """
+    The sitemaps to read for a site: the configured FRONTIER['sitemap_urls'] on
+    its origin, else those its robots.txt lists, else /sitemap.xml.
+    """
+    base_url = get_base_url(start_url)
+    configured = [url for url in FRONTIER["sitemap_urls"] or () if get_base_url(url) == base_url]
+    if configured:
+        return configured
+    if robots_rules is not None:
+        listed = robots_rules.sitemaps(base_url)
+        if listed:
+            return listed
+    return [f"{base_url}/sitemap.xml"]
+
+def read_sitemap_entries(start_url, request_delay_seconds, log_func):
+    """
+    Streams the site's sitemaps (see site_sitemap_urls and sitemaps.py) and
+    returns the crawlable same-origin pages they list as (url, lastmod) pairs,
+    skipping those last modified before FRONTIER['modified_since'] and keeping
+    at most FRONTIER['max_sitemap_urls']. Sitemaps are fetched politely, like pages.
+    """
+    base_url = get_base_url(start_url)
+    scheduler = get_host_scheduler(request_delay_seconds, log_func)
+
+    def fetch_chunks(sitemap_url):
+        if not robots_allowed(sitemap_url):
+            raise IOError("disallowed by robots.txt")
+        with profile_stage('politeness_wait'):
+            scheduler.wait_turn(sitemap_url, crawl_sleep)
+        log_func(f"Reading sitemap {sitemap_url}...")
+        return http_stream(sitemap_url)
+
+    entries = []
+    off_site = 0
+    sitemap_entries = iter_sitemaps(site_sitemap_urls(start_url), fetch_chunks, log_func, FRONTIER["modified_since"])
+    with profile_stage('sitemaps'), closing(sitemap_entries):
+        for url, lastmod in sitemap_entries:
+            if stop_requested():
+                break
+            if not is_crawlable_link(url, base_url):
+                off_site += 1
+                continue
+            entries.append((url, lastmod))
+            if len(entries) >= FRONTIER["max_sitemap_urls"]:
+                log_func(f"Keeping the first {len(entries)} sitemap entries (max_sitemap_urls).")
+                break
+    log_func(f"Sitemaps list {len(entries)} crawlable URLs" +
+             (f" ({off_site} on other hosts or not crawlable were skipped)" if off_site else ""))
+    return entries
+
+# --- Crawl State ---
+
+class CrawlFrontier:
+    """
+    FIFO queue of URLs to crawl with O(1) dedup. URLs are queued as discovered but
+    deduplicated on their canonical form, so `/docs/?utm_source=x` and `/docs` are
+    only ever fetched once. `urls` restores (url, anchor_text) pairs from a checkpoint.
+    """
+
+    def __init__(self, urls=(), visited_keys=(), checkpoint=None):
+        self._queue = deque()
+        self._visited = set(visited_keys) # Canonical keys of URLs already fetched (including redirect targets)
+        self._seen = set(self._visited) # Canonical keys of every URL ever queued or visited
+        self.checkpoint = None
+        self.url_filter = None # Optional predicate a URL must pass to be queued
+        for url, anchor_text in urls:
+            self.add(url, anchor_text)
+        # Attached after the initial URLs so restoring a checkpoint doesn't write them back
+        self.checkpoint = checkpoint
+
+    def add(self, url, anchor_text=None):
+        """
+        Queues `url`, found through a link reading `anchor_text`, unless its
+        canonical form was already queued or visited, or it fails url_filter.
+        """
+        if self.url_filter is not None and not self.url_filter(url):
+            return False
+        key = canonicalize_url(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self._push(url, key, anchor_text)
+        if self.checkpoint:
+            self.checkpoint.enqueue(url, anchor_text)
+        return True
+
+    def _push(self, url, key, anchor_text):
+        self._queue.append(url)
+
+    def pop(self):
+        return self._queue.popleft()
+
+    def mark_visited(self, url):
+        key = canonicalize_url(url)
+        self._seen.add(key)
+        self._visited.add(key)
+
+    def is_visited(self, url):
+        return canonicalize_url(url) in self._visited
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __iter__(self):
+        return iter(self._queue)
+
+class ScoredFrontier(CrawlFrontier):
+    """
+    Frontier that pops the highest-scoring URL first (see frontier_scoring.py),
+    breaking ties in discovery order.
+
+    Scores move as the scorer learns sibling yields from completed pages. Every
+    RESCORE_INTERVAL completed pages the whole queue is re-ranked, so URLs in
+    productive directories move up without rescoring the queue on every pop.
+    Between re-ranks every URL, old or new, is scored with the yields as of the
+    last one. Mixing in fresher yields would let each page's links jump ahead of
+    their older siblings, and make the order iteration shows (which the async
+    engine prefetches) drift from the order pop() returns.
+
+    `ranking_state` restores the ranking yields saved with ranking_state(), so a
+    resumed crawl keeps its order.
+    """
+
+    def __init__(self, scorer, urls=(), visited_keys=(), checkpoint=None, ranking_state=None):
+        self.scorer = scorer
+        self._heap = [] # (-score, discovery seq, url, canonical key, anchor_text)
+        self._seq = 0
+        self._ranking_scorer = scorer.snapshot() # The scorer as of the last re-rank
+        if ranking_state:
+            self._ranking_scorer.load_yield_state(ranking_state)
+        self._ranked_version = self._ranking_scorer.version
+        super().__init__(urls, visited_keys, checkpoint)
+
+    def _push(self, url, key, anchor_text):
+        score = self._ranking_scorer.score(url, key, anchor_text)
+        heapq.heappush(self._heap, (-score, self._seq, url, key, anchor_text))
+        self._seq += 1
+
+    def _rerank(self):
+        self._ranking_scorer = self.scorer.snapshot()
+        self._heap = [(-self._ranking_scorer.score(url, key, anchor_text), seq, url, key, anchor_text)
+                      for _, seq, url, key, anchor_text in self._heap]
+        heapq.heapify(self._heap)
+        self._ranked_version = self.scorer.version
+
+    def pop(self):
+        if self.scorer.version - self._ranked_version >= RESCORE_INTERVAL:
+            self._rerank()
+        return heapq.heappop(self._heap)[2]
+
+    def ranking_state(self):
+        return self._ranking_scorer.yield_state()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        # Best first, as pop() would return them if no score changed. Walks the heap
+        # tree through a side heap of its frontier nodes, so taking the first k
+        # URLs costs O(k log k) rather than copying the whole queue.
+        heap = self._heap
+        if not heap:
+            return
+        candidates = [(heap[0], 0)]
+        while candidates:
+            entry, index = heapq.heappop(candidates)
+            yield entry[2]
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child], child))
 
-        if not html_content:
-            time.sleep(request_delay_seconds) # Use configured delay
+class CrawlState:
+    """
+    Frontier, visited set and collected records for a single crawl, optionally
+    backed by a CrawlCheckpoint. A checkpoint that already holds a crawl is
+    restored instead of starting again from `start_url`.
+
+    Records are kept in `collected_data`, or handed straight to `writer` when
+    streaming output so they never accumulate in memory.
+
+    A page yields one record per chunk of its text. The page budget counts pages
+    that produced records (`page_count`), not the records themselves.
+
+    With LLM batching enabled, pages with content are held in `llm_batch` until
+    `llm_batch_size` chunks (or `llm_batch_tokens` estimated tokens) have
+    accumulated for a batched Gemini request. Each of them is guaranteed to
+    yield its records, so they already count towards `page_count` and the page
+    budget.
+    """
+
+    def __init__(self, start_url, checkpoint=None, writer=None,
+                 llm_batch_size=DEFAULT_LLM_BATCH_SIZE, llm_batch_tokens=DEFAULT_LLM_BATCH_TOKENS, url_filter=None,
+                 scorer=None, seed_urls=(), follow_links=True):
+        self.base_url = get_base_url(start_url)
+        self.checkpoint = checkpoint
+        self.scorer = scorer # Optional frontier_scoring.UrlScorer; orders the frontier by score instead of FIFO
+        self.follow_links = follow_links # False when the frontier was seeded from sitemaps and links aren't followed
+        self.seeded = 0 # seed_urls newly queued
+        self.writer = writer
+        self.collected_data = []
+        self.emitted_count = 0 # Records emitted
+        self.pages_emitted = 0 # Pages whose records were emitted
+        self.llm_batch_size = llm_batch_size
+        self.llm_batch_tokens = llm_batch_tokens
+        self.llm_batch = [] # (url, final_url_after_redirect, page_url, chunks, links, fingerprint)
+        self._llm_batch_chunks = 0
+        self._llm_batch_tokens_used = 0
+        if checkpoint and checkpoint.has_state():
+            scorer_state = checkpoint.get_meta('scorer_yields')
+            if scorer is not None and scorer_state:
+                # Restored before the frontier is rebuilt, so queued URLs are scored with what was learned
+                scorer.load_yield_state(json.loads(scorer_state))
+            self.frontier = self._new_frontier(checkpoint.load_frontier(), checkpoint.load_visited(), checkpoint)
+            for record in checkpoint.iter_records():
+                self._emit(record)
+            self.pages_emitted = checkpoint.count_pages()
+            self.follow_links = checkpoint.get_meta('follow_links') != '0'
+            if dedup_index is not None:
+                # Copies of pages collected before the interruption are still recognized
+                for page_url, fingerprint in checkpoint.load_fingerprints():
+                    dedup_index.add(page_url, fingerprint)
+            self.frontier.url_filter = url_filter
+        else:
+            self.frontier = self._new_frontier(checkpoint=checkpoint)
+            if follow_links or not seed_urls:
+                self.frontier.add(start_url)
+            # Applied to discovered links and seeds only; the start URL is always crawled
+            self.frontier.url_filter = url_filter
+            # Seeds are queued before the checkpoint's start_url marks the crawl as started, so they commit with it
+            self.seeded = sum(1 for url in seed_urls if self.frontier.add(url))
+            if checkpoint:
+                checkpoint.set_meta('follow_links', '1' if self.follow_links else '0')
+                checkpoint.set_meta('start_url', start_url)
+
+    def _new_frontier(self, urls=(), visited_keys=(), checkpoint=None):
+        if self.scorer is None:
+            return CrawlFrontier(urls, visited_keys, checkpoint)
+        ranking_state = checkpoint.get_meta('frontier_ranking') if checkpoint else None
+        return ScoredFrontier(self.scorer, urls, visited_keys, checkpoint,
+                              json.loads(ranking_state) if ranking_state else None)
+
+    @property
+    def page_count(self):
+        return self.pages_emitted + len(self.llm_batch)
+
+    @property
+    def record_count(self):
+        return self.emitted_count + self._llm_batch_chunks
+
+    def _emit(self, record):
+        self.emitted_count += 1
+        if self.writer:
+            with profile_stage('output'):
+                self.writer.write(record)
+        else:
+            self.collected_data.append(record)
+
+    def complete_page(self, url, final_url_after_redirect, records=(), fingerprint=None):
+        """
+        Emits the page's `records` (if any) and checkpoints the page as done,
+        with its near-duplicate `fingerprint` if the filter kept it.
+        """
+        for record in records:
+            self._emit(record)
+        if records:
+            self.pages_emitted += 1
+        meta = None
+        if self.scorer is not None:
+            # Placeholder records don't count: a directory Gemini keeps failing on isn't productive
+            self.scorer.record_page(ensure_scheme(url),
+                                    sum(1 for record in records if record.get("question") != PLACEHOLDER_QA))
+            if self.checkpoint:
+                meta = {'scorer_yields': json.dumps(self.scorer.yield_state()),
+                        'frontier_ranking': json.dumps(self.frontier.ranking_state())}
+        if self.checkpoint:
+            visited_keys = {canonicalize_url(url)}
+            if final_url_after_redirect:
+                visited_keys.add(canonicalize_url(final_url_after_redirect))
+            with profile_stage('checkpoint'):
+                self.checkpoint.complete_page(url, visited_keys, records, final_url_after_redirect, fingerprint, meta)
+        emit_metric('page', url=url, records=len(records), page_count=self.page_count,
+                    record_count=self.record_count, queued=len(self.frontier))
+
+    def defer_to_llm_batch(self, url, final_url_after_redirect, page_url, chunks, links, fingerprint,
+                           log_func, max_chars_for_gemini):
+        """Holds a page's chunks for the next batched Gemini request, sending the batch once it is full."""
+        tokens = sum(estimate_tokens(chunk) for chunk in chunks)
+        if self.llm_batch and self._llm_batch_tokens_used + tokens > self.llm_batch_tokens:
+            self.flush_llm_batch(log_func, max_chars_for_gemini)
+        self.llm_batch.append((url, final_url_after_redirect, page_url, chunks, links, fingerprint))
+        self._llm_batch_chunks += len(chunks)
+        self._llm_batch_tokens_used += tokens
+        if self._llm_batch_chunks >= self.llm_batch_size or self._llm_batch_tokens_used >= self.llm_batch_tokens:
+            self.flush_llm_batch(log_func, max_chars_for_gemini)
+
+    def flush_llm_batch(self, log_func, max_chars_for_gemini):
+        """Generates records for every held page and completes them in crawl order."""
+        if not self.llm_batch:
+            return
+        batch, self.llm_batch = self.llm_batch, []
+        self._llm_batch_chunks = self._llm_batch_tokens_used = 0
+        page_records = generate_page_records([(page_url, chunks) for _, _, page_url, chunks, _, _ in batch],
+                                             log_func, max_chars_for_gemini, self.llm_batch_size, self.llm_batch_tokens)
+        for (url, final_url_after_redirect, _, _, links, fingerprint), records in zip(batch, page_records):
+            remember_derived(url, records, links, max_chars_for_gemini, fingerprint)
+            self.complete_page(url, final_url_after_redirect, records, fingerprint)
+
+def parse_html(html_content):
+    """
+    Parses a page once into the lxml tree that both link discovery and
+    trafilatura extraction work from. Returns None for unparseable content.
+    """
+    return load_html(html_content)
+
+def link_text(anchor):
+    """Visible text of an <a> element, falling back to its title, aria-label or image alt text."""
+    text = " ".join(" ".join(anchor.itertext()).split())
+    if not text:
+        text = anchor.get('title') or anchor.get('aria-label') or " ".join(anchor.xpath('.//img/@alt'))
+    return text[:MAX_ANCHOR_CHARS]
+
+def discover_links(html_tree, page_url, base_url):
+    """
+    Returns the crawlable same-origin links of a parsed page as (url, anchor_text)
+    pairs, in document order. The anchor text feeds the frontier's scoring.
+
+    Reads `href` attributes straight off the lxml tree rather than building a
+    BeautifulSoup document. `page_url` is always absolute, so joined links
+    already carry a scheme and the origin check is a plain comparison instead of
+    a re-parse through get_base_url.
+    """
+    links = []
+    if html_tree is None:
+        return links
+    for anchor in html_tree.iter('a'):
+        href = anchor.get('href')
+        if href is None:
             continue
+        absolute_link = urljoin(page_url, href)
+        if is_crawlable_link(absolute_link, base_url):
+            links.append((absolute_link, link_text(anchor)))
+    return links
 
-        extracted_text = trafilatura.extract(html_content)
+def is_crawlable_link(absolute_link, base_url):
+    """True for an http(s) URL on `base_url`'s origin without a fragment that isn't a PDF, image, stylesheet or script."""
+    if '#' in absolute_link:
+        return False
+    parsed_link = urlparse(absolute_link)
+    return parsed_link.scheme in ('http', 'https') and \
+        f"{parsed_link.scheme}://{parsed_link.netloc}" == base_url and \
+        bool(parsed_link.path) and not parsed_link.path.endswith(('.pdf', '.jpg', '.png', '.css', '.js'))
 
-        if extracted_text:
-            log_func(f"Successfully extracted content from {actual_url_processed}")
-            gemini_output = process_with_gemini(extracted_text, actual_url_processed, log_func, max_chars_for_gemini)
-            if gemini_output:
-                collected_data.append(gemini_output)
-            else:
-                collected_data.append({
-                    "context": extracted_text[:max_chars_for_gemini],
-                    "question": "N/A (Gemini processing failed or skipped)", 
-                    "answer": "N/A (Gemini processing failed or skipped)"
-                })
+def build_record(extracted_text, source_url, log_func, max_chars_for_gemini):
+    """Turns extracted text into an output record, with a placeholder Q&A if Gemini fails."""
+    gemini_output = process_with_gemini(extracted_text, source_url, log_func, max_chars_for_gemini)
+    if gemini_output:
+        return gemini_output
+    return {
+        "context": extracted_text[:max_chars_for_gemini],
+        "question": PLACEHOLDER_QA,
+        "answer": PLACEHOLDER_QA
+    }
+
+def generate_records(pages, log_func, max_chars_for_gemini):
+    """
+    Builds one record per (source_url, extracted_text) page or chunk, sending them
+    to Gemini as a single batched request and falling back to one request each
+    for anything the batch did not answer.
+    """
+    if len(pages) == 1:
+        source_url, extracted_text = pages[0]
+        return [build_record(extracted_text, source_url, log_func, max_chars_for_gemini)]
+    batched = process_batch_with_gemini(pages, log_func, max_chars_for_gemini)
+    return [record or build_record(extracted_text, source_url, log_func, max_chars_for_gemini)
+            for (source_url, extracted_text), record in zip(pages, batched)]
+
+def build_page_records(page_url, chunks, log_func, max_chars_for_gemini):
+    """One record per chunk of a page, with one Gemini request per chunk."""
+    return [build_record(chunk, source, log_func, max_chars_for_gemini)
+            for source, chunk in zip(chunk_sources(page_url, chunks), chunks)]
+
+def split_llm_batches(units, max_chunks=None, max_tokens=None):
+    """
+    Splits (source_url, chunk) units into consecutive groups of at most
+    `max_chunks` chunks and `max_tokens` estimated tokens. A chunk over the token
+    budget on its own still gets a group.
+    """
+    groups = []
+    group = []
+    tokens = 0
+    for unit in units:
+        unit_tokens = estimate_tokens(unit[1])
+        if group and ((max_chunks and len(group) >= max_chunks) or (max_tokens and tokens + unit_tokens > max_tokens)):
+            groups.append(group)
+            group = []
+            tokens = 0
+        group.append(unit)
+        tokens += unit_tokens
+    if group:
+        groups.append(group)
+    return groups
+
+def generate_page_records(pages, log_func, max_chars_for_gemini, max_chunks=None, max_tokens=None):
+    """
+    Builds the records of several (page_url, chunks) pages, sending their chunks
+    in batched requests of up to `max_chunks` chunks and `max_tokens` estimated
+    tokens each; one page's chunks may span several requests. Returns a list of
+    record lists aligned with `pages`.
+    """
+    units = [(source, chunk) for page_url, chunks in pages
+             for source, chunk in zip(chunk_sources(page_url, chunks), chunks)]
+    records = []
+    for group in split_llm_batches(units, max_chunks, max_tokens):
+        records.extend(generate_records(group, log_func, max_chars_for_gemini))
+    page_records = []
+    start = 0
+    for _, chunks in pages:
+        page_records.append(records[start:start + len(chunks)])
+        start += len(chunks)
+    return page_records
+
+def extract_page(html_content, page_url, base_url):
+    """
+    Parses a page once and returns (extracted_text, links). Links are read first,
+    since trafilatura is free to prune the tree while extracting.
+    """
+    with profile_stage('parse') as stage:
+        stage.bytes = len(html_content)
+        html_tree = parse_html(html_content)
+    if html_tree is None:
+        return None, []
+    with profile_stage('links'):
+        links = discover_links(html_tree, page_url, base_url)
+    with profile_stage('extract'):
+        extracted_text = trafilatura.extract(html_tree)
+    return extracted_text, links
+
+# --- Process-Pool Extraction ---
+
+def _extract_page_worker(html_bytes, page_url, base_url):
+    # Runs in an extraction worker process. Pages travel as UTF-8 bytes because
+    # the HTTP client has already decoded them with the right charset. The
+    # worker's stage timings travel back with the result, to be merged into the
+    # crawler's profiler.
+    global stage_profiler
+    stage_profiler = StageProfiler()
+    extracted_text, links = extract_page(html_bytes.decode('utf-8'), page_url, base_url)
+    return extracted_text, links, stage_profiler.stage_totals()
+
+def _merge_worker_result(result):
+    extracted_text, links, stage_totals = result
+    if stage_profiler is not None:
+        stage_profiler.merge(stage_totals)
+    return extracted_text, links
+
+class ExtractionPool:
+    """
+    Runs extract_page in worker processes, so parsing and trafilatura extraction
+    scale across cores instead of contending for the GIL with the crawl threads.
+    """
+
+    def __init__(self, processes, chunksize=DEFAULT_EXTRACTION_CHUNKSIZE):
+        self.processes = processes
+        self.chunksize = max(1, chunksize)
+        # 'spawn' keeps workers independent of the crawler's (and GUI's) threads
+        self._executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, html_content, page_url, base_url):
+        """
+        Queues one page; the future resolves to (extracted_text, links).
+        Cancelling it also cancels the worker task if it hasn't started yet.
+        """
+        future = Future()
+        worker_future = self._executor.submit(_extract_page_worker, html_content.encode('utf-8'), page_url, base_url)
+
+        def resolve(done):
+            # Atomically claims the future, unless the caller cancelled it (e.g. a dropped async prefetch)
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(_merge_worker_result(done.result()))
+            except BaseException as e:
+                future.set_exception(e)
+
+        def cancel_worker(done):
+            if done.cancelled():
+                worker_future.cancel()
+
+        future.add_done_callback(cancel_worker)
+        worker_future.add_done_callback(resolve)
+        return future
+
+    def map(self, pages, base_url):
+        """Extracts a list of (html_content, page_url) pages, `chunksize` pages per worker task."""
+        return [_merge_worker_result(result)
+                for result in self._executor.map(_extract_page_worker,
+                                                 [html_content.encode('utf-8') for html_content, _ in pages],
+                                                 [page_url for _, page_url in pages],
+                                                 [base_url] * len(pages),
+                                                 chunksize=self.chunksize)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+def configure_extraction_pool(processes, chunksize=DEFAULT_EXTRACTION_CHUNKSIZE):
+    """Starts (or, with processes=0, shuts down) the extraction process pool."""
+    global extraction_pool
+    if extraction_pool is not None:
+        extraction_pool.shutdown()
+        extraction_pool = None
+    if processes and processes > 0:
+        extraction_pool = ExtractionPool(processes, chunksize)
+        return True
+    return False
+
+def process_fetched_page(state, current_url, html_content, final_url_after_redirect, num_pages,
+                         log_func, max_chars_for_gemini, reused=None, extracted=None):
+    """
+    Applies one fetched page to the crawl state: marks it visited, extracts and
+    converts its content, and queues newly discovered links. `reused` holds the
+    record and links of a page the HTTP cache reported as not modified, which
+    skips extraction and Gemini entirely. `extracted` holds (extracted_text, links)
+    when the page was already extracted in the process pool.
+
+    Both crawl modes funnel every page through here, in frontier order, which is
+    what keeps their output identical.
+    """
+    actual_url_processed = ensure_scheme(final_url_after_redirect or current_url)
+
+    state.frontier.mark_visited(current_url)
+    if final_url_after_redirect and final_url_after_redirect != current_url:
+        state.frontier.mark_visited(actual_url_processed)
+
+    if not html_content:
+        state.complete_page(current_url, final_url_after_redirect)
+        return
+
+    links = None
+    records = []
+    chunks = []
+    duplicate = False
+    if reused is not None:
+        log_func(f"{actual_url_processed} not modified since the last crawl. Reusing its records and links.")
+        records, links, fingerprint = reused["records"], reused["links"], reused["simhash"]
+        if is_near_duplicate(actual_url_processed, fingerprint, log_func):
+            # A copy of a page this crawl already collected; its stored records are dropped
+            records = []
+            duplicate = True
+    else:
+        if extracted is not None:
+            extracted_text, links = extracted
+        else:
+            extracted_text, links = extract_page(html_content, actual_url_processed, state.base_url)
+
+        fingerprint = page_fingerprint(extracted_text)
+        if extracted_text and is_near_duplicate(actual_url_processed, fingerprint, log_func):
+            # Links are still followed, but the copy is neither sent to Gemini nor cached as
+            # derived, so it is checked again on the next crawl.
+            duplicate = True
+        elif extracted_text:
+            chunks = page_chunks(extracted_text, max_chars_for_gemini)
+            log_func(f"Successfully extracted content from {actual_url_processed} ({len(chunks)} chunks)")
+            if state.llm_batch_size <= 1:
+                records = build_page_records(actual_url_processed, chunks, log_func, max_chars_for_gemini)
         else:
             log_func(f"Could not extract main content from {actual_url_processed}")
 
-        if len(collected_data) >= num_pages:
-            break
+    deferred = chunks and state.llm_batch_size > 1
+    if duplicate:
+        fingerprint = None # Only kept pages go into the checkpoint's index
+
+    # Links are queued before the page is completed so they land in the same checkpoint transaction
+    budget_reached = state.page_count + bool(records or deferred) >= num_pages
+    if not budget_reached and state.follow_links:
+        for absolute_link, anchor_text in links:
+            state.frontier.add(absolute_link, anchor_text)
+
+    if deferred:
+        state.defer_to_llm_batch(current_url, final_url_after_redirect, actual_url_processed, chunks,
+                                 links, fingerprint, log_func, max_chars_for_gemini)
+    else:
+        if reused is None and not duplicate:
+            remember_derived(current_url, records, links, max_chars_for_gemini, fingerprint)
+        state.complete_page(current_url, final_url_after_redirect, records, fingerprint)
+    if not budget_reached:
+        log_func(f"Collected {state.page_count}/{num_pages} pages. URLs in queue: {len(state.frontier)}")
+
+def run_sequential_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini):
+    """Fetches and processes one page at a time, waiting out each host's request delay."""
+    scheduler = get_host_scheduler(request_delay_seconds, log_func)
+    while state.frontier and state.page_count < num_pages:
+        check_cancelled()
+        current_url = state.frontier.pop()
+
+        if state.frontier.is_visited(current_url):
+            continue
+
+        if not robots_allowed(current_url, log_func):
+            process_fetched_page(state, current_url, None, None, num_pages, log_func, max_chars_for_gemini)
+            continue
+
+        with profile_stage('politeness_wait'):
+            scheduler.wait_turn(ensure_scheme(current_url), crawl_sleep)
+        html_content, final_url_after_redirect, reused = fetch_page_with_cache(current_url, log_func, max_chars_for_gemini)
+        process_fetched_page(state, current_url, html_content, final_url_after_redirect, num_pages,
+                             log_func, max_chars_for_gemini, reused)
+
+# --- Async Crawl Engine ---
+
+async def _run_async_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                           concurrency, per_host_concurrency):
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency + 1)
+    scheduler = get_host_scheduler(request_delay_seconds, log_func)
+    host_slots = {} # host -> semaphore capping the fetches in flight to it
+    in_flight = {}
+
+    async def polite_fetch(url):
+        # robots.txt may need fetching, so the checks run on the executor rather than the event loop
+        if not await loop.run_in_executor(executor, robots_allowed, url, log_func):
+            return None, None, None, None
+        host = urlparse(url).netloc
+        slots = host_slots.get(host)
+        if slots is None:
+            slots = host_slots[host] = asyncio.Semaphore(per_host_concurrency)
+        async with slots:
+            delay = await loop.run_in_executor(executor, scheduler.reserve, ensure_scheme(url))
+            if delay > 0:
+                # Only this host's fetch waits; fetches to other hosts carry on meanwhile
+                await asyncio.sleep(delay)
+                if stage_profiler is not None:
+                    stage_profiler.add('politeness_wait', delay)
+            html_content, final_url_after_redirect, reused = await loop.run_in_executor(
+                executor, fetch_page_with_cache, url, log_func, max_chars_for_gemini)
+        extracted = None
+        if extraction_pool is not None and html_content and reused is None:
+            # Extraction is pure, so prefetched pages can be extracted ahead of their commit
+            page_url = ensure_scheme(final_url_after_redirect or url)
+            extracted = await asyncio.wrap_future(extraction_pool.submit(html_content, page_url, state.base_url))
+        return html_content, final_url_after_redirect, reused, extracted
+
+    def schedule_prefetches():
+        # Keep the next `concurrency` unvisited frontier URLs in flight. Pages are
+        # still committed strictly in frontier order, so prefetching never changes
+        # what the crawl collects, only how long it waits for it. The scored frontier
+        # reorders as pages are found, so prefetches that fell out of that window are
+        # cancelled rather than holding a slot (and their HTML) the next pop needs.
+        window = []
+        for url in state.frontier:
+            if len(window) >= concurrency:
+                break
+            if url not in window and not state.frontier.is_visited(url):
+                window.append(url)
+        for url in [url for url in in_flight if url not in window]:
+            in_flight.pop(url).cancel()
+        for url in window:
+            if url not in in_flight:
+                in_flight[url] = asyncio.ensure_future(polite_fetch(url))
+
+    try:
+        while state.frontier and state.page_count < num_pages:
+            while crawl_control is not None and crawl_control.paused:
+                await asyncio.sleep(0.2) # Prefetches already in flight finish; nothing new starts
+            check_cancelled()
+            current_url = state.frontier.pop()
+
+            if state.frontier.is_visited(current_url):
+                stale = in_flight.pop(current_url, None)
+                if stale:
+                    stale.cancel()
+                continue
+
+            task = in_flight.pop(current_url, None) or asyncio.ensure_future(polite_fetch(current_url))
+            schedule_prefetches()
+            html_content, final_url_after_redirect, reused, extracted = await task
+
+            await loop.run_in_executor(executor, process_fetched_page, state, current_url, html_content,
+                                       final_url_after_redirect, num_pages, log_func, max_chars_for_gemini,
+                                       reused, extracted)
+            schedule_prefetches()
+    finally:
+        for task in in_flight.values():
+            task.cancel()
+        executor.shutdown(wait=False)
+
+def run_async_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                    concurrency=DEFAULT_CONCURRENCY, per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY):
+    """Keeps up to `concurrency` fetches in flight while committing pages in frontier order."""
+    asyncio.run(_run_async_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                                 max(1, concurrency), max(1, per_host_concurrency)))
+
+# --- Pipelined Crawl Engine ---
+
+class StageStats:
+    """Items processed and busy time for one pipeline stage."""
+
+    def __init__(self, name, input_queue):
+        self.name = name
+        self.input_queue = input_queue
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, items=1):
+        with self._lock:
+            self.processed += items
+            self.busy_seconds += seconds
+
+    def summary(self, elapsed):
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        return (f"{self.name}: queue {self.input_queue.qsize()}/{self.input_queue.maxsize}, "
+                f"{self.processed} done ({rate:.2f}/s)")
+
+def _put_until_stopped(target_queue, item, stop_event):
+    # Blocking put that gives up once the pipeline is shutting down, so a full
+    # downstream queue can never deadlock the workers feeding it.
+    while not stop_event.is_set():
+        try:
+            target_queue.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _stage_worker(stats, input_queue, stop_event, handle, events):
+    while not stop_event.is_set():
+        try:
+            item = input_queue.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        started = time.monotonic()
+        try:
+            handle(item)
+        except Exception as e:
+            # Hand the error to the coordinator, which re-raises it like the other engines would
+            events.put(('error', None, e))
+            return
+        stats.record(time.monotonic() - started)
+
+def _batch_stage_worker(stats, input_queue, stop_event, handle_batch, events, max_items, max_tokens, weigh,
+                        count=None):
+    # Like _stage_worker, but hands `handle_batch` everything already waiting in the
+    # queue (up to `max_items` / `max_tokens`, with items counted by `count`, 1 each
+    # by default). Under load the queue is full, so batches form without adding any
+    # latency when the stage is idle. The first item is always taken, even alone
+    # over a limit.
+    count = count or (lambda item: 1)
+    carry = None
+    while not stop_event.is_set():
+        if carry is None:
+            try:
+                carry = input_queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+        batch, items, tokens, carry = [carry], count(carry), weigh(carry), None
+        while items < max_items:
+            try:
+                item = input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if items + count(item) > max_items or tokens + weigh(item) > max_tokens:
+                carry = item
+                break
+            batch.append(item)
+            items += count(item)
+            tokens += weigh(item)
+        started = time.monotonic()
+        try:
+            handle_batch(batch)
+        except Exception as e:
+            events.put(('error', None, e))
+            return
+        stats.record(time.monotonic() - started, len(batch))
+
+def run_pipeline_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                       fetch_workers=DEFAULT_CONCURRENCY, extract_workers=DEFAULT_EXTRACT_WORKERS,
+                       llm_workers=DEFAULT_LLM_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Runs fetching, content extraction and Gemini calls as three worker pools
+    joined by bounded queues, so throughput is set by the slowest stage rather
+    than the sum of all three. The coordinator (this thread) owns the frontier
+    and collected records; workers report back through an unbounded event queue.
+
+    Records are collected in completion order, so unlike the sequential and async
+    engines the output order (and, on a page budget, the exact page set) may differ.
+    """
+    fetch_queue = queue.Queue(maxsize=queue_size)
+    extract_queue = queue.Queue(maxsize=queue_size)
+    llm_queue = queue.Queue(maxsize=queue_size)
+    events = queue.Queue()
+    stop_event = threading.Event()
+    scheduler = get_host_scheduler(request_delay_seconds, log_func)
+
+    fetch_stats = StageStats("fetch", fetch_queue)
+    extract_stats = StageStats("extract", extract_queue)
+    llm_stats = StageStats("llm", llm_queue)
 
+    # Every item carries the URL it was dispatched under, so the coordinator can
+    # complete (and checkpoint) the right frontier entry when it comes back.
+    def fetch(url):
+        if not robots_allowed(url, log_func):
+            events.put(('fetched', url, None))
+            events.put(('done', url, (None, [], None)))
+            return
+        with profile_stage('politeness_wait'):
+            scheduler.wait_turn(ensure_scheme(url), crawl_sleep)
+        html_content, final_url_after_redirect, reused = fetch_page_with_cache(url, log_func, max_chars_for_gemini)
+        events.put(('fetched', url, final_url_after_redirect))
+        if reused is not None:
+            log_func(f"{ensure_scheme(final_url_after_redirect or url)} not modified since the last crawl. Reusing its records and links.")
+            events.put(('links', url, reused["links"]))
+            fingerprint = reused["simhash"]
+            if is_near_duplicate(ensure_scheme(final_url_after_redirect or url), fingerprint, log_func):
+                events.put(('done', url, (final_url_after_redirect, [], None)))
+            else:
+                events.put(('done', url, (final_url_after_redirect, reused["records"], fingerprint)))
+            return
         if html_content:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            page_base_url_for_links = actual_url_processed 
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                absolute_link_unprocessed = urljoin(page_base_url_for_links, href)
-                absolute_link = ensure_scheme(absolute_link_unprocessed)
-                parsed_link = urlparse(absolute_link)
-                
-                if parsed_link.scheme in ['http', 'https'] and \
-                   get_base_url(absolute_link) == base_url and \
-                   parsed_link.path and not parsed_link.path.endswith(('.pdf', '.jpg', '.png', '.css', '.js')) and \
-                   '#' not in absolute_link: 
-                    if absolute_link not in visited_urls and absolute_link not in pages_to_visit:
-                        pages_to_visit.append(absolute_link)
-        
-        log_func(f"Collected {len(collected_data)}/{num_pages} pages. URLs in queue: {len(pages_to_visit)}")
-        time.sleep(request_delay_seconds) # Use configured delay
+            if _put_until_stopped(extract_queue, (url, final_url_after_redirect, html_content), stop_event):
+                return
+        events.put(('done', url, (final_url_after_redirect, [], None)))
+
+    def extract(item):
+        url, final_url_after_redirect, html_content = item
+        page_url = ensure_scheme(final_url_after_redirect or url)
+        handle_extracted(item, *extract_page(html_content, page_url, state.base_url))
+
+    def extract_in_pool(items):
+        pages = [(html_content, ensure_scheme(final_url_after_redirect or url))
+                 for url, final_url_after_redirect, html_content in items]
+        for item, (extracted_text, links) in zip(items, extraction_pool.map(pages, state.base_url)):
+            handle_extracted(item, extracted_text, links)
+
+    def handle_extracted(item, extracted_text, links):
+        url, final_url_after_redirect, _ = item
+        page_url = ensure_scheme(final_url_after_redirect or url)
+        events.put(('links', url, links))
+        if extracted_text:
+            fingerprint = page_fingerprint(extracted_text)
+            if not is_near_duplicate(page_url, fingerprint, log_func):
+                chunks = page_chunks(extracted_text, max_chars_for_gemini)
+                log_func(f"Successfully extracted content from {page_url} ({len(chunks)} chunks)")
+                if _put_until_stopped(llm_queue, (url, final_url_after_redirect, chunks, links, fingerprint), stop_event):
+                    return
+        else:
+            log_func(f"Could not extract main content from {page_url}")
+            remember_derived(url, [], links, max_chars_for_gemini)
+        events.put(('done', url, (final_url_after_redirect, [], None)))
+
+    def generate(items):
+        pages = [(ensure_scheme(final_url_after_redirect or url), chunks)
+                 for url, final_url_after_redirect, chunks, _, _ in items]
+        # With batching off (size 1) every chunk still gets a request of its own
+        page_records = generate_page_records(pages, log_func, max_chars_for_gemini,
+                                             max(1, state.llm_batch_size), state.llm_batch_tokens)
+        for (url, final_url_after_redirect, _, links, fingerprint), records in zip(items, page_records):
+            remember_derived(url, records, links, max_chars_for_gemini, fingerprint)
+            events.put(('done', url, (final_url_after_redirect, records, fingerprint)))
+
+    def weigh(item):
+        return sum(estimate_tokens(chunk) for chunk in item[2])
+
+    workers = []
+    stages = [(fetch_stats, fetch_queue, fetch, fetch_workers)]
+    if extraction_pool is None:
+        stages.append((extract_stats, extract_queue, extract, extract_workers))
+    for stats, input_queue, handle, count in stages:
+        for _ in range(max(1, count)):
+            worker = threading.Thread(target=_stage_worker, args=(stats, input_queue, stop_event, handle, events), daemon=True)
+            worker.start()
+            workers.append(worker)
+    if extraction_pool is not None:
+        # One dispatcher thread per process, each submitting up to `chunksize` pages at a time
+        for _ in range(extraction_pool.processes):
+            worker = threading.Thread(target=_batch_stage_worker,
+                                      args=(extract_stats, extract_queue, stop_event, extract_in_pool, events,
+                                            extraction_pool.chunksize, float('inf'), lambda item: 0),
+                                      daemon=True)
+            worker.start()
+            workers.append(worker)
+    for _ in range(max(1, llm_workers)):
+        worker = threading.Thread(target=_batch_stage_worker,
+                                  args=(llm_stats, llm_queue, stop_event, generate, events,
+                                        max(1, state.llm_batch_size), state.llm_batch_tokens, weigh,
+                                        lambda item: len(item[2])),
+                                  daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    in_flight = 0 # Pages dispatched to the fetchers that have not yet been completed
+    started = last_report = last_queue_metrics = time.monotonic()
+
+    def report():
+        elapsed = time.monotonic() - started
+        log_func("Pipeline: " + " | ".join(stats.summary(elapsed) for stats in (fetch_stats, extract_stats, llm_stats)))
+
+    try:
+        while state.page_count < num_pages:
+            if stop_requested():
+                raise CrawlCancelled() # Pages still in the stages are left in the frontier
+            paused = crawl_control is not None and crawl_control.paused
+            # Dispatch only as many pages as could still be needed to reach the budget,
+            # so the LLM stage is not paid for pages that would be thrown away.
+            while not paused and state.frontier and in_flight < num_pages - state.page_count and not fetch_queue.full():
+                current_url = state.frontier.pop()
+                if state.frontier.is_visited(current_url):
+                    continue
+                fetch_queue.put_nowait(current_url)
+                in_flight += 1
+
+            if not in_flight and not state.frontier:
+                break
+
+            try:
+                kind, url, payload = events.get(timeout=0.5)
+            except queue.Empty:
+                kind = None
+
+            if kind == 'error':
+                raise payload
+            elif kind == 'fetched':
+                state.frontier.mark_visited(url)
+                if payload and payload != url:
+                    state.frontier.mark_visited(payload)
+            elif kind == 'links' and state.follow_links:
+                for absolute_link, anchor_text in payload:
+                    state.frontier.add(absolute_link, anchor_text)
+            elif kind == 'done':
+                in_flight -= 1
+                final_url_after_redirect, records, fingerprint = payload
+                if records and state.page_count >= num_pages:
+                    records = []
+                state.complete_page(url, final_url_after_redirect, records, fingerprint)
+                if records:
+                    log_func(f"Collected {state.page_count}/{num_pages} pages. URLs in queue: {len(state.frontier)}")
+
+            if time.monotonic() - last_report >= PIPELINE_REPORT_INTERVAL:
+                report()
+                last_report = time.monotonic()
+            if metrics_callback is not None and time.monotonic() - last_queue_metrics >= QUEUE_METRICS_INTERVAL:
+                emit_metric('queues', depths={stats.name: stats.input_queue.qsize()
+                                              for stats in (fetch_stats, extract_stats, llm_stats)})
+                last_queue_metrics = time.monotonic()
+    finally:
+        stop_event.set()
+        for worker in workers:
+            worker.join(timeout=1)
+    report()
+
+def open_shared_resources(log_func, api_key_to_use, model_name_to_use='gemini-1.5-flash-latest',
+                          request_delay_seconds=2,
+                          crawl_mode='sequential',
+                          llm_cache_file=None,
+                          llm_cache_max_mb=llm_cache.DEFAULT_MAX_MB,
+                          http_cache_file=None,
+                          http_cache_max_mb=http_cache_store.DEFAULT_MAX_MB,
+                          http_cache_max_age_days=http_cache_store.DEFAULT_MAX_AGE_DAYS,
+                          extraction_processes=DEFAULT_EXTRACTION_PROCESSES,
+                          extraction_chunksize=DEFAULT_EXTRACTION_CHUNKSIZE,
+                          dedup_threshold=None,
+                          respect_robots=True,
+                          metrics_callback=None,
+                          control=None,
+                          llm_config=None,
+                          profile=None):
+    """
+    Configures everything crawls in this process share: the LLM backends (the
+    `llm_config` list, or just Gemini `model_name_to_use`), their rate limiters
+    and response cache, the HTTP cache, robots.txt rules, the per-host
+    scheduler, the extraction pool, the near-duplicate index, the metrics event
+    receiver, the stop/pause control and the stage profiler, with the optional
+    `profile` capture (see stage_profiler.py).
+    """
+    configure_metrics(metrics_callback)
+    configure_crawl_control(control)
+    configure_stage_profiler(StageProfiler(profile))
+    stage_profiler.start() # From this thread, so a cProfile capture follows the crawl in sequential mode
+    if profile:
+        log_func(f"Profiling: {profile} capture")
+        if profile in ('cprofile', 'all') and crawl_mode != 'sequential':
+            log_func("cProfile only sees the thread coordinating the crawl; worker threads show up in the stage timings only.")
+    if llm_config:
+        if not configure_llm_backends(llm_config, api_key_to_use):
+            log_func("Some LLM backends could not be configured. Continuing with the rest.")
+        if not llm_chain:
+            log_func("No LLM backend available. Proceeding without Q&A generation.")
+    elif not configure_gemini(api_key_to_use, model_name_to_use):
+        log_func("Gemini API key not configured or invalid. Proceeding without Q&A generation.")
+
+    if configure_gemini_cache(llm_cache_file, llm_cache_max_mb):
+        log_func(f"Using Gemini response cache: {llm_cache_file} ({len(gemini_cache)} entries)")
+    if configure_http_cache(http_cache_file, http_cache_max_mb, http_cache_max_age_days):
+        log_func(f"Using HTTP cache: {http_cache_file} ({len(http_cache)} pages)")
+
+    if llm_config:
+        log_func(f"LLM backends, in order: {', '.join(backend.describe() for backend in llm_chain) or 'none'}")
+    else:
+        log_func(f"Using Gemini model: {model_name_to_use}")
+    log_func(f"Request delay: {request_delay_seconds}s per host (a robots.txt Crawl-delay takes precedence)")
+    if not configure_robots(respect_robots):
+        log_func("Ignoring robots.txt.")
+    configure_host_scheduler(request_delay_seconds, log_func)
+    log_func(f"Gemini limits: {GEMINI_LIMITS['requests_per_minute'] or 'unlimited'} requests/min, "
+             f"{GEMINI_LIMITS['tokens_per_minute'] or 'unlimited'} tokens/min")
+    if extraction_processes > 0:
+        if crawl_mode == 'sequential':
+            log_func("Process-pool extraction only applies to the async and pipeline crawl modes. Extracting in-process.")
+        elif configure_extraction_pool(extraction_processes, extraction_chunksize):
+            log_func(f"Extraction processes: {extraction_processes} (chunks of {extraction_chunksize})")
+    if configure_near_duplicates(dedup_threshold):
+        log_func(f"Near-duplicate filter: similarity >= {dedup_threshold:.2f}")
+
+def close_shared_resources(log_func, dedup_report=None, timing_report=None):
+    """Logs the shared resources' statistics and releases them, ending with the run's stage timings."""
+    if stage_profiler is not None:
+        stage_profiler.stop()
+    if gemini_cache is not None:
+        log_func(f"Gemini cache: {gemini_cache.stats_summary()}")
+        configure_gemini_cache(None)
+    if http_cache is not None:
+        log_func(f"HTTP cache: {http_cache.stats_summary()}")
+        configure_http_cache(None)
+    configure_extraction_pool(0)
+    configure_host_scheduler(None)
+    configure_metrics(None)
+    configure_crawl_control(None)
+    if gemini_limiter is not None:
+        log_func(f"Gemini rate limiter: {gemini_limiter.stats_summary()}")
+        configure_gemini_limits() # Start the next run with a fresh limiter
+    if dedup_index is not None:
+        log_func(f"Near-duplicates: {dedup_index.stats_summary()}")
+        if dedup_report:
+            try:
+                dedup_index.write_report(dedup_report)
+                log_func(f"Near-duplicate report saved to {dedup_report}")
+            except IOError as e:
+                log_func(f"Error saving near-duplicate report to {dedup_report}: {e}")
+        configure_near_duplicates(None)
+    if stage_profiler is not None:
+        for line in stage_profiler.summary_lines():
+            log_func(line)
+        if timing_report:
+            try:
+                stage_profiler.write_report(timing_report)
+                log_func(f"Timing report saved to {timing_report}")
+            except IOError as e:
+                log_func(f"Error saving timing report to {timing_report}: {e}")
+        configure_stage_profiler(None)
+
+def check_crawl_settings(log_func, crawl_mode, output_format):
+    """Logs and returns False for settings no crawl can run with."""
+    if crawl_mode not in CRAWL_MODES:
+        log_func(f"Unknown crawl mode '{crawl_mode}'. Must be one of: {', '.join(CRAWL_MODES)}. Aborting.")
+        return False
+    if output_format not in OUTPUT_FORMATS:
+        log_func(f"Unknown output format '{output_format}'. Must be one of: {', '.join(OUTPUT_FORMATS)}. Aborting.")
+        return False
+    return True
+
+def crawl_site(start_url, num_pages, output_file, log_func,
+               request_delay_seconds=2,
+               max_chars_for_gemini=28000,
+               crawl_mode='sequential',
+               concurrency=DEFAULT_CONCURRENCY,
+               per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY,
+               extract_workers=DEFAULT_EXTRACT_WORKERS,
+               llm_workers=DEFAULT_LLM_WORKERS,
+               queue_size=DEFAULT_QUEUE_SIZE,
+               state_file=None,
+               resume=False,
+               output_format='json',
+               compression='none',
+               flush_every=DEFAULT_FLUSH_EVERY,
+               finalize_to=None,
+               llm_batch_size=DEFAULT_LLM_BATCH_SIZE,
+               llm_batch_tokens=DEFAULT_LLM_BATCH_TOKENS,
+               url_filter=None):
+    """
+    Crawls one site with the shared resources already configured and saves its
+    records. Returns the CrawlState, or None if the crawl could not start.
+    """
+    site_started = time.monotonic()
+    log_func(f"Starting crawl from: {start_url}")
+    log_func(f"Max pages to retrieve: {num_pages}")
+    log_func(f"Max chars for Gemini: {max_chars_for_gemini}")
+    log_func(f"Crawl mode: {crawl_mode}")
+    log_func(f"Frontier order: {FRONTIER['order']}, discovery: {FRONTIER['discovery']}")
+    if llm_batch_size > 1:
+        log_func(f"Gemini batching: up to {llm_batch_size} chunks / ~{llm_batch_tokens} tokens per request")
+    if crawl_mode == 'async':
+        log_func(f"Concurrency: {concurrency} (max {per_host_concurrency} per host)")
+    elif crawl_mode == 'pipeline':
+        log_func(f"Pipeline workers: {concurrency} fetch, {extract_workers} extract, {llm_workers} LLM (queue size {queue_size})")
+
+    checkpoint = None
+    if state_file:
+        try:
+            checkpoint = CrawlCheckpoint(state_file)
+        except sqlite3.Error as e:
+            log_func(f"Error opening crawl checkpoint {state_file}: {e}. Aborting.")
+            return None
+        if resume and checkpoint.has_state():
+            checkpointed_start_url = checkpoint.get_meta('start_url')
+            if checkpointed_start_url != start_url:
+                log_func(f"Checkpoint {state_file} belongs to a crawl of {checkpointed_start_url}, not {start_url}. Aborting.")
+                checkpoint.close()
+                return None
+        else:
+            if resume:
+                log_func(f"No checkpoint found in {state_file}. Starting a fresh crawl.")
+            checkpoint.reset()
+
+    writer = None
+    if output_format == 'jsonl':
+        try:
+            writer = JsonlWriter(output_file, compression, flush_every)
+        except (IOError, RuntimeError) as e:
+            log_func(f"Error opening output stream {output_file}: {e}. Aborting.")
+            if checkpoint:
+                checkpoint.close()
+            return None
+        log_func(f"Streaming records to {output_file} (compression: {compression})")
+
+    # A resumed crawl already holds its seeds, so sitemaps are only read again to score the frontier
+    resuming = checkpoint is not None and checkpoint.has_state()
+    seeding = FRONTIER["discovery"] != 'links' and not resuming
+    sitemap_entries = []
+    if seeding or (FRONTIER["order"] == 'scored' and FRONTIER["sitemap_hints"]):
+        sitemap_entries = read_sitemap_entries(start_url, request_delay_seconds, log_func)
+    seed_urls = [url for url, _ in sitemap_entries] if seeding else []
+    follow_links = FRONTIER["discovery"] != 'sitemap' or not seed_urls
+    if seeding and not seed_urls and FRONTIER["discovery"] == 'sitemap':
+        log_func("No sitemap URLs to seed the frontier with. Following links from the start URL instead.")
+    state = CrawlState(start_url, checkpoint, writer, llm_batch_size, llm_batch_tokens, url_filter,
+                       new_url_scorer(sitemap_entries), seed_urls, follow_links)
+    if seed_urls:
+        log_func(f"Seeded the frontier with {state.seeded} sitemap URLs" +
+                 ("" if state.follow_links else "; links found on pages will not be followed"))
+    if checkpoint:
+        log_func(f"Checkpointing crawl state to: {state_file}")
+        if resume and state.page_count:
+            log_func(f"Resuming with {state.page_count} pages ({state.record_count} records) already collected and {len(state.frontier)} URLs in queue.")
+
+    crawl_started = time.monotonic()
+    emit_metric('crawl_started', start_url=start_url, num_pages=num_pages, page_count=state.page_count)
+    try:
+        if crawl_mode == 'async':
+            run_async_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                            concurrency, per_host_concurrency)
+        elif crawl_mode == 'pipeline':
+            run_pipeline_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini,
+                               concurrency, extract_workers, llm_workers, queue_size)
+        else:
+            run_sequential_crawl(state, num_pages, log_func, request_delay_seconds, max_chars_for_gemini)
+        state.flush_llm_batch(log_func, max_chars_for_gemini)
+    except CrawlCancelled:
+        # Pages still in flight (or held for a batched request) stay unvisited, so --resume picks them up
+        log_func(f"Crawl stopped. Keeping the {state.emitted_count} records collected so far.")
+        if checkpoint:
+            log_func(f"Run again with --resume to continue from {state_file}.")
+    finally:
+        if writer:
+            writer.close()
+        if checkpoint:
+            checkpoint.close()
+        emit_metric('crawl_finished', page_count=state.page_count, record_count=state.record_count,
+                    seconds=time.monotonic() - crawl_started)
 
     # Save the data
+    if writer:
+        log_func(f"Successfully streamed {writer.records_written} records to {output_file}")
+        if finalize_to:
+            try:
+                with profile_stage('output'):
+                    count = finalize_jsonl(output_file, finalize_to, compression)
+                log_func(f"Finalized {count} records into {finalize_to}")
+            except (IOError, RuntimeError, ValueError) as e:
+                log_func(f"Error finalizing {output_file} into {finalize_to}: {e}")
+    else:
+        try:
+            with profile_stage('output'), open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(state.collected_data, f, indent=4, ensure_ascii=False)
+            log_func(f"Successfully saved data to {output_file}")
+        except IOError as e:
+            log_func(f"Error saving data to {output_file}: {e}")
+    if stage_profiler is not None:
+        stage_profiler.add_site(start_url, state.page_count, state.record_count, time.monotonic() - site_started)
+    return state
+
+def run_web_to_json_conversion(start_url_from_user, num_pages, output_file, api_key_to_use, progress_callback,
+                               model_name_to_use='gemini-1.5-flash-latest', 
+                               request_delay_seconds=2, 
+                               max_chars_for_gemini=28000,
+                               crawl_mode='sequential',
+                               concurrency=DEFAULT_CONCURRENCY,
+                               per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY,
+                               extract_workers=DEFAULT_EXTRACT_WORKERS,
+                               llm_workers=DEFAULT_LLM_WORKERS,
+                               queue_size=DEFAULT_QUEUE_SIZE,
+                               state_file=None,
+                               resume=False,
+                               output_format='json',
+                               compression='none',
+                               flush_every=DEFAULT_FLUSH_EVERY,
+                               finalize_to=None,
+                               llm_cache_file=None,
+                               llm_cache_max_mb=llm_cache.DEFAULT_MAX_MB,
+                               http_cache_file=None,
+                               http_cache_max_mb=http_cache_store.DEFAULT_MAX_MB,
+                               http_cache_max_age_days=http_cache_store.DEFAULT_MAX_AGE_DAYS,
+                               llm_batch_size=DEFAULT_LLM_BATCH_SIZE,
+                               llm_batch_tokens=DEFAULT_LLM_BATCH_TOKENS,
+                               extraction_processes=DEFAULT_EXTRACTION_PROCESSES,
+                               extraction_chunksize=DEFAULT_EXTRACTION_CHUNKSIZE,
+                               dedup_threshold=None,
+                               dedup_report=None,
+                               respect_robots=True,
+                               include_patterns=None,
+                               exclude_patterns=None,
+                               metrics_callback=None,
+                               control=None,
+                               llm_config=None,
+                               timing_report=None,
+                               profile=None):
+    """
+    Crawls one site into `output_file`. `progress_callback` receives log lines;
+    the optional `metrics_callback` receives structured events (see crawl_metrics.py).
+    A `control` (crawl_control.CrawlControl) stops or pauses the crawl from another
+    thread; a stopped crawl still saves the records collected so far. `llm_config`
+    lists LLM backends to use instead of Gemini `model_name_to_use` (see llm_backends.py).
+    The run ends with a per-stage timing summary, also written as JSON to
+    `timing_report`; `profile` adds a cProfile or tracemalloc capture (see stage_profiler.py).
+    """
+    log_func = progress_callback or print
+    
+    start_url = ensure_scheme(start_url_from_user)
+    if urlparse(start_url).scheme not in ["http", "https"]:
+        log_func(f"Invalid starting URL scheme for {start_url_from_user}. Must be http or https. Aborting.")
+        return [] 
+
+    if not check_crawl_settings(log_func, crawl_mode, output_format):
+        return []
+
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(collected_data, f, indent=4, ensure_ascii=False)
-        log_func(f"Successfully saved data to {output_file}")
-    except IOError as e:
-        log_func(f"Error saving data to {output_file}: {e}")
+        url_filter = make_url_filter(include_patterns, exclude_patterns)
+    except re.error as e:
+        log_func(f"Invalid include/exclude pattern: {e}. Aborting.")
+        return []
+
+    open_shared_resources(log_func, api_key_to_use,
+                          model_name_to_use=model_name_to_use,
+                          request_delay_seconds=request_delay_seconds,
+                          crawl_mode=crawl_mode,
+                          llm_cache_file=llm_cache_file,
+                          llm_cache_max_mb=llm_cache_max_mb,
+                          http_cache_file=http_cache_file,
+                          http_cache_max_mb=http_cache_max_mb,
+                          http_cache_max_age_days=http_cache_max_age_days,
+                          extraction_processes=extraction_processes,
+                          extraction_chunksize=extraction_chunksize,
+                          dedup_threshold=dedup_threshold,
+                          respect_robots=respect_robots,
+                          metrics_callback=metrics_callback,
+                          control=control,
+                          llm_config=llm_config,
+                          profile=profile)
+    try:
+        state = crawl_site(start_url, num_pages, output_file, log_func,
+                           request_delay_seconds=request_delay_seconds,
+                           max_chars_for_gemini=max_chars_for_gemini,
+                           crawl_mode=crawl_mode,
+                           concurrency=concurrency,
+                           per_host_concurrency=per_host_concurrency,
+                           extract_workers=extract_workers,
+                           llm_workers=llm_workers,
+                           queue_size=queue_size,
+                           state_file=state_file,
+                           resume=resume,
+                           output_format=output_format,
+                           compression=compression,
+                           flush_every=flush_every,
+                           finalize_to=finalize_to,
+                           llm_batch_size=llm_batch_size,
+                           llm_batch_tokens=llm_batch_tokens,
+                           url_filter=url_filter)
+    finally:
+        close_shared_resources(log_func, dedup_report, timing_report)
 
     # TODO: Implement the rest of the agent logic
     # 1. Link Discovery & Selection (Loop) - Partially done
@@ -267,26 +2168,374 @@ def run_web_to_json_conversion(start_url_from_user, num_pages, output_file, api_
     # 3. JSON Transformation (using Gemini or other methods) (Inside Loop) - Placeholder added
     # 4. Save Output - Done
 
-    return collected_data # Return the data for potential use in GUI (e.g. display summary)
+    if state is None:
+        return []
+    return state.collected_data # Return the data for potential use in GUI (e.g. display summary)
+
+# --- Batch Mode ---
+
+def run_crawl_manifest(manifest_path, api_key_to_use, progress_callback,
+                       model_name_to_use='gemini-1.5-flash-latest',
+                       request_delay_seconds=2,
+                       max_chars_for_gemini=28000,
+                       default_num_pages=DEFAULT_MAX_PAGES,
+                       parallel_sites=DEFAULT_PARALLEL_SITES,
+                       crawl_mode='sequential',
+                       concurrency=DEFAULT_CONCURRENCY,
+                       per_host_concurrency=DEFAULT_PER_HOST_CONCURRENCY,
+                       extract_workers=DEFAULT_EXTRACT_WORKERS,
+                       llm_workers=DEFAULT_LLM_WORKERS,
+                       queue_size=DEFAULT_QUEUE_SIZE,
+                       use_checkpoints=True,
+                       resume=False,
+                       output_format='json',
+                       compression='none',
+                       flush_every=DEFAULT_FLUSH_EVERY,
+                       llm_cache_file=None,
+                       llm_cache_max_mb=llm_cache.DEFAULT_MAX_MB,
+                       http_cache_file=None,
+                       http_cache_max_mb=http_cache_store.DEFAULT_MAX_MB,
+                       http_cache_max_age_days=http_cache_store.DEFAULT_MAX_AGE_DAYS,
+                       llm_batch_size=DEFAULT_LLM_BATCH_SIZE,
+                       llm_batch_tokens=DEFAULT_LLM_BATCH_TOKENS,
+                       extraction_processes=DEFAULT_EXTRACTION_PROCESSES,
+                       extraction_chunksize=DEFAULT_EXTRACTION_CHUNKSIZE,
+                       dedup_threshold=None,
+                       dedup_report=None,
+                       respect_robots=True,
+                       control=None,
+                       llm_config=None,
+                       timing_report=None,
+                       profile=None):
+    """
+    Crawls every site of a manifest (see crawl_manifest.py) in this process,
+    `parallel_sites` at a time. The sites share one HTTP connection pool, Gemini
+    model, rate limiter, caches, robots.txt cache and per-host scheduler, so two
+    sites on the same host are still spaced politely.
+
+    With `use_checkpoints`, each site keeps its state in `<output_file>.state.db`
+    (or the manifest's state_file). A stopped `control` lets running sites save
+    what they have and skips the sites not yet started. The timing report covers
+    the whole batch, with a line per site. Returns {start_url: record count}.
+    """
+    log_func = progress_callback or print
+
+    if not check_crawl_settings(log_func, crawl_mode, output_format):
+        return {}
+    try:
+        sites = load_manifest(manifest_path, default_num_pages, output_format)
+        for site in sites:
+            site['url_filter'] = make_url_filter(site['include'], site['exclude'])
+    except (IOError, ValueError, re.error) as e:
+        log_func(f"Error reading manifest {manifest_path}: {e}. Aborting.")
+        return {}
+    log_func(f"Loaded {len(sites)} sites from {manifest_path}. Crawling {min(parallel_sites, len(sites))} at a time.")
+
+    results = {}
+    results_lock = threading.Lock()
+    started = time.monotonic()
+    # crawl_site settings every site shares
+    site_settings = dict(
+        request_delay_seconds=request_delay_seconds,
+        max_chars_for_gemini=max_chars_for_gemini,
+        crawl_mode=crawl_mode,
+        concurrency=concurrency,
+        per_host_concurrency=per_host_concurrency,
+        extract_workers=extract_workers,
+        llm_workers=llm_workers,
+        queue_size=queue_size,
+        resume=resume,
+        output_format=output_format,
+        compression=compression,
+        flush_every=flush_every,
+        llm_batch_size=llm_batch_size,
+        llm_batch_tokens=llm_batch_tokens,
+    )
+
+    def crawl_manifest_site(site):
+        start_url = ensure_scheme(site['start_url'])
+        label = urlparse(start_url).netloc or start_url
+
+        def site_log(message):
+            log_func(f"[{label}] {message}")
+
+        if urlparse(start_url).scheme not in ["http", "https"]:
+            site_log(f"Invalid starting URL scheme for {site['start_url']}. Must be http or https. Skipping.")
+            return
+        if stop_requested():
+            site_log("Batch stopped. Skipping.")
+            return
+        site_started = time.monotonic()
+        state_file = site['state_file'] or (f"{site['output_file']}.state.db" if use_checkpoints else None)
+        try:
+            state = crawl_site(start_url, site['num_pages'], site['output_file'], site_log,
+                               state_file=state_file,
+                               url_filter=site['url_filter'],
+                               **site_settings)
+        except Exception as e:
+            # One broken site must not take the rest of the batch down with it
+            site_log(f"Crawl failed: {e}")
+            return
+        if state is None:
+            return
+        elapsed = time.monotonic() - site_started
+        site_log(f"Finished: {state.record_count} records in {elapsed:.1f}s")
+        with results_lock:
+            results[start_url] = state.record_count
+
+    open_shared_resources(log_func, api_key_to_use,
+                          model_name_to_use=model_name_to_use,
+                          request_delay_seconds=request_delay_seconds,
+                          crawl_mode=crawl_mode,
+                          llm_cache_file=llm_cache_file,
+                          llm_cache_max_mb=llm_cache_max_mb,
+                          http_cache_file=http_cache_file,
+                          http_cache_max_mb=http_cache_max_mb,
+                          http_cache_max_age_days=http_cache_max_age_days,
+                          extraction_processes=extraction_processes,
+                          extraction_chunksize=extraction_chunksize,
+                          dedup_threshold=dedup_threshold,
+                          respect_robots=respect_robots,
+                          metrics_callback=None,
+                          control=control,
+                          llm_config=llm_config,
+                          profile=profile)
+    if profile in ('cprofile', 'all'):
+        log_func("cProfile only sees the thread starting the batch, not the site crawls; their time shows up in the stage timings.")
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, parallel_sites)) as site_pool:
+            list(site_pool.map(crawl_manifest_site, sites))
+    finally:
+        close_shared_resources(log_func, dedup_report, timing_report)
+
+    elapsed = time.monotonic() - started
+    total_records = sum(results.values())
+    log_func(f"Batch finished: {len(results)}/{len(sites)} sites, {total_records} records in {elapsed:.1f}s "
+             f"({total_records / elapsed if elapsed else 0:.2f} records/s, "
+             f"{60 * total_records / elapsed if elapsed else 0:.1f} records/min)")
+    return results
 
 # --- Main Agent Logic (for command-line usage) ---
 def main_cli():
     parser = argparse.ArgumentParser(description="Web Content to LLM Fine-tuning JSON Agent - CLI")
-    parser.add_argument("start_url", help="The starting URL to crawl.")
+    parser.add_argument("start_url", nargs='?', help="The starting URL to crawl (omit when using --manifest).")
+    parser.add_argument("--manifest", default=None,
+                        help="YAML or JSONL manifest of sites to crawl in one process instead of a single start_url.")
+    parser.add_argument("--parallel_sites", type=int, default=DEFAULT_PARALLEL_SITES,
+                        help=f"Manifest sites crawled at the same time (default: {DEFAULT_PARALLEL_SITES}).")
+    parser.add_argument("--include", action="append", default=None,
+                        help="Only queue discovered URLs matching this regular expression (repeatable).")
+    parser.add_argument("--exclude", action="append", default=None,
+                        help="Never queue discovered URLs matching this regular expression (repeatable).")
     parser.add_argument("-n", "--num_pages", type=int, default=DEFAULT_MAX_PAGES, 
                         help=f"Maximum number of pages to crawl (default: {DEFAULT_MAX_PAGES}).")
     parser.add_argument("-o", "--output_file", default="fine_tuning_data.json", 
                         help="Path to save the output JSON file (default: fine_tuning_data.json).")
     parser.add_argument("--api_key", help="Gemini API Key. If not provided, will try to use GENAI_API_KEY environment variable.", default=None)
+    parser.add_argument("--crawl_mode", choices=CRAWL_MODES, default='sequential',
+                        help="Crawl engine: 'sequential', 'async' or 'pipeline' (default: sequential).")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Max fetches in flight in async mode, or fetcher threads in pipeline mode (default: {DEFAULT_CONCURRENCY}).")
+    parser.add_argument("--per_host_concurrency", type=int, default=DEFAULT_PER_HOST_CONCURRENCY,
+                        help=f"Max fetches in flight per host in async mode (default: {DEFAULT_PER_HOST_CONCURRENCY}).")
+    parser.add_argument("--delay", type=float, default=REQUEST_DELAY,
+                        help=f"Delay between requests to the same host, in seconds (default: {REQUEST_DELAY}).")
+    parser.add_argument("--ignore_robots", action="store_true",
+                        help="Do not fetch or obey robots.txt (rules and Crawl-delay).")
+    parser.add_argument("--frontier_order", choices=FRONTIER_ORDERS, default=FRONTIER["order"],
+                        help="'scored' fetches likely content pages first (URL depth and patterns, link text, sitemap, yield of sibling pages); 'fifo' crawls breadth-first (default: scored).")
+    parser.add_argument("--no_sitemap_hints", action="store_true",
+                        help="Do not read the site's sitemaps to score the frontier.")
+    parser.add_argument("--discovery", choices=DISCOVERY_MODES, default=FRONTIER["discovery"],
+                        help="'links' follows links from the start URL; 'sitemap' seeds the frontier from the site's sitemaps (indexes and gzip included) and follows no links; 'both' does both (default: links).")
+    parser.add_argument("--sitemap", nargs="+", default=None, metavar="URL",
+                        help="Sitemap or sitemap index URLs to read instead of those listed in robots.txt (default: robots.txt, else /sitemap.xml).")
+    parser.add_argument("--modified_since", default=None, metavar="DATE",
+                        help="Skip sitemap entries, and whole sitemaps of an index, last modified before this date (e.g. 2024-06-01).")
+    parser.add_argument("--max_sitemap_urls", type=int, default=FRONTIER["max_sitemap_urls"],
+                        help=f"Sitemap entries kept per site at most (default: {FRONTIER['max_sitemap_urls']}).")
+    parser.add_argument("--state_file", default=None,
+                        help="Path of the crawl checkpoint database (default: <output_file>.state.db).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the crawl stored in the checkpoint instead of starting over.")
+    parser.add_argument("--output_format", choices=OUTPUT_FORMATS, default='json',
+                        help="'json' writes one JSON array at the end; 'jsonl' streams each record as it is produced (default: json).")
+    parser.add_argument("--compression", choices=COMPRESSIONS, default='none',
+                        help="Compression of the JSONL stream (default: none).")
+    parser.add_argument("--flush_every", type=int, default=DEFAULT_FLUSH_EVERY,
+                        help=f"Flush the JSONL stream every N records (default: {DEFAULT_FLUSH_EVERY}).")
+    parser.add_argument("--finalize_to", default=None,
+                        help="After a JSONL run, also convert the stream into a pretty-printed JSON array at this path.")
+    parser.add_argument("--llm_cache", default=DEFAULT_LLM_CACHE_FILE,
+                        help=f"On-disk Gemini response cache (default: {DEFAULT_LLM_CACHE_FILE}).")
+    parser.add_argument("--no_llm_cache", action="store_true",
+                        help="Disable the Gemini response cache.")
+    parser.add_argument("--llm_cache_max_mb", type=float, default=llm_cache.DEFAULT_MAX_MB,
+                        help=f"Size limit of the Gemini response cache in MB (default: {llm_cache.DEFAULT_MAX_MB}).")
+    parser.add_argument("--http_cache", default=DEFAULT_HTTP_CACHE_FILE,
+                        help=f"Conditional-request HTTP cache for re-crawls (default: {DEFAULT_HTTP_CACHE_FILE}).")
+    parser.add_argument("--no_http_cache", action="store_true",
+                        help="Disable the HTTP cache.")
+    parser.add_argument("--http_cache_max_mb", type=float, default=http_cache_store.DEFAULT_MAX_MB,
+                        help=f"Size limit of the HTTP cache in MB (default: {http_cache_store.DEFAULT_MAX_MB}).")
+    parser.add_argument("--http_cache_max_age_days", type=float, default=http_cache_store.DEFAULT_MAX_AGE_DAYS,
+                        help=f"Drop cached pages older than this many days (default: {http_cache_store.DEFAULT_MAX_AGE_DAYS}).")
+    parser.add_argument("--pool_size", type=int, default=HTTP_CLIENT["pool_size"],
+                        help=f"Keep-alive connections per host (default: {HTTP_CLIENT['pool_size']}).")
+    parser.add_argument("--max_retries", type=int, default=HTTP_CLIENT["max_retries"],
+                        help=f"Retries with exponential backoff on connection errors, 429 and 5xx (default: {HTTP_CLIENT['max_retries']}).")
+    parser.add_argument("--backoff_factor", type=float, default=HTTP_CLIENT["backoff_factor"],
+                        help=f"Base of the exponential retry backoff in seconds (default: {HTTP_CLIENT['backoff_factor']}).")
+    parser.add_argument("--max_retry_wait", type=float, default=HTTP_CLIENT["max_retry_wait"],
+                        help=f"Longest wait between HTTP retries in seconds, also capping Retry-After (default: {HTTP_CLIENT['max_retry_wait']}).")
+    parser.add_argument("--timeout", type=float, default=HTTP_CLIENT["timeout"],
+                        help=f"Per-request timeout in seconds (default: {HTTP_CLIENT['timeout']}).")
+    parser.add_argument("--max_response_mb", type=float, default=HTTP_CLIENT["max_response_bytes"] / (1024 * 1024),
+                        help="Abandon responses larger than this many MB (default: 10).")
+    parser.add_argument("--llm_batch_size", type=int, default=DEFAULT_LLM_BATCH_SIZE,
+                        help=f"Page chunks (one record each) packed into one Gemini request; a page's chunks may "
+                             f"span requests. 1 disables batching (default: {DEFAULT_LLM_BATCH_SIZE}).")
+    parser.add_argument("--llm_batch_tokens", type=int, default=DEFAULT_LLM_BATCH_TOKENS,
+                        help=f"Estimated prompt tokens allowed in one batched request (default: {DEFAULT_LLM_BATCH_TOKENS}).")
+    parser.add_argument("--dedup_threshold", type=float, default=near_duplicates.DEFAULT_THRESHOLD,
+                        help=f"SimHash similarity (0-1) at which a page counts as a near-duplicate of an earlier one and is skipped (default: {near_duplicates.DEFAULT_THRESHOLD}).")
+    parser.add_argument("--no_dedup", action="store_true",
+                        help="Disable near-duplicate filtering.")
+    parser.add_argument("--dedup_report", default=None,
+                        help="Path of the JSON report of collapsed near-duplicates (default: <output_file>.duplicates.json).")
+    parser.add_argument("--timing_report", default=None,
+                        help="Path of the JSON report of time, CPU, bytes and calls per crawl stage (default: <output_file>.timings.json).")
+    parser.add_argument("--profile", choices=STAGE_PROFILER_CAPTURES, default=None,
+                        help="Also capture a cProfile of the crawl thread (saved next to the timing report as .prof), tracemalloc allocation sites, or both ('all').")
+    parser.add_argument("--extraction_processes", type=int, default=DEFAULT_EXTRACTION_PROCESSES,
+                        help="Worker processes for HTML parsing and extraction in async/pipeline mode; 0 extracts on the crawl threads (default: 0).")
+    parser.add_argument("--extraction_chunksize", type=int, default=DEFAULT_EXTRACTION_CHUNKSIZE,
+                        help=f"Pages per task submitted to an extraction process in pipeline mode (default: {DEFAULT_EXTRACTION_CHUNKSIZE}).")
+    parser.add_argument("--llm_config", default=None,
+                        help="YAML/JSON list of LLM backends (Gemini or OpenAI-compatible endpoints) tried in order, replacing the single Gemini model. See llm_backends.py.")
+    parser.add_argument("--gemini_rpm", type=int, default=GEMINI_LIMITS["requests_per_minute"],
+                        help=f"Gemini requests per minute shared by all workers; 0 for no limit (default: {GEMINI_LIMITS['requests_per_minute']}).")
+    parser.add_argument("--gemini_tpm", type=int, default=GEMINI_LIMITS["tokens_per_minute"],
+                        help=f"Gemini tokens per minute shared by all workers; 0 for no limit (default: {GEMINI_LIMITS['tokens_per_minute']}).")
+    parser.add_argument("--chunk_tokens", type=int, default=None,
+                        help="Token budget of each chunk of page text sent to Gemini (default: derived from the Gemini character limit).")
+    parser.add_argument("--max_chunks_per_page", type=int, default=CHUNKING["max_chunks_per_page"],
+                        help=f"Q&A records generated per page at most, one per chunk; 0 for no cap (default: {CHUNKING['max_chunks_per_page']}).")
+    parser.add_argument("--extract_workers", type=int, default=DEFAULT_EXTRACT_WORKERS,
+                        help=f"Extraction threads in pipeline mode (default: {DEFAULT_EXTRACT_WORKERS}).")
+    parser.add_argument("--llm_workers", type=int, default=DEFAULT_LLM_WORKERS,
+                        help=f"Gemini threads in pipeline mode (default: {DEFAULT_LLM_WORKERS}).")
+    parser.add_argument("--queue_size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Capacity of each queue between pipeline stages (default: {DEFAULT_QUEUE_SIZE}).")
     
     args = parser.parse_args()
+    if bool(args.start_url) == bool(args.manifest):
+        parser.error("give either a start_url or --manifest")
 
     api_key = args.api_key or os.environ.get("GENAI_API_KEY")
 
+    configure_http_client(pool_size=args.pool_size,
+                          max_retries=args.max_retries,
+                          backoff_factor=args.backoff_factor,
+                          max_retry_wait=args.max_retry_wait,
+                          timeout=args.timeout,
+                          max_response_bytes=int(args.max_response_mb * 1024 * 1024))
+    configure_gemini_limits(requests_per_minute=args.gemini_rpm, tokens_per_minute=args.gemini_tpm)
+    configure_chunking(chunk_tokens=args.chunk_tokens, max_chunks_per_page=args.max_chunks_per_page)
+    modified_since = None
+    if args.modified_since:
+        modified_since = parse_lastmod(args.modified_since)
+        if modified_since is None:
+            parser.error(f"--modified_since must be an ISO date such as 2024-06-01, not {args.modified_since}")
+    configure_frontier(order=args.frontier_order, sitemap_hints=not args.no_sitemap_hints, discovery=args.discovery,
+                       sitemap_urls=args.sitemap, modified_since=modified_since, max_sitemap_urls=args.max_sitemap_urls)
+
     def cli_progress_callback(message):
         print(message)
 
-    run_web_to_json_conversion(args.start_url, args.num_pages, args.output_file, api_key, cli_progress_callback)
+    llm_config = None
+    if args.llm_config:
+        try:
+            llm_config = llm_backends.load_backend_configs(args.llm_config)
+        except (IOError, ValueError) as e:
+            parser.error(f"could not read --llm_config {args.llm_config}: {e}")
+
+    # Ctrl+C stops the crawl gracefully so the records collected so far are saved; a second one aborts
+    control = CrawlControl()
+
+    def handle_sigint(signum, frame):
+        if control.stopped:
+            raise KeyboardInterrupt
+        print("Stopping: finishing the pages in progress and saving results. Press Ctrl+C again to abort.")
+        control.stop()
+
+    signal.signal(signal.SIGINT, handle_sigint)
+
+    if args.manifest:
+        run_crawl_manifest(args.manifest, api_key, cli_progress_callback,
+                           request_delay_seconds=args.delay,
+                           default_num_pages=args.num_pages,
+                           parallel_sites=args.parallel_sites,
+                           crawl_mode=args.crawl_mode,
+                           concurrency=args.concurrency,
+                           per_host_concurrency=args.per_host_concurrency,
+                           extract_workers=args.extract_workers,
+                           llm_workers=args.llm_workers,
+                           queue_size=args.queue_size,
+                           resume=args.resume,
+                           output_format=args.output_format,
+                           compression=args.compression,
+                           flush_every=args.flush_every,
+                           llm_cache_file=None if args.no_llm_cache else args.llm_cache,
+                           llm_cache_max_mb=args.llm_cache_max_mb,
+                           http_cache_file=None if args.no_http_cache else args.http_cache,
+                           http_cache_max_mb=args.http_cache_max_mb,
+                           http_cache_max_age_days=args.http_cache_max_age_days,
+                           llm_batch_size=args.llm_batch_size,
+                           llm_batch_tokens=args.llm_batch_tokens,
+                           extraction_processes=args.extraction_processes,
+                           extraction_chunksize=args.extraction_chunksize,
+                           dedup_threshold=None if args.no_dedup else args.dedup_threshold,
+                           dedup_report=args.dedup_report or f"{args.manifest}.duplicates.json",
+                           respect_robots=not args.ignore_robots,
+                           control=control,
+                           llm_config=llm_config,
+                           timing_report=args.timing_report or f"{args.manifest}.timings.json",
+                           profile=args.profile)
+        return
+
+    run_web_to_json_conversion(args.start_url, args.num_pages, args.output_file, api_key, cli_progress_callback,
+                               request_delay_seconds=args.delay,
+                               crawl_mode=args.crawl_mode,
+                               concurrency=args.concurrency,
+                               per_host_concurrency=args.per_host_concurrency,
+                               extract_workers=args.extract_workers,
+                               llm_workers=args.llm_workers,
+                               queue_size=args.queue_size,
+                               state_file=args.state_file or f"{args.output_file}.state.db",
+                               resume=args.resume,
+                               output_format=args.output_format,
+                               compression=args.compression,
+                               flush_every=args.flush_every,
+                               finalize_to=args.finalize_to,
+                               llm_cache_file=None if args.no_llm_cache else args.llm_cache,
+                               llm_cache_max_mb=args.llm_cache_max_mb,
+                               http_cache_file=None if args.no_http_cache else args.http_cache,
+                               http_cache_max_mb=args.http_cache_max_mb,
+                               http_cache_max_age_days=args.http_cache_max_age_days,
+                               llm_batch_size=args.llm_batch_size,
+                               llm_batch_tokens=args.llm_batch_tokens,
+                               extraction_processes=args.extraction_processes,
+                               extraction_chunksize=args.extraction_chunksize,
+                               dedup_threshold=None if args.no_dedup else args.dedup_threshold,
+                               dedup_report=args.dedup_report or f"{args.output_file}.duplicates.json",
+                               respect_robots=not args.ignore_robots,
+                               include_patterns=args.include,
+                               exclude_patterns=args.exclude,
+                               control=control,
+                               llm_config=llm_config,
+                               timing_report=args.timing_report or f"{args.output_file}.timings.json",
+                               profile=args.profile)
 
 if __name__ == "__main__":
     main_cli() 
\ No newline at end of file